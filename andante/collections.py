@@ -83,3 +83,79 @@ class OrderedSet(collections.OrderedDict, collections.abc.MutableSet):
                 ordered_set.add(line)
         return ordered_set
 
+
+class LRUCache:
+    """ Mapping that keeps its maxsize most recently used items
+
+    Attributes
+    ----------
+    maxsize : int
+        The maximal number of items, 0 disabling the cache
+    hits : int
+        The number of successful lookups
+    misses : int
+        The number of failed lookups
+    """
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._items = collections.OrderedDict()
+        
+    def get(self, key, default=None):
+        """ Returns the item of some key and marks it as the most recently used one, or default if absent """
+        try:
+            value = self._items[key]
+        except KeyError:
+            self.misses += 1
+            return default
+        self._items.move_to_end(key)
+        self.hits += 1
+        return value
+        
+    def __setitem__(self, key, value):
+        if self.maxsize <= 0:
+            return
+        self._items[key] = value
+        self._items.move_to_end(key)
+        while len(self._items) > self.maxsize:
+            self._items.popitem(last=False)
+            
+    def __contains__(self, key): return key in self._items
+    def __len__(self): return len(self._items)
+    
+    def clear(self):
+        """ Removes all items and resets the counters """
+        self._items.clear()
+        self.hits = 0
+        self.misses = 0
+        
+    def info(self):
+        """ Returns the counters and size of the cache as a dict """
+        return {'hits':self.hits, 'misses':self.misses, 'size':len(self._items), 'maxsize':self.maxsize}
+    
+    def __repr__(self):
+        return 'LRUCache(%s)' % ', '.join('%s=%d' % item for item in self.info().items())
+
+
+# Sets of small integers, e.g. the positions of the examples covered by a
+# clause, are kept as the bits of an int: union, intersection and 
+# difference are |, & and & ~, and an int takes one bit per position
+
+def bits_of(indices):
+    """ Returns the int whose bits set are at some positions """
+    indices = list(indices)
+    if not indices:
+        return 0
+    array = bytearray(max(indices) // 8 + 1)
+    for i in indices:
+        array[i >> 3] |= 1 << (i & 7)
+    return int.from_bytes(array, 'little')
+
+def indices_of(bits):
+    """ Returns the positions, in increasing order, of the bits set in an int """
+    return [i for i, digit in enumerate(reversed(bin(bits))) if digit == '1']
+
+def count_of(bits):
+    """ Returns the number of bits set in an int """
+    return bin(bits).count('1')
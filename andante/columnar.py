@@ -0,0 +1,403 @@
+"""
+Columnar storage of ground facts.
+
+Background knowledge made of tabular data is mostly ground facts, and a
+andante.knowledge.TreeShapedKnowledge keeps a Clause, a Predicate and the
+list of their arguments for each of them. A ColumnarKnowledge only keeps, for
+each predicate, one NumPy array of integer codes per argument: every ground
+term is interned once in a SymbolTable and a fact is a row of codes. The
+clauses are only built when they are matched, and the selection of the rows
+matching an atom is vectorized.
+
+A ColumnarKnowledge only holds ground facts. Rules are kept in another
+knowledge and both are queried through an andante.knowledge.MultipleKnowledge.
+
+License
+-------
+
+This software is distributed under the terms of both the MIT license and the
+Apache License (Version 2.0).
+
+See LICENSE for details.
+
+Acknowlegment
+-------------
+
+This software has benefited from the support of Wallonia thanks to the funding
+of the ARIAC project (https://trail.ac), a project part of the
+DigitalWallonia4.ai initiative (https://www.digitalwallonia.be).
+
+It was done by Simon Jacquet at the University of Namur (https://www.unamur.be)
+in the period of October 1st 2021 to August 31st 2022 under the supervision of
+Isabelle Linden, Jean-Marie Jacquet and Wim Vanhoof.
+"""
+
+from collections.abc import Iterable
+import numpy as np
+
+from andante.knowledge import Knowledge, _generations, index_key
+from andante.statistics import Statistics, PredicateStatistics
+from andante.logic_concepts import Clause, Predicate, Constant, Variable, Term, extract_variables
+
+
+class SymbolTable:
+    """ Ground terms interned as integer codes
+
+    Attributes
+    ----------
+    terms : list of andante.logic_concepts.Term
+        The interned terms, the code of a term being its position
+    codes : dict
+        Maps the interned terms to their code
+    """
+    def __init__(self):
+        self.terms = []
+        self.codes = dict()
+
+    def intern(self, term):
+        """ Returns the code of a ground term, interning it if needed """
+        code = self.codes.get(term)
+        if code is None:
+            code = self.codes[term] = len(self.terms)
+            self.terms.append(term)
+        return code
+
+    def __len__(self):
+        return len(self.terms)
+
+
+class Relation:
+    """ Ground facts of a predicate, stored as columns of codes
+
+    Rows are only appended, in the order in which the facts are added.
+    Removed facts are marked as dead and skipped. The rows sorted by each
+    argument, used to look up its codes, are only sorted again once a
+    fraction of the relation was appended since: the rows appended after 
+    them are compared one by one.
+
+    Attributes
+    ----------
+    symbol : str
+        The symbol of the predicate
+    arity : int
+        The number of arguments of the predicate
+    columns : numpy.ndarray
+        Array of shape (arity, capacity) whose row i holds the codes of the
+        i-th argument of the facts
+    alive : numpy.ndarray
+        Array of shape (capacity,) telling which facts were not removed
+    size : int
+        The number of rows used in columns
+    count : int
+        The number of facts, i.e. of rows alive
+    """
+    dtype = np.int32
+
+    def __init__(self, symbol, arity, capacity=16):
+        self.symbol = symbol
+        self.arity = arity
+        self.columns = np.empty((arity, capacity), dtype=self.dtype)
+        self.alive = np.zeros(capacity, dtype=bool)
+        self.size = 0
+        self.count = 0
+        self._sorted = dict() # argument -> (rows sorted by code, sorted codes) of the first rows, built on demand
+
+    @property
+    def nbytes(self):
+        """ Memory used by the arrays of the relation """
+        return self.columns.nbytes + self.alive.nbytes
+
+    def append(self, rows):
+        """ Appends the rows of an array of codes of shape (n, arity) """
+        n = len(rows)
+        if self.size + n > self.alive.shape[0]:
+            capacity = max(2 * self.alive.shape[0], self.size + n)
+            columns = np.empty((self.arity, capacity), dtype=self.dtype)
+            columns[:, :self.size] = self.columns[:, :self.size]
+            alive = np.zeros(capacity, dtype=bool)
+            alive[:self.size] = self.alive[:self.size]
+            self.columns, self.alive = columns, alive
+        self.columns[:, self.size:self.size+n] = rows.T
+        self.alive[self.size:self.size+n] = True
+        self.size += n
+        self.count += n
+
+    def find(self, codes):
+        """ Returns the row of the fact of some codes, or -1 if there is none """
+        rows = self.select(list(enumerate(codes)))
+        return int(rows[0]) if len(rows) else -1
+
+    def kill(self, row):
+        """ Marks the fact of some row as removed """
+        if not self.alive.flags.writeable:
+            # The arrays are a read-only view, e.g. of an andante.image
+            self.alive = self.alive.copy()
+        self.alive[row] = False
+        self.count -= 1
+
+    def select(self, bound):
+        """ Returns the rows of the facts having some codes at some arguments, in increasing order
+
+        Parameters
+        ----------
+        bound : list of (int, int)
+            The pairs (argument, code) of the bound arguments
+        """
+        if not bound:
+            return np.flatnonzero(self.alive[:self.size])
+        # The first bound argument is looked up in the rows sorted by code
+        position, code = bound[0]
+        order, codes = self._sorted_by(position)
+        rows = order[np.searchsorted(codes, code, 'left'):np.searchsorted(codes, code, 'right')]
+        if len(codes) < self.size:
+            tail = np.flatnonzero(self.columns[position, len(codes):self.size] == code) + len(codes)
+            rows = np.concatenate([rows, tail.astype(rows.dtype)])
+        if len(rows) == 0:
+            return rows
+        mask = self.alive[rows]
+        for position, code in bound[1:]:
+            mask &= self.columns[position, rows] == code
+        return np.sort(rows[mask])
+
+    def _sorted_by(self, position):
+        """ Returns the first rows sorted by their code at some argument, and the sorted codes 
+
+        The rows appended after them are at most an eighth of the rows, or 16.
+        """
+        sorted_by = self._sorted.get(position)
+        if sorted_by is None or self.size - len(sorted_by[1]) > max(16, self.size // 8):
+            column = self.columns[position, :self.size]
+            order = np.argsort(column, kind='stable')
+            self._sorted[position] = (order, column[order])
+        return self._sorted[position]
+
+
+class FactSet:
+    """ Set-like view of the arguments of the facts of a relation, see andante.knowledge.Knowledge.facts """
+    def __init__(self, knowledge, relation):
+        self.knowledge = knowledge
+        self.relation = relation
+
+    def __contains__(self, arguments):
+        if self.relation is None:
+            return False
+        codes = self.knowledge._encode(arguments)
+        return codes is not None and len(codes) == self.relation.arity and self.relation.find(codes) >= 0
+
+    def __len__(self):
+        return self.relation.count if self.relation is not None else 0
+
+    def __iter__(self):
+        if self.relation is None:
+            return
+        terms = self.knowledge.symbols.terms
+        for row in self.relation.select([]):
+            yield tuple(terms[code] for code in self.relation.columns[:, row].tolist())
+
+
+class ColumnarKnowledge(Knowledge):
+    """ Knowledge of ground facts stored as columns of integer codes, see andante.columnar
+
+    The clauses are built when they are matched or iterated over. Being
+    hash-consed, they are shared with the other knowledges and only kept
+    alive as long as they are used.
+
+    Attributes
+    ----------
+    symbols : andante.columnar.SymbolTable
+        The ground terms appearing in the facts
+    relations : dict of andante.columnar.Relation
+        Given a predicate name, returns the relation holding its facts
+    """
+    _few = 32 # number of facts under which the facts added are looked up one by one
+    
+    def __init__(self, clauses=None, options=None):
+        self.options = options
+        self._generation = next(_generations)
+        self.symbols = SymbolTable()
+        self.relations = dict()
+        if clauses is not None:
+            self.add(clauses)
+
+    @property
+    def nbytes(self):
+        """ Memory used by the arrays of the relations """
+        return sum(relation.nbytes for relation in self.relations.values())
+
+    def __len__(self):
+        return sum(relation.count for relation in self.relations.values())
+
+    def __iter__(self):
+        for relation in self.relations.values():
+            for row in relation.select([]):
+                yield self._clause(relation, row)
+
+    def add(self, clause):
+        # In case input is not a clause but an iterable containing clauses
+        if not isinstance(clause, Clause):
+            if not isinstance(clause, Iterable):
+                raise KeyError('Expected andante.logic_concepts.Clause or Iterable object, found : %s' % clause.__class__.__name__)
+            # The facts are added predicate by predicate
+            rows = dict()
+            for x in clause:
+                if not isinstance(x, Clause):
+                    raise TypeError('Iterable contains non-Clause elements: %s' % x.__class__.__name__)
+                self._check(x)
+                rows.setdefault((x.head.symbol, x.head.arity), []).append(x.head.arguments)
+            for (symbol, _), r in rows.items():
+                self.add_facts(symbol, r)
+            return
+
+        self._check(clause)
+        self.add_facts(clause.head.symbol, [clause.head.arguments])
+        
+    @staticmethod
+    def _check(clause):
+        """ Raises a ValueError if a clause is not a ground fact """
+        head = clause.head
+        if clause.body or head is None or extract_variables(head):
+            raise ValueError('andante.columnar.ColumnarKnowledge only holds ground facts, got: %s' % clause)
+
+    def add_facts(self, symbol, rows):
+        """ Adds the facts of a predicate given the tuples of their arguments
+
+        The arguments are ground terms, or values of constants. Facts already
+        in the knowledge, or repeated in rows, are only added once. Adding
+        many facts at once is much faster than adding them one by one.
+        
+        A few facts are looked up in the relation one by one, while many 
+        facts are compared with all the facts of the relation at once.
+        """
+        rows = [tuple(self._term(arg) for arg in row) for row in rows]
+        if not rows:
+            return
+        arity = len(rows[0])
+        name = '%s/%d' % (symbol, arity)
+        relation = self.relations.get(name)
+        if relation is None:
+            relation = self.relations[name] = Relation(symbol, arity)
+        intern = self.symbols.intern
+        codes = np.array([[intern(arg) for arg in row] for row in rows], dtype=Relation.dtype).reshape(len(rows), arity)
+
+        if arity == 0:
+            if relation.count == 0:
+                relation.append(codes[:1])
+                self._generation = next(_generations)
+            return
+        # Keep the first occurrence of each new row, in order
+        if len(codes) <= self._few:
+            seen = set()
+            new = []
+            for i, row in enumerate(codes.tolist()):
+                if tuple(row) not in seen and relation.find(row) < 0:
+                    seen.add(tuple(row))
+                    new.append(i)
+        else:
+            existing = relation.columns[:, :relation.size].T[relation.alive[:relation.size]]
+            _, first = np.unique(np.concatenate([existing, codes]), axis=0, return_index=True)
+            new = np.sort(first[first >= len(existing)]) - len(existing)
+        if len(new):
+            relation.append(codes[new])
+            self._generation = next(_generations)
+
+    def remove(self, clause):
+        # In case input is not a clause but an iterable containing clauses
+        if not isinstance(clause, Clause):
+            if not isinstance(clause, Iterable):
+                raise KeyError('Expected andante.logic_concepts.Clause or Iterable object, found : %s' % clause.__class__.__name__)
+            for x in clause:
+                self.remove(x)
+            return
+
+        row, relation = self._find(clause)
+        if row >= 0:
+            relation.kill(row)
+            self._generation = next(_generations)
+
+    def __contains__(self, clause):
+        return self._find(clause)[0] >= 0
+
+    def match(self, atom):
+        """ Returns the facts whose head may unify with some atom, in the order in which they were added """
+        return list(self.match_iter(atom))
+
+    def match_iter(self, atom):
+        relation, rows = self._select(atom)
+        return (self._clause(relation, row) for row in rows.tolist())
+
+    def first_match(self, atom):
+        relation, rows = self._select(atom)
+        return self._clause(relation, rows[0]) if len(rows) else None
+
+    def facts(self, name):
+        return FactSet(self, self.relations.get(name))
+
+    def has_fact(self, atom):
+        relation = self.relations.get(atom.name)
+        if relation is None:
+            return False
+        codes = self._encode(atom.arguments)
+        return codes is not None and relation.find(codes) >= 0
+
+    def _compute_statistics(self):
+        # Values are counted on the columns of codes
+        statistics = Statistics()
+        terms = self.symbols.terms
+        for name, relation in self.relations.items():
+            if not relation.count:
+                continue
+            predicate = statistics.predicates[name] = PredicateStatistics(name, relation.arity)
+            predicate.clauses = predicate.facts = relation.count
+            alive = relation.alive[:relation.size]
+            for position, values in enumerate(predicate.values):
+                codes, counts = np.unique(relation.columns[position, :relation.size][alive], return_counts=True)
+                for code, n in zip(codes.tolist(), counts.tolist()):
+                    key = index_key(terms[code])
+                    values[key] = values.get(key, 0) + n
+        return statistics
+
+    def _find(self, clause):
+        """ Returns the row of a fact and its relation, or -1 if it is not in the knowledge """
+        head = clause.head
+        if clause.body or head is None:
+            return -1, None
+        relation = self.relations.get(head.name)
+        codes = self._encode(head.arguments)
+        if relation is None or codes is None:
+            return -1, relation
+        return relation.find(codes), relation
+
+    def _select(self, atom):
+        """ Returns the relation of an atom and the rows of the facts that may unify with it """
+        relation = self.relations.get(atom.name)
+        if relation is None:
+            return None, np.empty(0, dtype=np.intp)
+        bound = []
+        for position, arg in enumerate(atom.arguments):
+            if isinstance(arg, Variable):
+                continue
+            code = self.symbols.codes.get(arg)
+            if code is not None:
+                bound.append((position, code))
+            elif not extract_variables(arg):
+                # A ground term that appears in no fact
+                return relation, np.empty(0, dtype=np.intp)
+        return relation, relation.select(bound)
+
+    def _encode(self, arguments):
+        """ Returns the codes of some ground terms, or None if some of them was never interned """
+        codes = self.symbols.codes
+        encoded = [codes.get(arg) for arg in arguments]
+        return None if None in encoded else encoded
+
+    def _clause(self, relation, row):
+        """ Returns the fact of some row of a relation """
+        terms = self.symbols.terms
+        return Clause(Predicate(relation.symbol, [terms[code] for code in relation.columns[:, row].tolist()]), [])
+
+    @staticmethod
+    def _term(value):
+        return value if isinstance(value, Term) else Constant(value)
+
+    def copy(self):
+        return ColumnarKnowledge(list(self), self.options)
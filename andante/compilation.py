@@ -0,0 +1,379 @@
+"""
+Compilation of clauses for the deduction engines.
+
+Before being used for resolution, the variables of a clause are numbered from
+0 to k-1. Renaming the clause apart then amounts to choosing an offset, the
+frame, at which its k variables live in the binding store of the engine.
+
+Clauses can further be compiled into Python functions (see clause_function)
+for andante.solver.CompiledSolver. Such a function unifies the head of the
+clause with the arguments of a call, with code specialised for each argument,
+and pushes the instantiated body onto the list of goals left to prove.
+
+License
+-------
+
+This software is distributed under the terms of both the MIT license and the
+Apache License (Version 2.0).
+
+See LICENSE for details.
+
+Acknowlegment
+-------------
+
+This software has benefited from the support of Wallonia thanks to the funding
+of the ARIAC project (https://trail.ac), a project part of the
+DigitalWallonia4.ai initiative (https://www.digitalwallonia.be).
+
+It was done by Simon Jacquet at the University of Namur (https://www.unamur.be)
+in the period of October 1st 2021 to August 31st 2022 under the supervision of
+Isabelle Linden, Jean-Marie Jacquet and Wim Vanhoof. 
+"""
+
+from andante.logic_concepts import Variable, Atom, Negation, Cut, Once, IfThenElse, Function, Predicate, CompoundTerm
+from andante.mathematical_expressions import Comparison, Is
+
+
+class Slot(Variable):
+    """ Variable of a compiled clause, identified by its position in the frame of the clause
+
+    Attributes
+    ----------
+    index : int
+        The position of the variable in the frame of the clause
+    """
+    def __init__(self, index):
+        assert isinstance(index, int)
+        super().__init__('_', index)
+        self.index = index
+        
+    @classmethod
+    def _key(cls, index): return (index,)
+    def __reduce__(self): return (self.__class__, (self.index,))
+    
+    
+class CompiledClause:
+    """ Clause whose variables are replaced by slots numbered from 0 to nvars-1
+
+    Attributes
+    ----------
+    clause : andante.logic_concepts.Clause
+        The original clause
+    head : andante.logic_concepts.Atom
+        The head of the clause, with slots instead of variables
+    body : list of andante.logic_concepts.Atom
+        The body of the clause, with slots instead of variables
+    variables : list of andante.logic_concepts.Variable
+        The variables of the original clause, ordered by their slot index
+    """
+    def __init__(self, clause):
+        self.clause = clause
+        self.variables, fun = slot_mapping()
+        self.head = clause.head.apply(fun)
+        self.body = [b.apply(fun) for b in clause.body]
+        
+    @property
+    def nvars(self): return len(self.variables)
+    
+    def __repr__(self): 
+        return 'CompiledClause(%s, nvars=%d)' % (repr(self.clause), self.nvars)
+    
+
+def slot_mapping(variables=None):
+    """ Returns a list of variables and a function for LogicConcept.apply that replaces each variable by its slot
+
+    Variables met for the first time are appended to the list.
+    """
+    variables = list(variables) if variables is not None else []
+    slots = {var:Slot(i) for i, var in enumerate(variables)}
+    def fun(expr):
+        if isinstance(expr, Variable):
+            if expr not in slots:
+                slots[expr] = Slot(len(variables))
+                variables.append(expr)
+            return slots[expr]
+        return expr
+    return variables, fun
+
+
+def compile_clause(clause):
+    """ Returns the andante.compilation.CompiledClause of a clause
+    
+    Clauses are hash-consed, so that the compiled clause is built once and 
+    then stored on the clause itself.
+    """
+    try:
+        return clause._compiled
+    except AttributeError:
+        clause._compiled = CompiledClause(clause)
+        return clause._compiled
+
+
+
+# Runtime representation used by compiled clauses
+# ----------------------------------------------- 
+# Unbound variables are Ref cells, compound terms are tuples whose first item
+# is the symbol, and constants (and types) are kept as is: being hash-consed,
+# they are compared by identity. A goal list is a linked list of tuples 
+# (key, payload, rest) where the key is the symbol of an atom, whose payload is
+# the tuple of its arguments, or one of the markers below. The goal lists of 
+# the branches of an if-then-else are followed by the rest of the goal list.
+
+BUILTIN  = 'BUILTIN'  # payload: (comparison or is literal with slots, registers)
+NEGATION = 'NEGATION' # payload: goal list of the negated goal
+CUT      = 'CUT'      # payload: number of choice points when the clause of the cut was called
+ONCE     = 'ONCE'     # payload: goal list of the goal
+IF       = 'IF'       # payload: (goal list of the condition, of the then goal, of the else goal or None)
+MARKERS  = frozenset((BUILTIN, NEGATION, CUT, ONCE, IF))
+
+class Ref:
+    """ Variable of the runtime representation, bound when value is not None """
+    __slots__ = ('value',)
+    def __init__(self): self.value = None
+    def __repr__(self): return 'Ref(%s)' % repr(self.value)
+    
+
+def deref(term):
+    """ Follows the bindings of a runtime term until an unbound Ref or a non-variable term """
+    while type(term) is Ref:
+        value = term.value
+        if value is None:
+            break
+        term = value
+    return term
+
+
+def occurs(ref, term):
+    """ Tells whether the unbound ref occurs in the runtime term """
+    terms = [term]
+    while terms:
+        term = deref(terms.pop())
+        if term is ref:
+            return True
+        if type(term) is tuple:
+            terms.extend(term[1:])
+    return False
+
+
+def unify(term1, term2, trail, occurs_check=True):
+    """ Unifies two runtime terms, recording the bound refs on the trail
+
+    Returns
+    -------
+    bool
+        Whether the unification succeeded. If not, some bindings may have
+        been made and have to be undone with undo.
+    """
+    pairs = [(term1, term2)]
+    while pairs:
+        t1, t2 = pairs.pop()
+        t1, t2 = deref(t1), deref(t2)
+        if t1 is t2:
+            continue
+        if type(t1) is Ref:
+            if occurs_check and type(t2) is tuple and occurs(t1, t2):
+                return False
+            t1.value = t2
+            trail.append(t1)
+        elif type(t2) is Ref:
+            if occurs_check and type(t1) is tuple and occurs(t2, t1):
+                return False
+            t2.value = t1
+            trail.append(t2)
+        elif type(t1) is tuple and type(t2) is tuple:
+            if t1[0] != t2[0] or len(t1) != len(t2):
+                return False
+            pairs.extend(zip(t1[1:], t2[1:]))
+        else:
+            return False
+    return True
+
+
+def undo(trail, mark):
+    """ Unbinds the refs bound since the trail was at position mark """
+    while len(trail) > mark:
+        trail.pop().value = None
+        
+
+def build(term, registers):
+    """ Returns the runtime term of a compiled term whose slots are given by registers """
+    if type(term) is Slot:
+        return registers[term.index]
+    if isinstance(term, Function):
+        return (term.symbol,) + tuple(build(arg, registers) for arg in term.arguments)
+    return term
+
+
+def to_term(term, names):
+    """ Returns the logic concept of a runtime term
+
+    Unbound refs are replaced by the variables of the dictionary names, in
+    which new variables are added for the refs met for the first time.
+    """
+    term = deref(term)
+    if type(term) is Ref:
+        if term not in names:
+            names[term] = Variable('_G', len(names))
+        return names[term]
+    if type(term) is tuple:
+        return CompoundTerm(term[0], [to_term(arg, names) for arg in term[1:]])
+    return term
+
+
+def instantiate(literals, registers, goals=None, cut=0):
+    """ Pushes compiled literals, whose slots are given by registers and whose cuts cut to cut choice points, onto a goal list """
+    for literal in reversed(literals):
+        if type(literal) is Predicate:
+            goals = (literal.symbol, tuple(build(arg, registers) for arg in literal.arguments), goals)
+        elif isinstance(literal, Negation):
+            goals = (NEGATION, instantiate(literal.goal, registers), goals)
+        elif isinstance(literal, (Comparison, Is)):
+            goals = (BUILTIN, (literal, registers), goals)
+        elif isinstance(literal, Cut):
+            goals = (CUT, cut, goals)
+        elif isinstance(literal, Once):
+            goals = (ONCE, instantiate(literal.goal, registers), goals)
+        elif isinstance(literal, IfThenElse):
+            otherwise = instantiate(literal.otherwise, registers, goals, cut) if literal.otherwise is not None else None
+            goals = (IF, (instantiate(literal.condition, registers), instantiate(literal.then, registers, goals, cut), otherwise), goals)
+        else:
+            goals = (literal.symbol, tuple(build(arg, registers) for arg in literal.arguments), goals)
+    return goals
+
+
+class _ClauseCodeGenerator:
+    """ Writes the source code of the function of a compiled clause (see clause_function) """
+    def __init__(self, compiled):
+        self.compiled = compiled
+        self.namespace = {'Ref': Ref, 'unify': unify, 'BUILTIN': BUILTIN, 'NEGATION': NEGATION, 'CUT': CUT, 'ONCE': ONCE, 'IF': IF}
+        self.names = dict() # id of an object -> its name in the namespace
+        self.seen = set()   # slots already holding a value
+        self.lines = []
+        
+    def name(self, obj):
+        """ Returns the name under which some object is available to the generated code """
+        if id(obj) not in self.names:
+            self.names[id(obj)] = 'K%d' % len(self.names)
+            self.namespace[self.names[id(obj)]] = obj
+        return self.names[id(obj)]
+    
+    def emit(self, line, indent=1):
+        self.lines.append('    '*indent + line)
+        
+    def term(self, term):
+        """ Returns the expression that builds a term, declaring its new slots beforehand """
+        if type(term) is Slot:
+            if term.index not in self.seen:
+                self.seen.add(term.index)
+                self.emit('V%d = Ref()' % term.index)
+            return 'V%d' % term.index
+        if isinstance(term, Function):
+            return '(%s)' % ''.join('%s, ' % x for x in [self.name(term.symbol)] + [self.term(arg) for arg in term.arguments])
+        return self.name(term)
+    
+    def head(self):
+        """ Emits the unification of the arguments of the call with the head """
+        arguments = self.compiled.head.arguments
+        if arguments:
+            self.emit('%s = args' % ''.join('a%d, ' % i for i in range(len(arguments))))
+        for i, arg in enumerate(arguments):
+            if type(arg) is Slot and arg.index not in self.seen:
+                self.seen.add(arg.index)
+                self.emit('V%d = a%d' % (arg.index, i))
+            elif type(arg) is Slot or isinstance(arg, Function):
+                self.emit('if not unify(%s, a%d, trail, occurs_check): return False' % (self.term(arg), i))
+            else:
+                # Inlined unification with a constant
+                self.emit('t = a%d' % i)
+                self.emit('while type(t) is Ref:')
+                self.emit(    'v = t.value', 2)
+                self.emit(    'if v is None:', 2)
+                self.emit(        't.value = %s; trail.append(t); break' % self.name(arg), 3)
+                self.emit(    't = v', 2)
+                self.emit('else:')
+                self.emit(    'if t is not %s: return False' % self.name(arg), 2)
+                
+    def goals(self, literals, rest, cut='cut'):
+        """ Returns the expression of the goal list of some literals followed by rest, whose cuts cut to the choice points cut """
+        for literal in reversed(literals):
+            if isinstance(literal, Negation):
+                rest = '(NEGATION, %s, %s)' % (self.goals(literal.goal, 'None', '0'), rest)
+            elif isinstance(literal, (Comparison, Is)):
+                rest = '(BUILTIN, (%s, R), %s)' % (self.name(literal), rest)
+            elif isinstance(literal, Cut):
+                rest = '(CUT, %s, %s)' % (cut, rest)
+            elif isinstance(literal, Once):
+                rest = '(ONCE, %s, %s)' % (self.goals(literal.goal, 'None', '0'), rest)
+            elif isinstance(literal, IfThenElse):
+                otherwise = self.goals(literal.otherwise, rest, cut) if literal.otherwise is not None else 'None'
+                rest = '(IF, (%s, %s, %s), %s)' % (self.goals(literal.condition, 'None', '0'), self.goals(literal.then, rest, cut), otherwise, rest)
+            else:
+                args = ''.join('%s, ' % self.term(arg) for arg in literal.arguments)
+                rest = '(%s, (%s), %s)' % (self.name(literal.symbol), args, rest)
+        return rest
+    
+    def body(self):
+        """ Emits the push of the body onto the goal list """
+        body = self.compiled.body
+        if not body:
+            self.emit('return rest')
+            return
+        for index in range(self.compiled.nvars):
+            if index not in self.seen:
+                self.seen.add(index)
+                self.emit('V%d = Ref()' % index)
+        self.emit('R = (%s)' % ''.join('V%d, ' % i for i in range(self.compiled.nvars)))
+        self.emit('goals = rest')
+        for literal in reversed(body):
+            self.emit('goals = %s' % self.goals([literal], 'goals'))
+        self.emit('return goals')
+        
+    def generate(self):
+        self.head()
+        self.body()
+        return 'def clause(args, rest, trail, occurs_check, cut):\n' + '\n'.join(self.lines) + '\n'
+
+
+def compile_query(goal):
+    """ Returns the variables of a goal, ordered by their slot index, and its compiled literals
+
+    Atoms being hash-consed, the result is stored on the atom when the goal is
+    a single atom, as queries on examples are repeated by the learners.
+    """
+    try:
+        return goal._query
+    except AttributeError:
+        variables, fun = slot_mapping()
+        literals = goal.apply(fun)
+        if isinstance(goal, Atom):
+            literals = [literals]
+        if isinstance(goal, Predicate):
+            goal._query = (variables, literals)
+        return variables, literals
+
+
+_code_cache = dict() # source code -> code object, shared by clauses of the same shape
+
+def clause_function(clause):
+    """ Returns the Python function of a clause, used by andante.solver.CompiledSolver
+
+    The function has the signature fun(args, rest, trail, occurs_check, cut) 
+    where args is the tuple of runtime arguments of the called atom, rest the
+    goal list that follows the call, trail the list of bound refs, occurs_check
+    whether unification checks for cycles and cut the number of choice points 
+    to which the cuts of the body cut. It returns the goal list of the 
+    body of the clause followed by rest, or False if the head does not unify
+    with the call. Like compiled clauses, the function is stored on the 
+    clause itself.
+    """
+    try:
+        return clause._function
+    except AttributeError:
+        generator = _ClauseCodeGenerator(compile_clause(clause))
+        source = generator.generate()
+        if source not in _code_cache:
+            _code_cache[source] = compile(source, '<compiled clause>', 'exec')
+        exec(_code_cache[source], generator.namespace)
+        clause._function = generator.namespace['clause']
+        clause._function.source = source
+        return clause._function
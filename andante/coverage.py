@@ -0,0 +1,470 @@
+"""
+Define how the examples covered by a candidate clause are computed in the
+build_hypothesis method of the andante.learner.ProgolLearner class.
+
+A ProofCoverage proves each example separately with the solver. A
+JoinCoverage evaluates the body of the clause as a conjunctive query over
+the relations of the background knowledge, once for all the examples: the
+bindings of the head variables by all the examples are joined with the
+relation of each atom in turn, the examples sharing the same bindings of
+the variables still needed being joined together, and the examples left at
+the end are the ones covered. A SubsumptionCoverage saturates each example
+once and tests whether the clause theta-subsumes its saturation, without 
+any further reasoning on the background knowledge.
+
+The class is chosen by options.coverage. ProofCoverage is the default; the
+other ones are opted into, e.g. options.coverage = 'JoinCoverage'.
+
+License
+-------
+
+This software is distributed under the terms of both the MIT license and the
+Apache License (Version 2.0).
+
+See LICENSE for details.
+
+Acknowlegment
+-------------
+
+This software has benefited from the support of Wallonia thanks to the funding
+of the ARIAC project (https://trail.ac), a project part of the
+DigitalWallonia4.ai initiative (https://www.digitalwallonia.be).
+
+It was done by Simon Jacquet at the University of Namur (https://www.unamur.be)
+in the period of October 1st 2021 to August 31st 2022 under the supervision of
+Isabelle Linden, Jean-Marie Jacquet and Wim Vanhoof.
+"""
+
+import time
+import weakref
+from andante.logic_concepts import Predicate, Constant, Variable, extract_variables
+from andante.mathematical_expressions import Comparison
+from andante.datalog import materialize, _plan, _test, _ATOM
+from andante.collections import bits_of, indices_of
+from andante.solver import DatalogSolver
+import andante.learner
+
+
+class ProofCoverage:
+    """ Examples covered by candidate clauses, each one proven by the solver
+
+    Attributes
+    ----------
+    B : andante.knowledge.Knowledge
+        The background knowledge
+    M : andante.mode.ModeCollection
+        The modes, or None if they are not needed
+    solver : andante.solver.Solver
+        The deduction engine
+    options : andante.options.Options
+        All options
+    """
+    def __init__(self, B, M, solver, options=None):
+        self.B = B
+        self.M = M
+        self.solver = solver
+        self.options = options
+
+    def covered(self, clause, examples, knowledge, bits=None):
+        """ Returns the bits of the examples proven from knowledge, the background knowledge extended with clause
+
+        Parameters
+        ----------
+        clause : andante.logic_concepts.Clause
+            The candidate clause
+        examples : list of andante.logic_concepts.Clause
+            The examples, whose positions are their bits
+        knowledge : andante.knowledge.Knowledge
+            The background knowledge extended with clause
+        bits : int
+            The bits of the examples to test, all of them by default, see
+            andante.collections.bits_of
+        """
+        positions = indices_of(bits) if bits is not None else range(len(examples))
+        return bits_of(i for i in positions if self.solver.succeeds_on(examples[i].head, knowledge, verbose=0))
+
+
+class JoinCoverage(ProofCoverage):
+    """ Examples covered by candidate clauses, computed by a join of their body seeded with all the examples
+
+    A clause is evaluated this way when its atoms only have constants and
+    variables as arguments, and only call predicates whose relation is
+    known: the predicates made of ground facts, and the Datalog predicates
+    materialized by andante.datalog (see 
+    andante.datalog.MaterializedKnowledge.relation), which must not be 
+    recursive unless the solver is an andante.solver.DatalogSolver. Its 
+    other literals must be comparisons of variables bound by the head or 
+    an atom. When the predicate of the clause has clauses in the background
+    knowledge, which must not be recursive, the examples they cover are 
+    proven by the solver, once for all the candidate clauses, as are the 
+    examples of the other predicates that do not depend on it. The other 
+    clauses and examples are left to ProofCoverage.
+    """
+    def __init__(self, B, M, solver, options=None):
+        super().__init__(B, M, solver, options)
+        self._background = dict()   # example -> whether the background knowledge alone covers it
+        self._dependencies = dict() # (name, other name) -> whether the first predicate may call the other one
+        self._generation = B.generation
+
+    def covered(self, clause, examples, knowledge, bits=None):
+        plan = self.plan(clause)
+        if plan is None:
+            return super().covered(clause, examples, knowledge, bits)
+        name = clause.head.name
+        seeds, others = [], []
+        for i in (indices_of(bits) if bits is not None else range(len(examples))):
+            e = examples[i]
+            if e.head.name == name and not extract_variables(e.head):
+                seeds.append(i)
+            else:
+                others.append(i)
+        covered = self._covers(plan, [examples[i] for i in seeds], knowledge)
+        covered = {seeds[i] for i, head in enumerate(covered) if head}
+        background = self.B.statistics.get(name) is not None
+        for i in seeds:
+            if i not in covered and background and self._covered_by_background(examples[i]):
+                covered.add(i)
+        for i in others:
+            e = examples[i]
+            if extract_variables(e.head) or self._depends(e.head.name, name):
+                if self.solver.succeeds_on(e.head, knowledge, verbose=0):
+                    covered.add(i)
+            elif self._covered_by_background(e):
+                covered.add(i)
+        return bits_of(covered)
+
+    def _covers(self, plan, examples, knowledge):
+        """ Returns, for each ground example of the predicate of a clause of some plan, whether the clause covers it """
+        return self.join(plan, [e.head for e in examples])
+
+    def _refresh(self):
+        """ Forgets what was computed from the background knowledge if it was modified """
+        if self.B.generation != self._generation:
+            self._background.clear()
+            self._dependencies.clear()
+            self._generation = self.B.generation
+
+    def _covered_by_background(self, e):
+        self._refresh()
+        covered = self._background.get(e)
+        if covered is None:
+            covered = self._background[e] = self.solver.succeeds_on(e.head, self.B, verbose=0)
+        return covered
+
+    def plan(self, clause):
+        """ Returns the plan of the join of the body of a clause and the relations of its atoms, or None if it cannot be evaluated by a join """
+        if getattr(self.solver.options, 'profile', False):
+            return None
+        head = clause.head
+        if type(head) is not Predicate or not all(type(arg) is Constant or type(arg) is Variable for arg in head.arguments):
+            return None
+        # A comparison is tested by a proof where it is written: its variables are bound by the head or the atoms before it
+        bound = extract_variables(head)
+        names = []
+        for literal in clause.body:
+            if type(literal) is Predicate:
+                if not all(type(arg) is Constant or type(arg) is Variable for arg in literal.arguments):
+                    return None
+                bound.update(literal.arguments)
+                names.append(literal.name)
+            elif not isinstance(literal, Comparison) or not extract_variables(literal) <= bound:
+                return None
+        if head.name in names or self._depends(head.name, head.name):
+            return None
+        view = materialize(self.B)
+        relations = dict()
+        for name in names:
+            relation = view.relation(name)
+            if relation is None:
+                return None
+            dependencies = view.dependencies(name)
+            if head.name in dependencies:
+                return None
+            if dependencies and not isinstance(self.solver, DatalogSolver):
+                # A top-down solver may not terminate on recursive predicates
+                if any(n in view.dependencies(n) for n in dependencies | {name}):
+                    return None
+            relations[name] = relation
+        steps, head_slots, nslots = _plan(clause, None, True)
+        # The slots still needed by the steps after each one
+        needed = [()] * (len(steps) + 1)
+        used = set()
+        for i in range(len(steps) - 1, -1, -1):
+            step = steps[i]
+            if step[0] is _ATOM:
+                used.difference_update(slot for _, slot in step[4])
+                used.update(slot for slot, _ in step[3] if slot is not None)
+            else:
+                used.update(step[2][var] for var in extract_variables(step[1]))
+            needed[i] = tuple(sorted(used))
+        return steps, head_slots, nslots, relations, needed
+
+    def _depends(self, name, other):
+        """ Tells whether the clauses of a predicate in the background knowledge may call another one """
+        self._refresh()
+        depends = self._dependencies.get((name, other))
+        if depends is None:
+            depends = self._dependencies[name, other] = self._calls(name, other)
+        return depends
+
+    def _calls(self, name, other):
+        seen, stack = {name}, [name]
+        while stack:
+            symbol, arity = stack.pop().rsplit('/', 1)
+            for clause in self.B.match_iter(Predicate(symbol, [Variable('_%d' % i) for i in range(int(arity))])):
+                for literal in clause.body:
+                    if type(literal) is not Predicate:
+                        if isinstance(literal, Comparison):
+                            continue
+                        # The predicates called by other literals are not followed
+                        return True
+                    if literal.name == other:
+                        return True
+                    if literal.name not in seen:
+                        seen.add(literal.name)
+                        stack.append(literal.name)
+        return False
+
+    def join(self, plan, heads):
+        """ Returns, for each ground atom of heads, whether the clause of some plan derives it
+
+        The bindings are sets of values of the slots still needed, each one
+        with the bits of the atoms that lead to it, so that an index lookup
+        is done once for all the atoms sharing the same bindings.
+        """
+        steps, head, nslots, relations, needed = plan
+        env = [None] * nslots
+        bindings = dict()
+        for i, atom in enumerate(heads):
+            for slot in range(nslots):
+                env[slot] = None
+            for value, (slot, arg) in zip(atom.arguments, head):
+                if slot is None:
+                    if value != arg:
+                        break
+                elif env[slot] is None:
+                    env[slot] = value
+                elif env[slot] != value:
+                    break
+            else:
+                key = tuple([env[slot] for slot in needed[0]])
+                bindings[key] = bindings.get(key, 0) | 1 << i
+        for i, step in enumerate(steps):
+            if not bindings:
+                break
+            before, after = needed[i], needed[i + 1]
+            joined = dict()
+            if step[0] is _ATOM:
+                _, name, positions, key, assigns, checks = step
+                relation = relations[name]
+                for values, bits in bindings.items():
+                    for slot, value in zip(before, values):
+                        env[slot] = value
+                    rows = relation.lookup(positions, tuple([arg if slot is None else env[slot] for slot, arg in key]))
+                    for row in rows:
+                        for position, slot in assigns:
+                            env[slot] = row[position]
+                        if checks and any(row[position] != env[slot] for position, slot in checks):
+                            continue
+                        values_ = tuple([env[slot] for slot in after])
+                        joined[values_] = joined.get(values_, 0) | bits
+            else:
+                _, comparison, slots = step
+                for values, bits in bindings.items():
+                    for slot, value in zip(before, values):
+                        env[slot] = value
+                    if _test(comparison, slots, env):
+                        values_ = tuple([env[slot] for slot in after])
+                        joined[values_] = joined.get(values_, 0) | bits
+            bindings = joined
+        covered = 0
+        for bits in bindings.values():
+            covered |= bits
+        return [bool(covered >> i & 1) for i in range(len(heads))]
+
+
+class SubsumptionCoverage(JoinCoverage):
+    """ Examples covered by candidate clauses, tested by theta-subsumption of their saturation
+
+    Each example is saturated once: its ground bottom clause is built by 
+    andante.learner.ProgolLearner.build_bottom_i, with the same modes and 
+    depth as the bottom clauses (see saturation). A clause covers an example if it 
+    theta-subsumes its saturation, which is tested by theta_subsumes 
+    without proving anything from the background knowledge. The tests are
+    cached, and the ones that last longer than the option 
+    subsumption_timeout give way to a proof, as do the examples that 
+    cannot be saturated. A clause covers fewer examples than by 
+    ProofCoverage when its proofs need facts beyond the saturations.
+
+    The clauses whose body has other literals than atoms, or whose 
+    predicate is recursive, are left to ProofCoverage, and the examples of
+    other predicates are handled as by JoinCoverage.
+    """
+    def __init__(self, B, M, solver, options=None):
+        super().__init__(B, M, solver, options)
+        self._subsumptions = dict() # (clause, example) -> whether the clause covers the example
+
+    def _refresh(self):
+        if self.B.generation != self._generation:
+            self._subsumptions.clear()
+        super()._refresh()
+
+    def plan(self, clause):
+        """ Returns the clause if it can be tested by theta-subsumption, None otherwise """
+        if getattr(self.solver.options, 'profile', False) or self.M is None:
+            return None
+        head = clause.head
+        if type(head) is not Predicate or not all(type(literal) is Predicate for literal in clause.body):
+            return None
+        if any(literal.name == head.name for literal in clause.body) or self._depends(head.name, head.name):
+            return None
+        return clause
+
+    def saturation(self, e):
+        """ Returns the ground bottom clause of an example, or None if there is no head mode for its predicate
+
+        The saturations are kept with the background knowledge, for the 
+        next candidate clauses and the next metrics, until the predicates 
+        of the body modes are modified.
+        """
+        generation, journal, saturations = _saturations.get(self.B) or (None, None, None)
+        if generation != self.B.generation:
+            if journal is None or self._affected(journal.read()):
+                journal, saturations = self.B.journal(), dict()
+            _saturations[self.B] = (self.B.generation, journal, saturations)
+        key = (e, self.M, self.options.i if self.options is not None else None)
+        if key not in saturations:
+            try:
+                self.M.get_modeh(e.head)
+            except KeyError:
+                saturations[key] = None
+            else:
+                learner = andante.learner.ProgolLearner(options=self.options)
+                saturations[key] = learner.build_bottom_i(e, self.M, self.B, self.solver, ground=True)
+        return saturations[key]
+
+    def _affected(self, clauses):
+        """ Tells whether some clauses added or removed may change the answers to the body modes """
+        names = {clause.head.name for clause in clauses if clause.head is not None}
+        return any(name in names or any(self._depends(name, other) for other in names) for name in self.M.map_to_modeb)
+
+    def _covers(self, clause, examples, knowledge):
+        timeout = getattr(self.options, 'subsumption_timeout', None)
+        covered = []
+        for e in examples:
+            key = (clause, e)
+            result = self._subsumptions.get(key)
+            if result is None:
+                saturation = self.saturation(e)
+                if saturation is not None:
+                    deadline = time.perf_counter() + timeout if timeout else None
+                    result = theta_subsumes(clause, saturation, deadline)
+                if result is None:
+                    result = self.solver.succeeds_on(e.head, knowledge, verbose=0)
+                self._subsumptions[key] = result
+            covered.append(result)
+        return covered
+
+
+# Background knowledge -> (its generation, the andante.knowledge.Journal of
+# its modifications, dict of the saturations of the examples)
+_saturations = weakref.WeakKeyDictionary()
+
+
+class _Timeout(Exception):
+    pass
+
+
+def theta_subsumes(clause, ground, deadline=None):
+    """ Tells whether a clause theta-subsumes a ground clause, or returns None if the deadline, a time.perf_counter value, passes first
+
+    The clause subsumes the ground clause if a substitution of its 
+    variables makes its head the head of the ground clause and each atom 
+    of its body an atom of the body of the ground clause. The substitution
+    is searched as a constraint satisfaction problem: the domain of each 
+    variable is first restricted to the terms found at all its positions, 
+    then the atoms are matched one by one, the atom with the fewest atoms 
+    matching it under the current bindings first, each binding being 
+    checked against the domains.
+    """
+    theta = dict()
+    if not _match(clause.head, ground.head, theta):
+        return False
+    rows = dict()   # name -> argument tuples of the atoms of the ground body
+    for atom in ground.body:
+        rows.setdefault(atom.name, dict())[tuple(atom.arguments)] = None
+    atoms = list(dict.fromkeys(clause.body))
+    # Node consistency: the values a variable may take at each of its positions
+    domains = dict()
+    for atom in atoms:
+        candidates = rows.get(atom.name)
+        if not candidates:
+            return False
+        for position, arg in enumerate(atom.arguments):
+            if type(arg) is Variable and arg not in theta:
+                values = {row[position] for row in candidates}
+                domains[arg] = domains[arg] & values if arg in domains else values
+                if not domains[arg]:
+                    return False
+    counter = [0]
+    def matches(atom):
+        result = []
+        for row in rows[atom.name]:
+            new = dict()
+            for arg, value in zip(atom.arguments, row):
+                if type(arg) is Variable:
+                    bound = theta.get(arg, new.get(arg))
+                    if bound is None:
+                        if value not in domains[arg]:
+                            break
+                        new[arg] = value
+                    elif bound != value:
+                        break
+                elif arg != value:
+                    break
+            else:
+                result.append(new)
+        return result
+    def search(remaining):
+        if not remaining:
+            return True
+        counter[0] += 1
+        if deadline is not None and counter[0] % 64 == 0 and time.perf_counter() > deadline:
+            raise _Timeout()
+        best, best_matches = None, None
+        for atom in remaining:
+            found = matches(atom)
+            if not found:
+                return False
+            if best is None or len(found) < len(best_matches):
+                best, best_matches = atom, found
+                if len(found) == 1:
+                    break
+        rest = [atom for atom in remaining if atom is not best]
+        for new in best_matches:
+            theta.update(new)
+            if search(rest):
+                return True
+            for var in new:
+                del theta[var]
+        return False
+    try:
+        return search(atoms)
+    except _Timeout:
+        return None
+
+
+def _match(atom, ground, theta):
+    """ Extends theta so that atom becomes some ground atom, and tells whether it could """
+    if atom.name != ground.name:
+        return False
+    for arg, value in zip(atom.arguments, ground.arguments):
+        if type(arg) is Variable:
+            bound = theta.get(arg)
+            if bound is None:
+                theta[arg] = value
+            elif bound != value:
+                return False
+        elif arg != value:
+            return False
+    return True
@@ -0,0 +1,300 @@
+"""
+Knowledge stored in a SQLite database.
+
+The ground facts of each predicate are kept in a table of the database, with
+one column per argument and an index on each of them, so that matching an
+atom is an indexed SQL lookup and that the facts need not fit in memory. The
+other clauses, i.e. rules and facts with variables, are few: they are stored
+in the database as well but are also loaded into an
+andante.knowledge.TreeShapedKnowledge.
+
+Constants are stored as SQL values of their type (integer, real or text),
+other ground terms as the pickle of the term (a blob), which keeps them
+distinct from the constants.
+
+License
+-------
+
+This software is distributed under the terms of both the MIT license and the
+Apache License (Version 2.0).
+
+See LICENSE for details.
+
+Acknowlegment
+-------------
+
+This software has benefited from the support of Wallonia thanks to the funding
+of the ARIAC project (https://trail.ac), a project part of the
+DigitalWallonia4.ai initiative (https://www.digitalwallonia.be).
+
+It was done by Simon Jacquet at the University of Namur (https://www.unamur.be)
+in the period of October 1st 2021 to August 31st 2022 under the supervision of
+Isabelle Linden, Jean-Marie Jacquet and Wim Vanhoof.
+"""
+
+from collections.abc import Iterable
+from heapq import merge
+import pickle
+import sqlite3
+
+from andante.knowledge import Knowledge, TreeShapedKnowledge, _generations, index_key
+from andante.statistics import Statistics, PredicateStatistics
+from andante.logic_concepts import Clause, Predicate, Constant, Variable, Term, extract_variables
+
+
+def to_sql(term):
+    """ Returns the SQL value of a ground term """
+    if type(term) is Constant:
+        return term.value
+    return pickle.dumps(term)
+
+
+def from_sql(value):
+    """ Returns the ground term of a SQL value """
+    if isinstance(value, bytes):
+        return pickle.loads(value)
+    return Constant(value)
+
+
+class FactView:
+    """ Set-like view of the arguments of the facts of a predicate, see andante.knowledge.Knowledge.facts """
+    def __init__(self, knowledge, name):
+        self.knowledge = knowledge
+        self.name = name
+
+    def __contains__(self, arguments):
+        table = self.knowledge._tables.get(self.name)
+        if table is None or not all(isinstance(arg, Term) for arg in arguments):
+            return False
+        return self.knowledge._find(table, arguments) is not None
+
+    def __len__(self):
+        table = self.knowledge._tables.get(self.name)
+        if table is None:
+            return 0
+        return self.knowledge.connection.execute('SELECT COUNT(*) FROM %s' % table).fetchone()[0]
+
+    def __bool__(self):
+        # Tested at every call by andante.solver.CompiledSolver: counting the facts would read them all
+        table = self.knowledge._tables.get(self.name)
+        if table is None:
+            return False
+        return self.knowledge.connection.execute('SELECT EXISTS (SELECT 1 FROM %s)' % table).fetchone()[0] == 1
+
+    def __iter__(self):
+        table = self.knowledge._tables.get(self.name)
+        if table is None:
+            return
+        for row in self.knowledge.connection.execute('SELECT * FROM %s ORDER BY ord' % table):
+            yield tuple(from_sql(value) for value in row[1:])
+
+
+class SQLiteKnowledge(Knowledge):
+    """ Knowledge whose ground facts are stored in a SQLite database, see andante.database
+
+    The database is the file path, or the value of options.database. Opening
+    an existing file gives back the clauses added to it before: the clauses
+    are committed to the file as soon as they are added or removed.
+
+    The generation of the knowledge only tracks the modifications made
+    through this object, not the ones made by other processes sharing the
+    file.
+
+    Attributes
+    ----------
+    connection : sqlite3.Connection
+        The connection to the database
+    rules : andante.knowledge.TreeShapedKnowledge
+        The clauses that are not ground facts
+    """
+    def __init__(self, clauses=None, options=None, path=None):
+        self.options = options
+        self._generation = next(_generations)
+        if path is None:
+            path = options.database if options is not None else ':memory:'
+        self.path = path
+        self.connection = sqlite3.connect(path)
+        with self.connection:
+            self.connection.execute('CREATE TABLE IF NOT EXISTS predicates (name TEXT PRIMARY KEY, symbol TEXT, arity INTEGER, tbl TEXT)')
+            self.connection.execute('CREATE TABLE IF NOT EXISTS rules (ord INTEGER PRIMARY KEY, clause BLOB)')
+        self._tables  = dict() # predicate name -> table of its facts
+        self._symbols = dict() # table -> symbol of its predicate
+        for name, symbol, table in self.connection.execute('SELECT name, symbol, tbl FROM predicates'):
+            self._tables[name] = table
+            self._symbols[table] = symbol
+        self._rank = dict() # rule -> position in the order of addition
+        self.rules = TreeShapedKnowledge(options=options)
+        for ord, blob in self.connection.execute('SELECT ord, clause FROM rules ORDER BY ord'):
+            rule = pickle.loads(blob)
+            self.rules.add(rule)
+            self._rank[rule] = ord
+        # Facts and rules share one sequence, which orders the clauses of a predicate
+        self._next = 1 + max([self._max_ord('rules')] + [self._max_ord(table) for table in self._tables.values()])
+        if clauses is not None:
+            self.add(clauses)
+
+    def _max_ord(self, table):
+        return self.connection.execute('SELECT COALESCE(MAX(ord), 0) FROM %s' % table).fetchone()[0]
+
+    def __len__(self):
+        return len(self.rules.clauses) + sum(len(self.facts(name)) for name in self._tables)
+
+    def __iter__(self):
+        for table in self._tables.values():
+            for row in self.connection.execute('SELECT * FROM %s ORDER BY ord' % table):
+                yield self._clause(table, row)
+        yield from self.rules
+
+    def add(self, clause):
+        # In case input is not a clause but an iterable containing clauses
+        clauses = [clause] if isinstance(clause, Clause) else clause
+        if not isinstance(clauses, Iterable):
+            raise KeyError('Expected andante.logic_concepts.Clause or Iterable object, found : %s' % clause.__class__.__name__)
+        modified = False
+        with self.connection:
+            for clause in clauses:
+                if not isinstance(clause, Clause):
+                    raise TypeError('Iterable contains non-Clause elements: %s' % clause.__class__.__name__)
+                modified |= self._add(clause)
+        if modified:
+            self._generation = next(_generations)
+
+    def _add(self, clause):
+        """ Adds a clause within the current transaction, and tells whether it was not already there """
+        if self._is_fact(clause):
+            table = self._table(clause.head)
+            if clause.head.arity == 0 and self._find(table, ()) is not None:
+                return False
+            values = [to_sql(arg) for arg in clause.head.arguments]
+            cursor = self.connection.execute('INSERT OR IGNORE INTO %s VALUES (%s)' % (table, ', '.join('?'*(len(values)+1))), [self._next] + values)
+            if cursor.rowcount == 0:
+                return False
+        else:
+            if clause in self.rules:
+                return False
+            self.connection.execute('INSERT INTO rules VALUES (?, ?)', (self._next, pickle.dumps(clause)))
+            self.rules.add(clause)
+            self._rank[clause] = self._next
+        self._next += 1
+        return True
+
+    def remove(self, clause):
+        # In case input is not a clause but an iterable containing clauses
+        clauses = [clause] if isinstance(clause, Clause) else clause
+        if not isinstance(clauses, Iterable):
+            raise KeyError('Expected andante.logic_concepts.Clause or Iterable object, found : %s' % clause.__class__.__name__)
+        modified = False
+        with self.connection:
+            for clause in clauses:
+                if self._is_fact(clause):
+                    table = self._tables.get(clause.head.name)
+                    ord = self._find(table, clause.head.arguments) if table else None
+                    if ord is not None:
+                        self.connection.execute('DELETE FROM %s WHERE ord = ?' % table, (ord,))
+                        modified = True
+                elif clause in self.rules:
+                    self.connection.execute('DELETE FROM rules WHERE ord = ?', (self._rank.pop(clause),))
+                    self.rules.remove(clause)
+                    modified = True
+        if modified:
+            self._generation = next(_generations)
+
+    def __contains__(self, clause):
+        if self._is_fact(clause):
+            return clause.head.arguments in self.facts(clause.head.name)
+        return clause in self.rules
+
+    def match(self, atom):
+        """ Returns the clauses whose head may unify with some atom, in the order in which they were added """
+        return list(self.match_iter(atom))
+
+    def match_iter(self, atom):
+        if not self.rules.clausesbyoperator.get(atom.name):
+            return self._select(atom)
+        # Facts are paired with their rank so as to be merged with the rules
+        rules = ((self._rank[rule], rule) for rule in self.rules.match_iter(atom))
+        return (clause for _, clause in merge(self._select(atom, ranked=True), rules, key=lambda x: x[0]))
+
+    def facts(self, name):
+        return FactView(self, name)
+
+    def has_fact(self, atom):
+        return tuple(atom.arguments) in self.facts(atom.name)
+
+    def _compute_statistics(self):
+        # Values of the facts are counted by the database
+        statistics = Statistics()
+        for name, table in self._tables.items():
+            count = self.connection.execute('SELECT COUNT(*) FROM %s' % table).fetchone()[0]
+            if not count:
+                continue
+            arity = int(name.rsplit('/', 1)[1])
+            predicate = statistics.predicates[name] = PredicateStatistics(name, arity)
+            predicate.clauses = predicate.facts = count
+            for position, values in enumerate(predicate.values):
+                for value, n in self.connection.execute('SELECT a%d, COUNT(*) FROM %s GROUP BY a%d' % (position, table, position)):
+                    key = index_key(from_sql(value))
+                    values[key] = values.get(key, 0) + n
+        statistics.update(self.rules.statistics)
+        return statistics
+
+    def _select(self, atom, ranked=False):
+        """ Yields the facts that may unify with some atom, paired with their rank if ranked """
+        table = self._tables.get(atom.name)
+        if table is None:
+            return
+        conditions, values = [], []
+        for i, arg in enumerate(atom.arguments):
+            if isinstance(arg, Variable) or extract_variables(arg):
+                continue
+            conditions.append('a%d = ?' % i)
+            values.append(to_sql(arg))
+        where = ' WHERE ' + ' AND '.join(conditions) if conditions else ''
+        for row in self.connection.execute('SELECT * FROM %s%s ORDER BY ord' % (table, where), values):
+            yield (row[0], self._clause(table, row)) if ranked else self._clause(table, row)
+
+    def _find(self, table, arguments):
+        """ Returns the rank of the fact of some arguments, or None if it is not in the table """
+        conditions = ' AND '.join('a%d = ?' % i for i in range(len(arguments)))
+        query = 'SELECT ord FROM %s%s LIMIT 1' % (table, ' WHERE ' + conditions if conditions else '')
+        row = self.connection.execute(query, [to_sql(arg) for arg in arguments]).fetchone()
+        return row[0] if row is not None else None
+
+    def _table(self, atom):
+        """ Returns the table of the facts of the predicate of some atom, creating it if needed """
+        name = atom.name
+        if name not in self._tables:
+            table = 'facts_%d' % len(self._tables)
+            columns = ''.join(', a%d' % i for i in range(atom.arity))
+            self.connection.execute('CREATE TABLE %s (ord INTEGER PRIMARY KEY%s)' % (table, columns))
+            if atom.arity:
+                self.connection.execute('CREATE UNIQUE INDEX %s_all ON %s (%s)' % (table, table, columns[2:]))
+            for i in range(1, atom.arity):
+                self.connection.execute('CREATE INDEX %s_a%d ON %s (a%d)' % (table, i, table, i))
+            self.connection.execute('INSERT INTO predicates VALUES (?, ?, ?, ?)', (name, atom.symbol, atom.arity, table))
+            self._tables[name] = table
+            self._symbols[table] = atom.symbol
+        return self._tables[name]
+
+    def _clause(self, table, row):
+        """ Returns the fact of a row of a table """
+        return Clause(Predicate(self._symbols[table], [from_sql(value) for value in row[1:]]), [])
+
+    @staticmethod
+    def _is_fact(clause):
+        head = clause.head
+        return not clause.body and head is not None and not extract_variables(head)
+
+    def copy(self):
+        return SQLiteKnowledge(list(self), self.options, ':memory:')
+
+    def close(self):
+        """ Closes the connection to the database """
+        self.connection.close()
+
+    def __getstate__(self):
+        # Connections cannot be pickled: the clauses are saved instead
+        return {'options': self.options, 'path': self.path, 'clauses': list(self) if self.path == ':memory:' else None}
+
+    def __setstate__(self, state):
+        self.__init__(state['clauses'], state['options'], state['path'])
@@ -0,0 +1,764 @@
+"""
+Bottom-up evaluation of the Datalog predicates of a knowledge.
+
+A Datalog clause is a ground fact, or a rule whose atoms have constants and
+variables as arguments and whose other literals are comparisons, every 
+variable of its head appearing in an atom of its body, and every variable
+of a comparison in an atom before it. The relations of the predicates defined by such clauses, and only 
+depending on such predicates, are computed once and for all: the rules of 
+each set of mutually recursive predicates are applied by semi-naive 
+iteration, each round only joining the facts derived by the previous one 
+with the relations of the other atoms, which are indexed by hash on the 
+arguments bound by the join. Recursion, even left recursion or cycles in 
+the facts, always terminates.
+
+An andante.datalog.MaterializedKnowledge resolves the calls to these
+predicates with the facts derived, a call with ground arguments being a
+lookup, and leaves the other predicates to the clauses of its base. The 
+relations are computed on demand, when a predicate is first called.
+
+The relations are kept up to date as the clauses of the base change. The 
+facts and rules added are propagated by semi-naive iteration, the facts 
+derived from them being added. The ones removed are propagated by the DRed
+(delete and rederive) algorithm: the facts derived from them are deleted, 
+and the ones among them that still have another derivation are derived 
+again. Only the facts depending on the change are visited.
+
+License
+-------
+
+This software is distributed under the terms of both the MIT license and the
+Apache License (Version 2.0).
+
+See LICENSE for details.
+
+Acknowlegment
+-------------
+
+This software has benefited from the support of Wallonia thanks to the funding
+of the ARIAC project (https://trail.ac), a project part of the
+DigitalWallonia4.ai initiative (https://www.digitalwallonia.be).
+
+It was done by Simon Jacquet at the University of Namur (https://www.unamur.be)
+in the period of October 1st 2021 to August 31st 2022 under the supervision of
+Isabelle Linden, Jean-Marie Jacquet and Wim Vanhoof.
+"""
+
+from andante.knowledge import Knowledge, OverlayKnowledge
+from andante.logic_concepts import Clause, Predicate, Constant, Variable, extract_variables
+from andante.mathematical_expressions import Comparison, UnificationComparison
+
+
+def is_datalog(clause):
+    """ Tells whether a clause is a Datalog clause: a ground fact or a range restricted rule without compound terms 
+
+    The variables of a comparison must be bound by the atoms before it, so
+    that testing it once they are bound gives the answers of SLD resolution.
+    """
+    head = clause.head
+    if head is None or type(head) is not Predicate:
+        return False
+    if not all(type(arg) is Constant or type(arg) is Variable for arg in head.arguments):
+        return False
+    bound = set()
+    for literal in clause.body:
+        if type(literal) is Predicate:
+            if not all(type(arg) is Constant or type(arg) is Variable for arg in literal.arguments):
+                return False
+            bound.update(literal.arguments)
+        elif not isinstance(literal, Comparison) or not extract_variables(literal) <= bound:
+            return False
+    return extract_variables(head) <= bound
+
+class Relation:
+    """ Set of the rows of arguments of a predicate, indexed by hash on demand
+
+    Attributes
+    ----------
+    rows : dict
+        The rows, tuples of constants, in the order in which they were added
+    indexes : dict
+        Given the positions of some arguments, maps their values to the 
+        rows having them
+    """
+    __slots__ = ('rows', 'indexes')
+
+    def __init__(self, rows=()):
+        self.rows = dict.fromkeys(rows)
+        self.indexes = dict()
+
+    def __len__(self):
+        return len(self.rows)
+
+    def __contains__(self, row):
+        return row in self.rows
+
+    def add(self, rows):
+        """ Adds some rows, which must not be in the relation """
+        self.rows.update(dict.fromkeys(rows))
+        for positions, index in self.indexes.items():
+            for row in rows:
+                key = tuple([row[p] for p in positions])
+                bucket = index.get(key)
+                if bucket is None:
+                    bucket = index[key] = dict()
+                bucket[row] = None
+
+    def remove(self, rows):
+        """ Removes some rows, which must be in the relation """
+        for row in rows:
+            del self.rows[row]
+        for positions, index in self.indexes.items():
+            for row in rows:
+                key = tuple([row[p] for p in positions])
+                bucket = index[key]
+                del bucket[row]
+                if not bucket:
+                    del index[key]
+
+    def lookup(self, positions, key):
+        """ Returns the rows whose arguments at some positions have the values of key """
+        if not positions:
+            return self.rows
+        index = self.indexes.get(positions)
+        if index is None:
+            index = self.indexes[positions] = dict()
+            for row in self.rows:
+                key_ = tuple([row[p] for p in positions])
+                bucket = index.get(key_)
+                if bucket is None:
+                    bucket = index[key_] = dict()
+                bucket[row] = None
+        return index.get(key, ())
+
+    def copy(self):
+        """ Returns a relation of the same rows, whose indexes are built again when needed """
+        return Relation(self.rows)
+
+    def __repr__(self):
+        return 'Relation(rows=%d, indexes=%s)' % (len(self.rows), list(self.indexes))
+
+
+_ATOM, _TEST = 0, 1
+
+def _plan(clause, first=None, bound=False):
+    """ Returns the steps of the join of the body of a rule, starting with its atom at position first, and the parts of its head
+
+    Variables are numbered in the order in which the join binds them, the
+    ones of the head first if they are bound by a row of the predicate of 
+    the rule (see MaterializedKnowledge._derives). An atom step gives the 
+    positions of the arguments that are constants or already bound 
+    variables, which select its rows through an index, with the constants 
+    or slots of these arguments, and the slots bound by its other arguments.
+    A comparison is tested as soon as its variables are bound.
+    """
+    atoms = [literal for literal in clause.body if type(literal) is Predicate]
+    tests = [literal for literal in clause.body if type(literal) is not Predicate]
+    if first is not None:
+        atoms.insert(0, atoms.pop(first))
+    slots = dict()
+    if bound:
+        for arg in clause.head.arguments:
+            if type(arg) is Variable and arg not in slots:
+                slots[arg] = len(slots)
+    steps = []
+    def ready():
+        for test in [t for t in tests if extract_variables(t) <= set(slots)]:
+            tests.remove(test)
+            steps.append((_TEST, test, dict(slots)))
+    ready()
+    for atom in atoms:
+        positions, key, assigns, checks = [], [], [], []
+        for position, arg in enumerate(atom.arguments):
+            if type(arg) is Constant:
+                positions.append(position)
+                key.append((None, arg))
+            elif arg in slots:
+                slot = slots[arg]
+                if any(s == slot for _, s in assigns):
+                    checks.append((position, slot))
+                else:
+                    positions.append(position)
+                    key.append((slot, None))
+            else:
+                slot = slots[arg] = len(slots)
+                assigns.append((position, slot))
+        steps.append((_ATOM, atom.name, tuple(positions), key, assigns, checks))
+        ready()
+    head = [(None, arg) if type(arg) is Constant else (slots[arg], None) for arg in clause.head.arguments]
+    return steps, head, len(slots)
+
+
+def _test(comparison, slots, env):
+    """ Evaluates a comparison whose variables are bound in env """
+    resolved = comparison.apply(lambda term: env[slots[term]] if type(term) is Variable else term)
+    if type(resolved) is UnificationComparison and resolved.symbol in ('=', '\\='):
+        return (resolved.arg1 == resolved.arg2) == (resolved.symbol == '=')
+    return resolved.evaluate(dict())
+
+
+class MaterializedKnowledge(Knowledge):
+    """ Knowledge whose Datalog predicates are resolved with their relations, computed bottom-up, see andante.datalog
+
+    The knowledge is a view of its base. The predicates that are not 
+    Datalog are resolved with the clauses of the base. When the base is 
+    modified, update brings the relations up to date, see 
+    andante.datalog.materialize.
+
+    Attributes
+    ----------
+    base : andante.knowledge.Knowledge
+        The knowledge whose predicates are materialized
+    parent : andante.datalog.MaterializedKnowledge
+        A view whose relations are the ones of the predicates of the base
+        that do not depend on the predicates changed, or None
+    changed : set of str
+        The names of the predicates whose clauses differ from the ones of 
+        the base of the parent
+    relations : dict of andante.datalog.Relation
+        Given the name of a predicate materialized so far, returns its relation
+    """
+    def __init__(self, base, parent=None, changed=()):
+        self.options = getattr(base, 'options', None)
+        self.base = base
+        self.parent = parent
+        self.changed = set(changed)
+        self.relations = dict()
+        self._facts = dict()   # name -> andante.datalog.Relation of the ground facts of a predicate without rules
+        self._kinds = dict()   # name -> (rules, callees, ground facts), None if not materialized
+        self._symbols = dict() # name -> symbol
+        self._plans = dict()   # (rule, first atom, bound head) -> plan, see andante.datalog._plan
+        self._shared = set()   # ids of the relations of the parent, copied before being modified
+        
+    def _clauses(self, name):
+        """ Returns the clauses of the base of the predicate of some name """
+        symbol, arity = name.rsplit('/', 1)
+        self._symbols[name] = symbol
+        return self.base.match_iter(Predicate(symbol, [Variable('_%d' % i) for i in range(int(arity))]))
+
+    def _plan(self, rule, first=None, bound=False):
+        plan = self._plans.get((rule, first, bound))
+        if plan is None:
+            plan = self._plans[rule, first, bound] = _plan(rule, first, bound)
+        return plan
+
+    def materialized(self, name):
+        """ Returns the relation of a predicate computed bottom-up, or None if it is not a Datalog predicate with rules """
+        relation = self.relations.get(name)
+        if relation is not None or self._kinds.get(name, False) is None:
+            return relation
+        # Exploration of the predicates it depends on
+        kinds, bad, stack = dict(), set(), [name]
+        while stack:
+            n = stack.pop()
+            if n in kinds:
+                continue
+            if n in self.relations or self._kinds.get(n, False) is None:
+                kinds[n] = self._kinds.get(n)
+                # Not materialized before either because it only has ground facts or because it is not Datalog
+                statistics = self.base.statistics.get(n)
+                if kinds[n] is None and statistics is not None and statistics.facts < statistics.clauses:
+                    bad.add(n)
+                continue
+            rules, callees, facts, datalog = [], set(), dict(), True
+            for clause in self._clauses(n):
+                if not is_datalog(clause):
+                    datalog = False
+                    break
+                if clause.body:
+                    rules.append(clause)
+                    callees.update(literal.name for literal in clause.body if type(literal) is Predicate)
+                else:
+                    facts[tuple(clause.head.arguments)] = None
+            if not datalog:
+                bad.add(n)
+            kinds[n] = (rules, callees, facts) if rules else None
+            stack.extend(callees)
+        # A predicate depending on a predicate that is not Datalog is not materialized
+        callers = dict()
+        for n, kind in kinds.items():
+            for callee in (kind[1] if kind is not None else ()):
+                callers.setdefault(callee, set()).add(n)
+        stack = list(bad)
+        while stack:
+            n = stack.pop()
+            kinds[n] = None
+            for caller in callers.get(n, ()):
+                if caller not in bad:
+                    bad.add(caller)
+                    stack.append(caller)
+        for n, kind in kinds.items():
+            if n not in self.relations:
+                self._kinds[n] = kind
+        if self._kinds.get(name) is not None:
+            for component in self._components(name):
+                self._evaluate(component)
+        return self.relations.get(name)
+
+    def relation(self, name, derived=True):
+        """ Returns the relation of a predicate: its materialized relation if derived is True, the relation of its facts if it only has ground facts, None otherwise """
+        if derived:
+            relation = self.materialized(name)
+            if relation is not None:
+                return relation
+        statistics = self.base.statistics.get(name)
+        if statistics is not None and statistics.facts < statistics.clauses:
+            return None
+        return self._relation(name)
+
+    def dependencies(self, name):
+        """ Returns the names of the predicates a materialized predicate depends on """
+        seen, stack = set(), [name]
+        while stack:
+            kind = self._kinds.get(stack.pop())
+            for callee in (kind[1] if kind is not None else ()):
+                if callee not in seen:
+                    seen.add(callee)
+                    stack.append(callee)
+        return seen
+
+    def _components(self, name):
+        """ Returns the sets of mutually recursive predicates, not yet materialized, some predicate depends on, the ones depended on first """
+        # Tarjan's algorithm, whose components come out in that order
+        index, low, stack, onstack, components = dict(), dict(), [], set(), []
+        def visit(n):
+            index[n] = low[n] = len(index)
+            stack.append(n)
+            onstack.add(n)
+            for callee in self._kinds[n][1]:
+                if callee in self.relations or self._kinds.get(callee) is None:
+                    continue
+                if callee not in index:
+                    visit(callee)
+                    low[n] = min(low[n], low[callee])
+                elif callee in onstack:
+                    low[n] = min(low[n], index[callee])
+            if low[n] == index[n]:
+                component = []
+                while True:
+                    m = stack.pop()
+                    onstack.discard(m)
+                    component.append(m)
+                    if m == n: break
+                components.append(component)
+        visit(name)
+        return components
+
+    def _touched(self, names):
+        """ Tells whether some predicates depend on a predicate changed since the parent """
+        seen, stack = set(), list(names)
+        while stack:
+            n = stack.pop()
+            if n in self.changed:
+                return True
+            if n not in seen:
+                seen.add(n)
+                kind = self._kinds.get(n)
+                stack.extend(kind[1] if kind is not None else ())
+        return False
+
+    def _relation(self, name):
+        """ Returns the relation of a predicate called by a rule: its relation if it is materialized, its ground facts otherwise """
+        relation = self.relations.get(name)
+        if relation is not None:
+            return relation
+        relation = self._facts.get(name)
+        if relation is None:
+            if self.parent is not None and name not in self.changed:
+                relation = self.parent._relation(name)
+                self._shared.add(id(relation))
+            else:
+                relation = Relation(tuple(clause.head.arguments) for clause in self._clauses(name))
+            self._facts[name] = relation
+        return relation
+
+    def _writable(self, name):
+        """ Returns the relation of a predicate, materialized or called by a rule, to be modified """
+        table = self.relations if name in self.relations else self._facts
+        relation = table[name]
+        if id(relation) in self._shared:
+            # The relations of the parent are left untouched
+            self._shared.discard(id(relation))
+            relation = table[name] = relation.copy()
+        return relation
+
+    def _evaluate(self, component):
+        """ Computes the relations of some mutually recursive predicates by semi-naive iteration """
+        if self.parent is not None and not self._touched(component):
+            for n in component:
+                relation = self.relations[n] = self.parent.materialized(n)
+                self._shared.add(id(relation))
+            return
+        for n in component:
+            self.relations[n] = Relation(self._kinds[n][2])
+        rules = [rule for n in component for rule in self._kinds[n][0]]
+        # First round: the rules are applied to the whole relations
+        delta = {n: dict() for n in component}
+        for rule in rules:
+            self._join(self._plan(rule), None, self._collect(rule.head.name, delta))
+        self._insert(delta, rules)
+
+    def _collect(self, name, delta):
+        """ Returns the function adding to delta the rows derived for a predicate that are not in its relation """
+        relation = self.relations[name]
+        rows = delta.setdefault(name, dict())
+        def collect(row):
+            if row not in relation:
+                rows[row] = None
+        return collect
+
+    def _uses(self, rules):
+        """ Returns a dict mapping the name of each predicate to the rules, and the positions among their atoms, of its calls """
+        uses = dict()
+        for rule in rules:
+            atoms = [literal for literal in rule.body if type(literal) is Predicate]
+            for i, atom in enumerate(atoms):
+                uses.setdefault(atom.name, []).append((rule, i))
+        return uses
+
+    def _rules(self):
+        """ Returns the rules of the predicates materialized """
+        return [rule for n in self.relations for rule in self._kinds[n][0]]
+
+    def _insert(self, delta, rules=None):
+        """ Adds rows to relations, and the rows derived from them by semi-naive iteration
+
+        Parameters
+        ----------
+        delta : dict
+            Given the name of a predicate, returns the rows, as keys, to add
+            to its relation, which must not be in it yet
+        rules : list of andante.logic_concepts.Clause
+            The rules applied, by default the ones of all the predicates 
+            materialized
+        """
+        uses = self._uses(self._rules() if rules is None else rules)
+        while delta:
+            deltas = dict()
+            for n, rows in delta.items():
+                if rows:
+                    self._writable(n).add(list(rows))
+                    deltas[n] = Relation(rows)
+            # Each round, an atom of a rule at least is joined with the rows of the previous round only
+            delta = dict()
+            for n, rows in deltas.items():
+                for rule, i in uses.get(n, ()):
+                    self._join(self._plan(rule, i), rows, self._collect(rule.head.name, delta))
+            delta = {n: rows for n, rows in delta.items() if rows}
+
+    def _delete(self, deleted, rules=None):
+        """ Removes rows from relations, and the rows derived from them that have no other derivation, by the DRed algorithm
+
+        The rows depending on the ones deleted are first deleted as well, by
+        semi-naive iteration over the relations before the deletion. Those 
+        of them that are still ground facts of their predicate, or that are
+        derived in one step from what remains, are then added back with the
+        rows derived from them.
+
+        Parameters
+        ----------
+        deleted : dict
+            Given the name of a predicate, returns the rows, as keys, to 
+            remove from its relation, which must be in it
+        rules : list of andante.logic_concepts.Clause
+            The rules applied, by default the ones of all the predicates 
+            materialized
+        """
+        uses = self._uses(self._rules() if rules is None else rules)
+        overdeleted = {n: dict(rows) for n, rows in deleted.items()}
+        frontier = deleted
+        while frontier:
+            new = dict()
+            for n, rows in frontier.items():
+                rows = Relation(rows)
+                for rule, i in uses.get(n, ()):
+                    head = rule.head.name
+                    relation, done, found = self.relations[head], overdeleted.setdefault(head, dict()), new.setdefault(head, dict())
+                    def collect(row, relation=relation, done=done, found=found):
+                        if row in relation and row not in done:
+                            found[row] = None
+                    self._join(self._plan(rule, i), rows, collect)
+            frontier = {n: rows for n, rows in new.items() if rows}
+            for n, rows in frontier.items():
+                overdeleted[n].update(rows)
+        for n, rows in overdeleted.items():
+            if rows:
+                self._writable(n).remove(list(rows))
+        # Rederivation of the rows deleted from the relations of the predicates materialized
+        rederived = dict()
+        for n, rows in overdeleted.items():
+            kind = self._kinds.get(n) if n in self.relations else None
+            if kind is None:
+                continue
+            rules_n, _, facts = kind
+            rederived[n] = {row: None for row in rows if row in facts or any(self._derives(rule, row) for rule in rules_n)}
+        self._insert({n: rows for n, rows in rederived.items() if rows}, rules)
+
+    def _derives(self, rule, row):
+        """ Tells whether a rule derives some row of its predicate from the relations """
+        steps, head, nslots = self._plan(rule, None, True)
+        env = [None] * nslots
+        for value, (slot, arg) in zip(row, head):
+            if slot is None:
+                if value != arg:
+                    return False
+            elif env[slot] is None:
+                env[slot] = value
+            elif env[slot] != value:
+                return False
+        return self._join((steps, head, nslots), None, lambda row: True, env)
+
+    def _join(self, plan, first, collect, env=None):
+        """ Calls collect with each row of the head of a rule derived by the join of its body, and tells whether collect stopped it
+
+        The first atom of the plan is joined with the relation first, if it
+        is not None. The join stops as soon as collect returns True.
+        """
+        steps, head, nslots = plan
+        if env is None:
+            env = [None] * nslots
+        sources = [first if i == 0 and first is not None else (self._relation(step[1]) if step[0] is _ATOM else None)
+                   for i, step in enumerate(steps)]
+        last = len(steps)
+        def join(i):
+            if i == last:
+                return collect(tuple([arg if slot is None else env[slot] for slot, arg in head]))
+            step = steps[i]
+            if step[0] is _TEST:
+                return _test(step[1], step[2], env) and join(i + 1)
+            _, name, positions, key, assigns, checks = step
+            rows = sources[i].lookup(positions, tuple([arg if slot is None else env[slot] for slot, arg in key]))
+            for row in rows:
+                for position, slot in assigns:
+                    env[slot] = row[position]
+                if checks and any(row[position] != env[slot] for position, slot in checks):
+                    continue
+                if join(i + 1):
+                    return True
+            return False
+        return join(0)
+
+    def update(self, clauses):
+        """ Brings the relations up to date with some clauses added to or removed from the base
+
+        Whether a clause was added or removed is told by the base. The 
+        ground facts added to a predicate materialized or called by one are
+        propagated to the relations depending on them, as are the Datalog 
+        rules added to a predicate materialized, by semi-naive iteration. 
+        The ground facts and rules removed are propagated by the DRed 
+        algorithm. The other changes, e.g. a rule added to a predicate that 
+        had none or a clause that is not Datalog, drop the relations of the
+        predicates depending on them, which are computed again when called.
+        """
+        inserted, deleted, added, removed, dropped = dict(), dict(), [], [], set()
+        for clause in clauses:
+            head = clause.head
+            if head is None:
+                continue
+            name = head.name
+            if self.parent is not None:
+                self.changed.add(name)
+            present = clause in self.base
+            datalog = is_datalog(clause)
+            if name in self.relations:
+                rules, callees, facts = self._kinds[name]
+                if datalog and not clause.body:
+                    row = tuple(head.arguments)
+                    if present and row not in facts:
+                        facts[row] = None
+                        if row not in self.relations[name]:
+                            inserted.setdefault(name, dict())[row] = None
+                    elif not present and row in facts:
+                        del facts[row]
+                        deleted.setdefault(name, dict())[row] = None
+                elif datalog:
+                    if present and clause not in rules:
+                        names = [literal.name for literal in clause.body if type(literal) is Predicate]
+                        if all(n in self.relations or n in self._facts for n in names):
+                            added.append(clause)
+                        else:
+                            dropped.add(name)
+                    elif not present and clause in rules:
+                        removed.append(clause)
+                elif present:
+                    dropped.add(name)
+            elif name in self._facts:
+                if datalog and not clause.body:
+                    row = tuple(head.arguments)
+                    if present and row not in self._facts[name]:
+                        inserted.setdefault(name, dict())[row] = None
+                    elif not present and row in self._facts[name]:
+                        deleted.setdefault(name, dict())[row] = None
+                elif present:
+                    dropped.add(name)
+            elif name in self._kinds:
+                dropped.add(name)
+        if dropped:
+            dropped = self._drop(dropped)
+            inserted = {n: rows for n, rows in inserted.items() if n not in dropped}
+            deleted = {n: rows for n, rows in deleted.items() if n not in dropped}
+            added = [rule for rule in added if rule.head.name not in dropped]
+            removed = [rule for rule in removed if rule.head.name not in dropped]
+        # Deletions, the rows derived by the rules removed being deleted as well
+        for rule in removed:
+            name = rule.head.name
+            self._kinds[name][0].remove(rule)
+            self._join(self._plan(rule), None, self._collect_present(name, deleted))
+        for rule in removed:
+            self._update_callees(rule.head.name)
+        deleted = {n: {row: None for row in rows if row in self._relation(n)} for n, rows in deleted.items()}
+        deleted = {n: rows for n, rows in deleted.items() if rows}
+        if deleted:
+            self._delete(deleted)
+        # Insertions, the rows derived by the rules added being inserted as well
+        for rule in added:
+            name = rule.head.name
+            self._kinds[name][0].append(rule)
+            self._kinds[name][1].update(literal.name for literal in rule.body if type(literal) is Predicate)
+            self._join(self._plan(rule), None, self._collect_absent(name, inserted))
+        inserted = {n: rows for n, rows in inserted.items() if rows}
+        if inserted:
+            self._insert(inserted)
+
+    def _collect_present(self, name, rows):
+        """ Returns the function adding to rows[name] the rows derived for a predicate that are in its relation """
+        relation, found = self.relations[name], rows.setdefault(name, dict())
+        def collect(row):
+            if row in relation:
+                found[row] = None
+        return collect
+
+    def _collect_absent(self, name, rows):
+        """ Returns the function adding to rows[name] the rows derived for a predicate that are not in its relation """
+        relation, found = self.relations[name], rows.setdefault(name, dict())
+        def collect(row):
+            if row not in relation:
+                found[row] = None
+        return collect
+
+    def _update_callees(self, name):
+        """ Computes again the predicates called by the rules of a predicate materialized """
+        rules, callees, facts = self._kinds[name]
+        callees.clear()
+        for rule in rules:
+            callees.update(literal.name for literal in rule.body if type(literal) is Predicate)
+
+    def _drop(self, names):
+        """ Forgets what was computed for some predicates and the ones depending on them, and returns their names """
+        callers = dict()
+        for n, kind in self._kinds.items():
+            for callee in (kind[1] if kind is not None else ()):
+                callers.setdefault(callee, set()).add(n)
+        dropped, stack = set(names), list(names)
+        while stack:
+            for caller in callers.get(stack.pop(), ()):
+                if caller not in dropped:
+                    dropped.add(caller)
+                    stack.append(caller)
+        for n in dropped:
+            self.relations.pop(n, None)
+            self._facts.pop(n, None)
+            self._kinds.pop(n, None)
+        return dropped
+
+    def __iter__(self):
+        names = set()
+        for clause in self.base:
+            name = clause.head.name if clause.head is not None else None
+            if name is not None and self.materialized(name) is not None:
+                names.add(name)
+            else:
+                yield clause
+        for name in names:
+            symbol = self._symbols.get(name) or name.rsplit('/', 1)[0]
+            for row in self.relations[name].rows:
+                yield Clause(Predicate(symbol, list(row)), [])
+
+    def match(self, atom):
+        return list(self.match_iter(atom))
+
+    def match_iter(self, atom):
+        """ Returns a lazy iterator over the clauses that match some atom: the facts of its relation if its predicate is materialized """
+        relation = self.materialized(atom.name)
+        if relation is None:
+            return self.base.match_iter(atom)
+        positions, key = [], []
+        for position, arg in enumerate(atom.arguments):
+            if type(arg) is Constant:
+                positions.append(position)
+                key.append(arg)
+            elif type(arg) is not Variable:
+                # Compound terms are never arguments of the facts derived
+                return iter(())
+        rows = relation.lookup(tuple(positions), tuple(key))
+        return (Clause(Predicate(atom.symbol, list(row)), []) for row in list(rows))
+
+    def __contains__(self, clause):
+        head = clause.head
+        if head is not None and not clause.body and self.materialized(head.name) is not None:
+            return tuple(head.arguments) in self.relations[head.name]
+        return clause in self.base
+
+    def facts(self, name):
+        relation = self.materialized(name)
+        if relation is None:
+            return self.base.facts(name)
+        return relation.rows.keys()
+
+    def has_fact(self, atom):
+        relation = self.materialized(atom.name)
+        if relation is None:
+            return self.base.has_fact(atom)
+        return tuple(atom.arguments) in relation.rows
+
+    def add(self, clause):
+        raise TypeError('andante.datalog.MaterializedKnowledge cannot be modified, modify its base instead')
+
+    def remove(self, clause):
+        raise TypeError('andante.datalog.MaterializedKnowledge cannot be modified, modify its base instead')
+
+    @property
+    def generation(self):
+        return self.base.generation
+
+    @property
+    def statistics(self):
+        return self.base.statistics
+
+    def copy(self):
+        return MaterializedKnowledge(self.base.copy())
+
+
+def materialize(knowledge):
+    """ Returns the andante.datalog.MaterializedKnowledge of some knowledge
+
+    It is kept on the knowledge. When the knowledge keeps a journal of its
+    modifications (see andante.knowledge.Knowledge.journal), the view is 
+    updated with the clauses added and removed since it was last used, 
+    otherwise it is computed again when the generation of the knowledge 
+    changes. The view of an andante.knowledge.OverlayKnowledge shares the 
+    relations of the view of its base that do not depend on the predicates
+    it modifies, and is computed again when its base is modified.
+    """
+    if isinstance(knowledge, MaterializedKnowledge):
+        return knowledge
+    generation = knowledge.generation
+    cached = getattr(knowledge, '_materialized', None)
+    if cached is not None and cached[0] != generation:
+        previous, view, journal = cached
+        if isinstance(knowledge, OverlayKnowledge) and previous[1] != generation[1]:
+            # The journal of an overlay does not tell the modifications of its base
+            journal = None
+        if journal is not None:
+            view.update(journal.read())
+            cached = knowledge._materialized = (generation, view, journal)
+        else:
+            cached = None
+    if cached is None:
+        if isinstance(knowledge, OverlayKnowledge):
+            changed = set(knowledge.delta.clausesbyoperator) | set(knowledge.removed)
+            view = MaterializedKnowledge(knowledge, materialize(knowledge.base), changed)
+        else:
+            view = MaterializedKnowledge(knowledge)
+        cached = knowledge._materialized = (generation, view, knowledge.journal())
+    return cached[1]
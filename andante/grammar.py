@@ -49,9 +49,10 @@ GRAMMAR = Grammar(
     background       = ":-" __ "begin_bg"     __ "." __ (hornclause __)+ __ ":-" __ "end_bg"     __ "."
     pos_ex           = ":-" __ "begin_in_pos" __ "." __ (hornclause __)+ __ ":-" __ "end_in_pos" __ "."
     neg_ex           = ":-" __ "begin_in_neg" __ "." __ (hornclause __)+ __ ":-" __ "end_in_neg" __ "."
-    hclause          = mode / determination / set
+    hclause          = mode / determination / set / table
     determination = "determination" __ "(" __ predname __ "/" __ integer __ ("," __ predname __ "/" __ integer __)+ ")" __ "."    
     set           = "set" __ "(" __ word __ "," __ value __ ")" __ "."
+    table         = ":-" __ "table" __ predname __ "/" __ integer __ ("," __ predname __ "/" __ integer __)* "."
     
     
             #-----------------------------------------------------#
@@ -63,7 +64,7 @@ GRAMMAR = Grammar(
     definiteclause   = head __ (":-" __ body)? __ "."
     head             = atom
     body             = atom __ ("," __ atom __)*
-    atom             = "true" / "false" / predicate / comparison / is_evaluation
+    atom             = "true" / "false" / cut / once / if_then_else / predicate / comparison / is_evaluation
     predicate        = predname __ "(" __ term __ ("," __ term __)* ")"
     term             = compoundterm / variable / constant 
     compoundterm     = funcname __ "(" __ term __ ("," __ term __)* ")"
@@ -103,6 +104,15 @@ GRAMMAR = Grammar(
     negation  = "not" __ "(" __ goal __ ")"
     
     
+            #-----------------------------------------------------#
+            #             Grammar wrt control constructs          #
+            #-----------------------------------------------------#
+    
+    cut          = "!"
+    once         = "once" __ "(" __ goal __ ")"
+    if_then_else = "(" __ goal __ "->" __ goal __ (";" __ goal __)? ")"
+    
+    
             #-----------------------------------------------------#
             #         Grammar wrt arithmetic operations           #
             #-----------------------------------------------------#
@@ -35,6 +35,9 @@ from andante.logic_concepts import (
     Constant, 
     Negation, 
     Goal, 
+    Cut,
+    Once,
+    IfThenElse,
     Type, 
     List,
 )
@@ -140,12 +143,14 @@ class Visitor(NodeVisitor):
         return program
     
     def visit_header(self, node, visited_children):
-        header = {'mode':list(), 'determination':list(), 'set':list()}
+        header = {'mode':list(), 'determination':list(), 'set':list(), 'table':list()}
         for node_child, (visited_child, _) in zip(node, visited_children):
             header[node_child.children[0].children[0].expr_name].append(visited_child)
             
         mhandler = ModeCollection(header['mode'], header['determination'])
         options  = Options(header['set'])
+        if header['table']:
+            options.table = tuple(name for names in header['table'] for name in names)
         return {'modehandler':mhandler, 'options':options}
         
     visit_hclause    = visit_choice
@@ -162,6 +167,10 @@ class Visitor(NodeVisitor):
     def visit_set(self, node, visited_children):
         _, _, _, _, attr, _, _, _, value, _, _, _, _ = visited_children
         return (attr, value)
+    
+    def visit_table(self, node, visited_children):
+        _, _, _, _, name, _, _, _, nargs, _, l_others, _ = visited_children
+        return ['%s/%d'%(name, nargs)] + ['%s/%d'%(other_name, other_nargs) for _, _, other_name, _, _, _, other_nargs, _ in l_others]
      
     
             #-----------------------------------------------------#
@@ -272,9 +281,9 @@ class Visitor(NodeVisitor):
 
     def visit_goal(self, node, visited_children) -> Goal:
         el0, _, l_e = visited_children
-        g = Goal((el0,))
-        g.extend(e for _, _, e, _ in l_e)
-        return g
+        # true is left out of the conjunction, false is the negation of the empty goal
+        literals = [el0] + [e for _, _, e, _ in l_e]
+        return Goal(Negation(Goal()) if l == 'false' else l for l in literals if l != 'true')
     
     visit_goal_unit = visit_choice
     
@@ -283,6 +292,22 @@ class Visitor(NodeVisitor):
         return Negation(goal)
     
 
+            #-----------------------------------------------------#
+            #             Grammar wrt control constructs          #
+            #-----------------------------------------------------#
+    
+    visit_cut = lambda self, node, visited_children: Cut()
+    
+    def visit_once(self, node, visited_children) -> Once:
+        _, _, _, _, goal, _, _ = visited_children
+        return Once(goal)
+    
+    def visit_if_then_else(self, node, visited_children) -> IfThenElse:
+        _, _, condition, _, _, _, then, _, opt_else, _ = visited_children
+        otherwise = opt_else[0][2] if opt_else else None
+        return IfThenElse(condition, then, otherwise)
+    
+
             #-----------------------------------------------------#
             #         Grammar wrt arithmetic operations           #
             #-----------------------------------------------------#
@@ -24,8 +24,10 @@ Isabelle Linden, Jean-Marie Jacquet and Wim Vanhoof.
 
 from abc import ABC
 from andante.logic_concepts import Clause, Type, extract_variables
-from andante.knowledge import MultipleKnowledge, TreeShapedKnowledge
+from andante.knowledge import OverlayKnowledge
 from andante.substitution import Substitution
+from andante.collections import count_of
+import andante.coverage
 
 class HypothesisMetric(ABC):
     """ Abstract class for all hypothesis metrics.
@@ -60,13 +62,17 @@ class FnMetric(HypothesisMetric):
     B: andante.knowledge.Knowledge
         The background knowledge
     E: dict
-        Set of examples
+        Set of examples, the position of an example in its list being its
+        bit in the coverage of the states
     bottom: andante.logic_concepts.Clause
         The bottom clause
     solver: andante.solver.Solver
         The deduction engine
     options: andante.options.Options
         All options
+    coverage: andante.coverage.ProofCoverage
+        Computes the examples covered by the candidate clauses, see the 
+        option coverage
     subst: andante.substitution.Substitution
         Defines the domain of variables
     d: dict (andante.logic_concepts.Variable -> int)
@@ -87,6 +93,24 @@ class FnMetric(HypothesisMetric):
         self.subst.add_variables(self.bottom)
         
         self.build_d()
+        self._knowledges = dict()
+        coverage = options.coverage
+        if isinstance(coverage, str):
+            coverage = getattr(andante.coverage, coverage)
+        self.coverage = coverage(B, M, solver, options)
+        
+    def knowledge_with(self, clause):
+        """ Returns the background knowledge extended with some clause
+
+        The same object is returned for the same clause, so that the answers
+        cached by the solver for a clause are reused by all its states. The
+        clause comes first, so that the examples it covers are proven by it
+        before the clauses of the background knowledge are tried. The 
+        background knowledge is overlaid, not copied.
+        """
+        if clause not in self._knowledges:
+            self._knowledges[clause] = OverlayKnowledge(self.B, [clause], options=self.options)
+        return self._knowledges[clause]
         
     def build_d(self):
 
@@ -137,8 +161,9 @@ class FnMetric(HypothesisMetric):
             clause: the hypothesis at hand
             B: the knowledge composed from hm.B and clause
             k: position in the bottom clause
-            E: the positive and negative examples
-            E_cov: the examples covered
+            E: the bits of the positive and negative examples tested, all of 
+               the examples of hm by default
+            E_cov: the bits of the examples covered, see andante.coverage
             
             The metrics are as follow:
             p: the number of positive examples covered by B
@@ -150,18 +175,18 @@ class FnMetric(HypothesisMetric):
             """
             self.hm = hm            
             self.clause = clause
-            self.B = MultipleKnowledge(hm.B, TreeShapedKnowledge([clause],options=hm.options))
+            self.B = hm.knowledge_with(clause)
             self.k = k
-            self.E = E if E is not None else hm.E
-            self.E_cov = {label:[e for e in self.E[label] if hm.solver.succeeds_on(e.head, self.B, verbose=0)] for label in self.E}
+            self.E = E if E is not None else {label:(1 << len(hm.E[label])) - 1 for label in hm.E}
+            self.E_cov = {label:hm.coverage.covered(clause, hm.E[label], self.B, self.E[label]) for label in self.E}
             
             self.InVars = extract_variables(self.clause.body) | self.hm.InVars
             self.str_id = '%s %d' % (str(self.clause), self.k)
 
             # Metrics for the state
             # - c: the number of atoms in the body of C
-            self.p = len(self.E_cov['pos'])
-            self.n = len(self.E_cov['neg'])
+            self.p = count_of(self.E_cov['pos'])
+            self.n = count_of(self.E_cov['neg'])
             self.c = len(self.clause.body)
             self.h = hm.d_of_clause(self.clause)
             if self.n > 0:
@@ -0,0 +1,350 @@
+"""
+Binary images of knowledges, opened with mmap.
+
+Building a large knowledge means parsing its source or unpickling all its
+clauses, which takes seconds to minutes. An image is a file holding a
+knowledge in the layout of an andante.columnar.ColumnarKnowledge: the ground
+terms interned in a symbol table, the facts of each predicate as arrays of
+codes and, for each argument, the rows sorted by code used to select facts.
+Opening an image maps the file in memory instead of reading it: the arrays
+are used in place and the terms are only decoded when a fact using them is
+matched, so that opening is near-instant and that processes opening the
+same image share its pages.
+
+The clauses of predicates having rules are few: they are pickled in the
+image and loaded into an andante.knowledge.TreeShapedKnowledge when it is
+opened.
+
+Layout
+------
+
+The file starts with a header: the magic bytes MAGIC, the version of the
+format, the pickle protocol used, and the offset and length of the
+directory, a JSON object stored at the end of the file giving the offsets
+of the sections. Sections are aligned on 8 bytes.
+
+The symbol table is made of the pickles of the terms, concatenated, with
+their offsets, and of a hash of each pickle, sorted, with the codes of the
+terms in the same order, so that the code of a term is found by binary
+search without decoding the table.
+
+License
+-------
+
+This software is distributed under the terms of both the MIT license and the
+Apache License (Version 2.0).
+
+See LICENSE for details.
+
+Acknowlegment
+-------------
+
+This software has benefited from the support of Wallonia thanks to the funding
+of the ARIAC project (https://trail.ac), a project part of the
+DigitalWallonia4.ai initiative (https://www.digitalwallonia.be).
+
+It was done by Simon Jacquet at the University of Namur (https://www.unamur.be)
+in the period of October 1st 2021 to August 31st 2022 under the supervision of
+Isabelle Linden, Jean-Marie Jacquet and Wim Vanhoof.
+"""
+
+from collections.abc import Iterable
+from itertools import chain
+import hashlib
+import json
+import mmap
+import pickle
+import struct
+import numpy as np
+
+from andante.columnar import ColumnarKnowledge, Relation, SymbolTable
+from andante.knowledge import Knowledge, TreeShapedKnowledge, _generations
+from andante.logic_concepts import Clause, extract_variables
+from andante.statistics import CombinedStatistics
+
+MAGIC = b'ANDIMG\x00\x00'
+VERSION = 1
+PROTOCOL = 4
+HEADER = struct.Struct('<8sIIQQ') # magic, version, pickle protocol, offset and length of the directory
+
+
+def term_hash(data):
+    """ Returns the hash of the pickle of a term stored in the symbol table """
+    return int.from_bytes(hashlib.blake2b(data, digest_size=8).digest(), 'little')
+
+
+def is_fact(clause):
+    """ Tells whether a clause is a ground unit clause """
+    head = clause.head
+    return not clause.body and head is not None and not extract_variables(head)
+
+
+class MappedTerms:
+    """ Terms of a mapped symbol table, decoded when they are first accessed """
+    def __init__(self, offsets, data):
+        self.offsets = offsets
+        self.data = data
+        self.size = len(offsets) - 1
+        self._decoded = dict()
+        self._added = [] # Terms interned after the image was opened
+
+    def __len__(self):
+        return self.size + len(self._added)
+
+    def __getitem__(self, code):
+        if code >= self.size:
+            return self._added[code - self.size]
+        term = self._decoded.get(code)
+        if term is None:
+            term = self._decoded[code] = pickle.loads(self.data[int(self.offsets[code]):int(self.offsets[code+1])])
+        return term
+
+    def append(self, term):
+        self._added.append(term)
+
+
+class MappedCodes:
+    """ Codes of the terms of a mapped symbol table, found by binary search on the hashes of their pickle """
+    def __init__(self, offsets, data, hashes, order):
+        self.offsets = offsets
+        self.data = data
+        self.hashes = hashes
+        self.order = order
+        self._codes = dict() # term -> code, or None if it is not in the image
+
+    def get(self, term, default=None):
+        try:
+            code = self._codes[term]
+        except KeyError:
+            code = self._codes[term] = self._search(term)
+        return default if code is None else code
+
+    def __setitem__(self, term, code):
+        self._codes[term] = code
+
+    def _search(self, term):
+        data = pickle.dumps(term, PROTOCOL)
+        key = np.uint64(term_hash(data))
+        i = int(np.searchsorted(self.hashes, key))
+        while i < len(self.hashes) and self.hashes[i] == key:
+            code = int(self.order[i])
+            if self.data[int(self.offsets[code]):int(self.offsets[code+1])] == data:
+                return code
+            i += 1
+        return None
+
+
+class MappedSymbolTable(SymbolTable):
+    """ Symbol table of an image, see andante.image """
+    def __init__(self, offsets, data, hashes, order):
+        self.terms = MappedTerms(offsets, data)
+        self.codes = MappedCodes(offsets, data, hashes, order)
+
+
+class ImageKnowledge(Knowledge):
+    """ Knowledge opened from an image, see andante.image
+
+    The knowledge can be modified: the facts added are appended to copies of
+    the arrays of their predicate, the image itself is never written. The
+    modifications are kept so that pickling the knowledge only saves them and
+    the path of the image.
+
+    Attributes
+    ----------
+    path : str
+        The file of the image
+    facts_store : andante.columnar.ColumnarKnowledge
+        The ground facts of the predicates having no rules
+    rules : andante.knowledge.TreeShapedKnowledge
+        The clauses of the predicates having rules
+    """
+    def __init__(self, path, options=None):
+        self.path = path
+        self.options = options
+        self._generation = next(_generations)
+        self._changes = [] # (added, clause) in the order of the modifications
+        with open(path, 'rb') as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(self._map) < HEADER.size:
+            raise ValueError('Not an andante knowledge image: %s' % path)
+        magic, version, protocol, offset, length = HEADER.unpack_from(self._map)
+        if magic != MAGIC:
+            raise ValueError('Not an andante knowledge image: %s' % path)
+        if version != VERSION or protocol != PROTOCOL:
+            raise ValueError('Unsupported version %d of andante knowledge image: %s' % (version, path))
+        directory = json.loads(self._map[offset:offset+length].decode())
+
+        symbols = directory['symbols']
+        n = symbols['size']
+        offsets = self._array(symbols['offsets'], np.uint64, n + 1)
+        data = memoryview(self._map)[symbols['data']:symbols['data'] + (int(offsets[-1]) if n else 0)]
+        self.facts_store = ColumnarKnowledge(options=options)
+        self.facts_store.symbols = MappedSymbolTable(offsets, data, self._array(symbols['hashes'], np.uint64, n), self._array(symbols['order'], np.int32, n))
+        for r in directory['relations']:
+            relation = Relation(r['symbol'], r['arity'], 0)
+            size = r['size']
+            relation.columns = self._array(r['columns'], Relation.dtype, r['arity'] * size).reshape(r['arity'], size)
+            relation.alive = self._array(r['alive'], bool, size)
+            relation.size = relation.count = size
+            for position, (order, codes) in enumerate(r['sorted']):
+                relation._sorted[position] = (self._array(order, np.int32, size), self._array(codes, Relation.dtype, size))
+            self.facts_store.relations['%s/%d' % (r['symbol'], r['arity'])] = relation
+
+        self.rules = TreeShapedKnowledge(options=options)
+        rules = directory['rules']
+        for clause in pickle.loads(self._map[rules['offset']:rules['offset']+rules['length']]):
+            self.rules.add(clause)
+
+    def _array(self, offset, dtype, count):
+        """ Returns the read-only array of some elements of the image starting at some offset """
+        return np.frombuffer(self._map, dtype=dtype, count=count, offset=offset) if count else np.empty(0, dtype=dtype)
+
+    def __len__(self):
+        return len(self.facts_store) + len(self.rules.clauses)
+
+    def __iter__(self):
+        return chain(self.facts_store, self.rules)
+
+    def add(self, clause):
+        # In case input is not a clause but an iterable containing clauses
+        if not isinstance(clause, Clause):
+            if not isinstance(clause, Iterable):
+                raise KeyError('Expected andante.logic_concepts.Clause or Iterable object, found : %s' % clause.__class__.__name__)
+            for x in clause:
+                if not isinstance(x, Clause):
+                    raise TypeError('Iterable contains non-Clause elements: %s' % x.__class__.__name__)
+                self.add(x)
+            return
+        if clause in self:
+            return
+        # Facts of a predicate having rules come after them, and are thus kept with them
+        if is_fact(clause) and clause.head.name not in self.rules.clausesbyoperator:
+            self.facts_store.add(clause)
+        else:
+            self.rules.add(clause)
+        self._changes.append((True, clause))
+        self._generation = next(_generations)
+
+    def remove(self, clause):
+        # In case input is not a clause but an iterable containing clauses
+        if not isinstance(clause, Clause):
+            if not isinstance(clause, Iterable):
+                raise KeyError('Expected andante.logic_concepts.Clause or Iterable object, found : %s' % clause.__class__.__name__)
+            for x in clause:
+                self.remove(x)
+            return
+        if clause not in self:
+            return
+        self.facts_store.remove(clause)
+        self.rules.remove(clause)
+        self._changes.append((False, clause))
+        self._generation = next(_generations)
+
+    def __contains__(self, clause):
+        return clause in self.rules or (is_fact(clause) and clause in self.facts_store)
+
+    def match(self, atom):
+        """ Returns the clauses whose head may unify with some atom, in the order in which they were added """
+        return list(self.match_iter(atom))
+
+    def match_iter(self, atom):
+        if atom.name not in self.rules.clausesbyoperator:
+            return self.facts_store.match_iter(atom)
+        return chain(self.facts_store.match_iter(atom), self.rules.match_iter(atom))
+
+    def first_match(self, atom):
+        clause = self.facts_store.first_match(atom)
+        return clause if clause is not None else self.rules.first_match(atom)
+
+    def facts(self, name):
+        if name not in self.rules.ground_facts:
+            return self.facts_store.facts(name)
+        return set(self.facts_store.facts(name)) | self.rules.facts(name)
+
+    def has_fact(self, atom):
+        return self.facts_store.has_fact(atom) or self.rules.has_fact(atom)
+
+    def _compute_statistics(self):
+        return CombinedStatistics([self.facts_store.statistics, self.rules.statistics])
+
+    def copy(self):
+        knowledge = ImageKnowledge(self.path, self.options)
+        knowledge._replay(self._changes)
+        return knowledge
+
+    def _replay(self, changes):
+        for added, clause in changes:
+            self.add(clause) if added else self.remove(clause)
+
+    def __getstate__(self):
+        # The mapped arrays are not pickled: the image is opened again
+        return {'path': self.path, 'options': self.options, 'changes': self._changes}
+
+    def __setstate__(self, state):
+        self.__init__(state['path'], state['options'])
+        self._replay(state['changes'])
+
+
+def save_image(knowledge, path):
+    """ Writes an image of some knowledge to a file, see andante.image
+
+    The clauses of the image are the ones of the knowledge, in the same
+    order within each predicate.
+    """
+    clauses = list(dict.fromkeys(knowledge))
+    with_rules = {c.head.name for c in clauses if c.head is not None and not is_fact(c)}
+    rules = [c for c in clauses if c.head is None or c.head.name in with_rules]
+    facts = dict()
+    for c in clauses:
+        if c.head is not None and c.head.name not in with_rules:
+            facts.setdefault((c.head.symbol, c.head.arity), []).append(c.head.arguments)
+
+    symbols = SymbolTable()
+    relations = dict()
+    for (symbol, arity), rows in facts.items():
+        relations[symbol, arity] = np.array([[symbols.intern(arg) for arg in row] for row in rows], dtype=Relation.dtype).reshape(len(rows), arity).T
+
+    pickles = [pickle.dumps(term, PROTOCOL) for term in symbols.terms]
+    offsets = np.zeros(len(pickles) + 1, dtype=np.uint64)
+    offsets[1:] = np.cumsum([len(p) for p in pickles], dtype=np.uint64)
+    hashes = np.array([term_hash(p) for p in pickles], dtype=np.uint64)
+    order = np.argsort(hashes, kind='stable').astype(np.int32)
+
+    with open(path, 'wb') as f:
+        def write(data):
+            """ Writes some bytes at the next offset aligned on 8 bytes and returns the offset """
+            f.write(b'\x00' * (-f.tell() % 8))
+            offset = f.tell()
+            f.write(data)
+            return offset
+
+        f.write(HEADER.pack(MAGIC, VERSION, PROTOCOL, 0, 0))
+        directory = {
+            'symbols': {
+                'size': len(pickles),
+                'offsets': write(offsets.tobytes()),
+                'data': write(b''.join(pickles)),
+                'hashes': write(hashes[order].tobytes()),
+                'order': write(order.tobytes()),
+            },
+            'relations': [],
+        }
+        for (symbol, arity), columns in relations.items():
+            sorted_by = []
+            for position in range(arity):
+                rows = np.argsort(columns[position], kind='stable').astype(np.int32)
+                sorted_by.append((write(rows.tobytes()), write(columns[position][rows].tobytes())))
+            directory['relations'].append({
+                'symbol': symbol,
+                'arity': arity,
+                'size': columns.shape[1],
+                'columns': write(np.ascontiguousarray(columns).tobytes()),
+                'alive': write(np.ones(columns.shape[1], dtype=bool).tobytes()),
+                'sorted': sorted_by,
+            })
+        data = pickle.dumps(rules, PROTOCOL)
+        directory['rules'] = {'offset': write(data), 'length': len(data)}
+        data = json.dumps(directory).encode()
+        offset = write(data)
+        f.seek(0)
+        f.write(HEADER.pack(MAGIC, VERSION, PROTOCOL, offset, len(data)))
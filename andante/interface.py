@@ -22,7 +22,7 @@ Isabelle Linden, Jean-Marie Jacquet and Wim Vanhoof.
 from andante.program import AndanteProgram
 from andante.parser  import Parser
 from andante.knowledge import Knowledge, MultipleKnowledge
-from andante.collections import OrderedSet
+from andante.collections import OrderedSet, indices_of
 
 import itertools
 import math
@@ -683,11 +683,11 @@ class LearningInterface:
 
     def _explain_pos_neg_button(self, label, s, grid):
         if label=='p':
-            expl_covered = set(s.E_cov['pos'])
             all_examples = s.hm.E['pos']
+            expl_covered = {all_examples[i] for i in indices_of(s.E_cov['pos'])}
         else: #label=='n'
-            expl_covered = set(s.E_cov['neg'])
             all_examples = s.hm.E['neg']
+            expl_covered = {all_examples[i] for i in indices_of(s.E_cov['neg'])}
             
         relevant_exp = [e for e in all_examples if e.head.symbol==s.clause.head.symbol]
         options = [chr(int("1F534",base=16)+(c in expl_covered))+' '+str(c) for c in relevant_exp]
@@ -28,11 +28,45 @@ from andante.logic_concepts  import (
     Constant, 
     Variable, 
     Function,
+    extract_variables,
 )
 from andante.collections import OrderedSet
+from andante.compilation import compile_clause
+from andante.statistics import Statistics, CombinedStatistics, may_commit
 
 from collections.abc import Iterable
-from itertools import chain
+from heapq import merge
+from itertools import chain, count, islice
+import weakref
+
+# Generations are drawn from a single counter, so that no two knowledges, 
+# even the ones created after another one was garbage collected, share one
+_generations = count(1)
+
+class Journal:
+    """ Clauses added to or removed from a knowledge since the journal was last read, see andante.knowledge.Knowledge.journal
+
+    Attributes
+    ----------
+    clauses : dict
+        The clauses added or removed, as keys, in the order of their first change
+    parts : tuple of andante.knowledge.Journal
+        The journals of the sub-knowledges, read with this one
+    """
+    __slots__ = ('clauses', 'parts', '__weakref__')
+
+    def __init__(self, parts=()):
+        self.clauses = dict()
+        self.parts = tuple(parts)
+
+    def read(self):
+        """ Returns the clauses added or removed since the previous call, and forgets them """
+        clauses = self.clauses
+        for part in self.parts:
+            clauses.update(dict.fromkeys(part.read()))
+        self.clauses = dict()
+        return list(clauses)
+
 
 class Knowledge(ABC):
     """ Collection of clauses """
@@ -44,9 +78,28 @@ class Knowledge(ABC):
 
     @abstractmethod
     def match(self, atom):
-        """ Return all clauses that match some atom """
+        """ Return all clauses that match some atom, in the order of the source """
         pass
     
+    def match_iter(self, atom):
+        """ Returns a lazy iterator over the clauses that match some atom, in the order of the source """
+        return iter(self.match(atom))
+    
+    def first_match(self, atom):
+        """ Returns the first clause that matches some atom, or None if there is none """
+        return next(self.match_iter(atom), None)
+    
+    def __contains__(self, clause):
+        return any(c is clause for c in self)
+    
+    def facts(self, name):
+        """ Returns the set of the arguments of the ground unit clauses of the predicate of some name """
+        return {tuple(c.head.arguments) for c in self if not c.body and c.head is not None and c.head.name == name and not extract_variables(c.head)}
+    
+    def has_fact(self, atom):
+        """ Tells whether some atom is ground and is a unit clause of the knowledge """
+        return tuple(atom.arguments) in self.facts(atom.name)
+    
     @abstractmethod
     def add(self, clause):
         """ Add some clause to the current knowledge """
@@ -57,6 +110,64 @@ class Knowledge(ABC):
         """ Remove some clause from the current knowledge """
         pass
     
+    def journal(self):
+        """ Returns a new andante.knowledge.Journal of the clauses added or removed from now on, or None if the knowledge cannot keep one
+
+        Whether a clause was added or removed is told by the knowledge 
+        itself. The journal is only kept as long as it is referenced.
+        """
+        return None
+    
+    def _record(self, clauses):
+        """ Records in the journals of the knowledge that some clauses were added or removed """
+        for journal in self._journals:
+            journal.clauses.update(dict.fromkeys(clauses))
+    
+    def __getstate__(self):
+        # Journals cannot be pickled, and what was computed from the knowledge is computed again
+        state = dict(self.__dict__)
+        state.pop('_materialized', None)
+        if '_journals' in state:
+            state['_journals'] = None
+        return state
+    
+    def __setstate__(self, state):
+        if '_journals' in state:
+            state['_journals'] = weakref.WeakSet()
+        self.__dict__.update(state)
+    
+    @property
+    def generation(self):
+        """ Value that changes with every modification of the knowledge and is never shared with another knowledge
+
+        It tells whether what was computed from the knowledge is outdated, 
+        and can be used as a key of what was computed from it. Knowledges
+        that do not keep track of their modifications return a new value 
+        each time.
+        """
+        try:
+            return self._generation
+        except AttributeError:
+            return next(_generations)
+    
+    @property
+    def statistics(self):
+        """ The andante.statistics.Statistics of the clauses of the knowledge
+
+        They are computed again only when the generation of the knowledge 
+        changes. Knowledges that can update them at each modification, or 
+        compute them faster than by going through their clauses, do so.
+        """
+        generation = self.generation
+        cached = getattr(self, '_statistics_cache', None)
+        if cached is None or cached[0] != generation:
+            cached = self._statistics_cache = (generation, self._compute_statistics())
+        return cached[1]
+    
+    def _compute_statistics(self):
+        """ Returns the statistics of the clauses of the knowledge """
+        return Statistics(self)
+    
     def copy(self):
         return self.__class__([c for c in self])
 
@@ -78,8 +189,47 @@ class MultipleKnowledge(Knowledge):
         return iter(chain(*self.knowledges))
         
     def match(self, atom):
-        x = [k.match(atom) for k in self.knowledges]
-        return set.union(*x)
+        return list(self.match_iter(atom))
+    
+    def match_iter(self, atom):
+        """ Returns a lazy iterator over the clauses of the sub-knowledges that match some atom
+
+        The clauses of the first sub-knowledge come first. The ones of the 
+        next sub-knowledges are skipped if they belong to a previous one.
+        """
+        first = self.knowledges[0].match_iter(atom)
+        if len(self.knowledges) == 1:
+            return first
+        return chain(first, self._match_others(atom))
+    
+    def _match_others(self, atom):
+        """ Yields the clauses matching some atom of the sub-knowledges but the first, without the ones of previous sub-knowledges """
+        for i, k in enumerate(self.knowledges[1:], 1):
+            previous = self.knowledges[:i]
+            for clause in k.match_iter(atom):
+                for p in previous:
+                    if clause in p: break
+                else:
+                    yield clause
+                    
+    def first_match(self, atom):
+        for k in self.knowledges:
+            clause = k.first_match(atom)
+            if clause is not None:
+                return clause
+        return None
+    
+    def __contains__(self, clause):
+        return any(clause in k for k in self.knowledges)
+    
+    def facts(self, name):
+        return set().union(*(k.facts(name) for k in self.knowledges))
+    
+    def has_fact(self, atom):
+        for k in self.knowledges:
+            if k.has_fact(atom):
+                return True
+        return False
     
     def add(self, x):
         if   isinstance(x, Knowledge):
@@ -90,6 +240,20 @@ class MultipleKnowledge(Knowledge):
     def remove(self, x):
         for k in self.knowledges:
             k.remove(x)
+            
+    @property
+    def generation(self):
+        return tuple(k.generation for k in self.knowledges)
+    
+    def journal(self):
+        journals = [k.journal() for k in self.knowledges]
+        if None in journals:
+            return None
+        return Journal(journals)
+    
+    def _compute_statistics(self):
+        # A clause of several sub-knowledges is counted once for each of them
+        return CombinedStatistics([k.statistics for k in self.knowledges])
     
     # def __repr__(self):
     #     tab = ' '*3
@@ -100,29 +264,258 @@ class MultipleKnowledge(Knowledge):
         return MultipleKnowledge(*[k.copy() for k in self.knowledges], self.options)
 
 
+class OverlayKnowledge(Knowledge):
+    """ Knowledge made of the modifications of a base knowledge, which is left untouched
+    
+    The clauses added are kept in a small andante.knowledge.TreeShapedKnowledge,
+    the delta, and the clauses of the base that are removed are hidden, so 
+    that building, modifying and copying an overlay costs as much as the 
+    modifications, whatever the size of the base. As in a 
+    andante.knowledge.MultipleKnowledge whose first sub-knowledge would be 
+    the delta, the clauses added come before the ones of the base. 
+    
+    The base must not be modified while the overlay is in use: the clauses 
+    added to the delta are the ones that were not already in the base.
+    
+    Attributes
+    ----------
+    base : andante.knowledge.Knowledge
+        The knowledge modified
+    delta : andante.knowledge.TreeShapedKnowledge
+        The clauses added
+    removed : dict of set of andante.logic_concepts.Clause
+        Given a predicate name, returns the clauses of the base that are hidden
+    """
+    def __init__(self, base, clauses=None, options=None):
+        self.options = options if options is not None else getattr(base, 'options', None)
+        self.base = base
+        self.delta = TreeShapedKnowledge(options=self.options)
+        self.removed = dict()
+        self._removed_facts = dict() # predicate name -> arguments of the ground facts of the base that are hidden
+        self._generation = next(_generations)
+        self._journals = weakref.WeakSet()
+        if clauses is not None:
+            self.add(clauses)
+        
+    def __iter__(self):
+        if not self.removed:
+            return chain(self.delta, self.base)
+        return chain(self.delta, (c for c in self.base if not self._hidden(c)))
+    
+    def _hidden(self, clause):
+        removed = self.removed.get(clause.head.name) if clause.head is not None else None
+        return removed is not None and clause in removed
+    
+    def match(self, atom):
+        return list(self.match_iter(atom))
+    
+    def match_iter(self, atom):
+        """ Returns a lazy iterator over the clauses of the delta then of the base that match some atom
+
+        When the delta has no clause of the predicate of the atom and none of 
+        its clauses were removed, this is the iterator of the base.
+        """
+        base = self.base.match_iter(atom)
+        removed = self.removed.get(atom.name)
+        if removed is not None:
+            base = (c for c in base if c not in removed)
+        if atom.name not in self.delta.clausesbyoperator:
+            return base
+        return chain(self.delta.match_iter(atom), base)
+    
+    def first_match(self, atom):
+        clause = self.delta.first_match(atom)
+        if clause is not None:
+            return clause
+        if atom.name not in self.removed:
+            return self.base.first_match(atom)
+        return next(self.match_iter(atom), None)
+    
+    def __contains__(self, clause):
+        return clause in self.delta or (clause in self.base and not self._hidden(clause))
+    
+    def facts(self, name):
+        facts = self.base.facts(name)
+        removed = self._removed_facts.get(name)
+        if removed:
+            facts = set(facts) - removed
+        if name in self.delta.ground_facts:
+            facts = set(facts) | self.delta.facts(name)
+        return facts
+    
+    def has_fact(self, atom):
+        if self.delta.has_fact(atom):
+            return True
+        removed = self._removed_facts.get(atom.name)
+        if removed and tuple(atom.arguments) in removed:
+            return False
+        return self.base.has_fact(atom)
+    
+    def add(self, clause):
+        # In case input is not a clause but an iterable containing clauses
+        clauses = [clause] if isinstance(clause, Clause) else clause
+        if not isinstance(clauses, Iterable):
+            raise KeyError('Expected andante.logic_concepts.Clause or Iterable object, found : %s' % clause.__class__.__name__)
+        if self._journals:
+            clauses = [c for c in clauses if c not in self]
+            self._record(clauses)
+        if self.delta.bulk_add(c for c in clauses if c not in self):
+            self._generation = next(_generations)
+        
+    def remove(self, clause):
+        # In case input is not a clause but an iterable containing clauses
+        if not isinstance(clause, Clause):
+            if not isinstance(clause, Iterable):
+                raise KeyError('Expected andante.logic_concepts.Clause or Iterable object, found : %s' % clause.__class__.__name__)
+            for x in clause:
+                self.remove(x)
+            return
+        
+        if clause in self.delta:
+            self.delta.remove(clause)
+        elif clause in self.base and not self._hidden(clause):
+            self.removed.setdefault(clause.head.name, set()).add(clause)
+            if not clause.body and not extract_variables(clause.head):
+                self._removed_facts.setdefault(clause.head.name, set()).add(tuple(clause.head.arguments))
+        else:
+            return
+        self._generation = next(_generations)
+        if self._journals:
+            self._record([clause])
+        
+    @property
+    def generation(self):
+        return (self._generation, self.base.generation)
+    
+    def journal(self):
+        journal = Journal()
+        self._journals.add(journal)
+        return journal
+    
+    def _compute_statistics(self):
+        removed = {name: set(clauses) for name, clauses in self.removed.items()}
+        return CombinedStatistics([self.delta.statistics, self.base.statistics], removed)
+    
+    def copy(self):
+        """ Returns an overlay of the same base with the same modifications """
+        knowledge = OverlayKnowledge(self.base, options=self.options)
+        knowledge.delta.bulk_add(self.delta)
+        knowledge.removed = {name: set(clauses) for name, clauses in self.removed.items()}
+        knowledge._removed_facts = {name: set(facts) for name, facts in self._removed_facts.items()}
+        return knowledge
+
+
+def index_key(term):
+    """ Returns what a term is indexed by: the term itself for constants, the symbol and arity for compound terms, None for variables """
+    cls = type(term)
+    if cls is Constant:
+        return term
+    if cls is Variable:
+        return None
+    if isinstance(term, Function):
+        return (term.symbol, term.arity)
+    if isinstance(term, Variable):
+        return None
+    return term
+
+
+class Index:
+    """ Hash index of the clauses of a predicate on some of the arguments of their head
+
+    Attributes
+    ----------
+    positions : tuple of int
+        The indexed arguments
+    buckets : dict
+        Maps the keys (see andante.knowledge.index_key) of the indexed 
+        arguments to the list of clauses having these keys, in the order in 
+        which they were added
+    generic : list of andante.logic_concepts.Clause
+        Clauses having a variable at some of the indexed arguments
+    """
+    def __init__(self, positions, clauses, keys):
+        self.positions = positions
+        self.buckets = dict()
+        self.generic = list()
+        for clause in clauses:
+            self.add(clause, keys[clause])
+            
+    def key(self, keys):
+        """ Returns the key of the bucket of the given argument keys, or None if some of them is None """
+        key = tuple([keys[i] for i in self.positions])
+        return None if None in key else key
+            
+    def add(self, clause, keys):
+        key = self.key(keys)
+        if key is None:
+            self.generic.append(clause)
+        else:
+            self.buckets.setdefault(key, []).append(clause)
+            
+    def remove(self, clause, keys):
+        key = self.key(keys)
+        if key is None:
+            self.generic.remove(clause)
+        else:
+            self.buckets[key].remove(clause)
+            if not self.buckets[key]:
+                del self.buckets[key]
+                
+    def __repr__(self):
+        return 'Index(positions=%s, buckets=%d, generic=%d)' % (self.positions, len(self.buckets), len(self.generic))
+
+
 class TreeShapedKnowledge(Knowledge):
-    """ Knowledge stored as a tree of clauses
+    """ Knowledge stored as a tree of clauses: by predicate, then by indexed arguments
+    
+    Each call to match records which arguments of the atom are bound (are 
+    not variables), its call pattern. Once a call pattern of a predicate was
+    seen index_threshold times, the clauses of the predicate are indexed on
+    these arguments (see andante.knowledge.Index), so that the next calls 
+    directly get the clauses whose arguments have the same constants or 
+    functors. Calls whose pattern is not indexed use the largest index on 
+    part of their bound arguments, if any, and otherwise filter all the 
+    clauses of the predicate. Predicates of less than index_min_size clauses
+    are never indexed.
     
     Attributes
     ----------
-    allclauses : set of andante.logic_concepts.Clause
+    clauses : andante.collections.OrderedSet of andante.logic_concepts.Clause
         Set of all clauses represented by the tree
-    clausesbyoperator : dict of sets of andante.logic_concepts.Clause
+    clausesbyoperator : dict of andante.collections.OrderedSet of andante.logic_concepts.Clause
         Given a function name, returns the set of all clauses whose head matches that function name
-    collec : dict
-        The tree collection of clauses
+    indexes : dict of dict of andante.knowledge.Index
+        Given a function name and a call pattern, returns the index of the 
+        clauses of the function for the call pattern
+    call_patterns : dict of dict of int
+        Given a function name and a call pattern, returns how many times match 
+        was called with that pattern
+    ground_facts : dict of set of tuple
+        Given a function name, returns the set of the arguments of the ground
+        unit clauses of the function, so that a ground atom is looked up in 
+        constant time (see has_fact)
     """
+    index_threshold = 2
+    index_min_size = 8
+    
     def __init__(self, clauses=None, operators=None, options=None):
         self.options = options
-        if clauses is None:
-            clauses = []
-        if operators is None:
-            operators = [clause.head for clause in clauses]
+        self._generation = next(_generations)
         self.clauses = OrderedSet()
         self.clausesbyoperator = dict()
-        self.collec = dict()
-        for op, clause in zip(operators, clauses):
-            self.add(clause, op)
+        self.indexes = dict()
+        self.call_patterns = dict()
+        self.ground_facts = dict()
+        self._keys = dict() # clause -> keys of the arguments of its operator
+        self._rank = dict() # clause -> position in the order of addition
+        self._added = count()
+        self._statistics = None # Built when first needed, see statistics
+        self._journals = weakref.WeakSet()
+        if operators is not None:
+            for op, clause in zip(operators, clauses):
+                self.add(clause, op)
+        elif clauses is not None:
+            self.bulk_add(clauses)
 
     def __iter__(self):
         return iter(self.clauses)
@@ -132,36 +525,92 @@ class TreeShapedKnowledge(Knowledge):
         if not isinstance(clause, Clause):
             if not isinstance(clause, Iterable):
                 raise KeyError('Expected andante.logic_concepts.Clause or Iterable object, found : %s' % clause.__class__.__name__)
-            for x in clause:
-                print(f"Processing iterable element: {x}")
-                if isinstance(x,Clause):
-                    self.add(x)
-                else:
-                    raise TypeError('Iterable contains non-Clause elements: %s' % x.__class__.__name__)
+            self.bulk_add(clause)
             return
 
+        if clause in self.clauses:
+            return
         if func is None: func = clause.head
         fname = func.name
         
+        compiled = compile_clause(clause)
+        self._generation = next(_generations)
         self.clauses.add(clause)
+        if self._journals:
+            self._record([clause])
         
         if fname not in self.clausesbyoperator:
-            self.clausesbyoperator[fname] = set()
+            self.clausesbyoperator[fname] = OrderedSet()
+            self.indexes[fname] = dict()
         self.clausesbyoperator[fname].add(clause)
+        fact = not clause.body and compiled.nvars == 0
+        if fact:
+            self.ground_facts.setdefault(clause.head.name, set()).add(tuple(clause.head.arguments))
+        
+        keys = self._keys[clause] = tuple(index_key(term) for term in func)
+        if self._statistics is not None:
+            self._statistics.add(clause, keys, fact)
+        self._rank[clause] = next(self._added)
+        for index in self.indexes[fname].values():
+            index.add(clause, keys)
+                
+    def bulk_add(self, clauses):
+        """ Adds the clauses of an iterable, e.g. a generator, and returns how many were not already there
+
+        The result is the same as adding the clauses one by one, but they are 
+        added in a single pass with the structures of the knowledge bound to
+        local names, and they are only compiled when they are first resolved.
+        This is the way to load large knowledges.
+        """
+        clauses_set = self.clauses
+        clausesbyoperator = self.clausesbyoperator
+        ground_facts = self.ground_facts
+        all_keys = self._keys
+        rank = self._rank
+        sizes = dict() if self._statistics is not None else None # predicate name -> numbers of clauses and of ground facts before the clauses were added
+        added = self._added
+        recorded = [] if self._journals else None
+        n = 0
+        for clause in clauses:
+            if type(clause) is not Clause and not isinstance(clause, Clause):
+                raise TypeError('Iterable contains non-Clause elements: %s' % clause.__class__.__name__)
+            if clause in clauses_set:
+                continue
+            head = clause.head
+            fname = head.name
+            clauses_set.add(clause)
+            operator = clausesbyoperator.get(fname)
+            if operator is None:
+                operator = clausesbyoperator[fname] = OrderedSet()
+                self.indexes[fname] = dict()
+            if sizes is not None and fname not in sizes:
+                sizes[fname] = (len(operator), len(ground_facts.get(fname, ())))
+            operator[clause] = None
             
-        if fname not in self.collec:
-            self.collec[fname] = [{'Vars':set()} for _ in range(func.arity)]
-        for term, term_dict in zip(func, self.collec[fname]):
-            if isinstance(term, Constant):
-                if not term.value in term_dict:
-                    term_dict[term.value] = set()
-                term_dict[term.value].add(clause)    
-            elif isinstance(term, Variable):
-                term_dict['Vars'].add(clause)                        
-            elif isinstance(term, Function):
-                if 'Funcs' not in term_dict:
-                    term_dict['Funcs'] = TreeShapedKnowledge([],[])                       
-                term_dict['Funcs'].add(clause, term)
+            keys = all_keys[clause] = tuple([index_key(term) for term in head.arguments])
+            rank[clause] = next(added)
+            # A unit clause whose arguments are all constants or compound terms without variables is a ground fact
+            fact = not clause.body and None not in keys and all(type(key) is Constant or not extract_variables(term) for key, term in zip(keys, head.arguments))
+            if fact:
+                facts = ground_facts.get(fname)
+                if facts is None:
+                    facts = ground_facts[fname] = set()
+                facts.add(tuple(head.arguments))
+            for index in self.indexes[fname].values():
+                index.add(clause, keys)
+            if recorded is not None:
+                recorded.append(clause)
+            n += 1
+        if recorded:
+            self._record(recorded)
+        if sizes is not None:
+            # The clauses added to a predicate are the last ones of its set
+            for fname, (size, nfacts) in sizes.items():
+                operator = clausesbyoperator[fname]
+                self._count(fname, islice(reversed(operator), len(operator) - size), len(ground_facts.get(fname, ())) - nfacts)
+        if n:
+            self._generation = next(_generations)
+        return n
                 
     def remove(self, clause, func=None):
         # In case input is not a clause but an iterable containing clauses
@@ -177,37 +626,128 @@ class TreeShapedKnowledge(Knowledge):
         if func is None: func = clause.head
         fname = func.name
         
+        self._generation = next(_generations)
         self.clauses.remove(clause)
         self.clausesbyoperator[fname].remove(clause)
+        if self._journals:
+            self._record([clause])
+        facts = self.ground_facts.get(clause.head.name)
+        fact = False
+        if facts and not clause.body:
+            fact = tuple(clause.head.arguments) in facts
+            facts.discard(tuple(clause.head.arguments))
+            if not facts:
+                del self.ground_facts[clause.head.name]
         
-        for term, term_dict in zip(func, self.collec[fname]):
-            if isinstance(term, Constant):
-                term_dict[term.value].remove(clause)
-                if not term_dict[term.value]:
-                    del term_dict[term.value]
-            elif isinstance(term, Variable):
-                term_dict['Vars'].remove(clause)                        
-            elif isinstance(term, Function):
-                term_dict['Funcs'].remove(clause, term)        
+        keys = self._keys.pop(clause)
+        if self._statistics is not None:
+            self._statistics.remove(clause, keys, fact)
+        del self._rank[clause]
+        for index in self.indexes[fname].values():
+            index.remove(clause, keys)
                 
         if not self.clausesbyoperator[fname]:
             del self.clausesbyoperator[fname]
-            del self.collec[fname]
-                
+            del self.indexes[fname]
             
     def match(self, expr):
+        """ Returns the clauses whose head may unify with some atom, in the order in which they were added 
+
+        The clauses are given in a sequence that must not be modified.
+        """
+        parts, keys, pattern = self._lookup(expr)
+        if len(parts) == 1:
+            clauses, filtered = parts[0]
+            return self._filter(clauses, keys, pattern) if filtered else clauses
+        return sorted(chain(*(self._filter(clauses, keys, pattern) if filtered else clauses for clauses, filtered in parts)), key=self._rank.__getitem__)
+    
+    def match_iter(self, expr):
+        parts, keys, pattern = self._lookup(expr)
+        iterators = [(c for c in clauses if self._compatible(c, keys, pattern)) if filtered else iter(clauses) for clauses, filtered in parts]
+        if len(iterators) == 1:
+            return iterators[0]
+        return merge(*iterators, key=self._rank.__getitem__)
+    
+    def first_match(self, expr):
+        parts, keys, pattern = self._lookup(expr)
+        if len(parts) == 1 and not parts[0][1]:
+            return next(iter(parts[0][0]), None)
+        return next(self.match_iter(expr), None)
+    
+    def __contains__(self, clause):
+        return clause in self.clauses
+    
+    def facts(self, name):
+        return self.ground_facts.get(name, frozenset())
+    
+    def journal(self):
+        journal = Journal()
+        self._journals.add(journal)
+        return journal
+    
+    @property
+    def statistics(self):
+        """ The andante.statistics.Statistics of the clauses
+
+        They are computed when first needed, so that loading a knowledge does
+        not pay for them, and then updated at each modification.
+        """
+        if self._statistics is None:
+            self._statistics = Statistics()
+            for fname, clauses in self.clausesbyoperator.items():
+                self._count(fname, clauses, len(self.ground_facts.get(fname, ())))
+        return self._statistics
+    
+    def _count(self, fname, clauses, facts):
+        """ Counts in the statistics some clauses of a function, of which some number are ground facts """
+        clauses = list(clauses)
+        keys = self._keys
+        self._statistics.add_all(fname, len(keys[clauses[0]]), [keys[c] for c in clauses], facts, sum(1 for c in clauses if c.body), sum(1 for c in clauses if may_commit(c)))
+    
+    def _lookup(self, expr):
+        """ Returns the sequences of clauses among which are the ones matching some atom, and the keys and call pattern of the atom
+        
+        Each sequence is paired with whether its clauses must be filtered 
+        with andante.knowledge.TreeShapedKnowledge._compatible.
+        """
         name = expr.name
-        if name not in self.collec:
-            return set()
-        sets = []
-        for term, term_dict in zip(expr, self.collec[name]):
-            if   isinstance(term, Constant):
-                if term.value in term_dict:
-                    sets.append(term_dict[term.value] | term_dict['Vars'])
-                else:
-                    sets.append(term_dict['Vars'])
-            elif isinstance(term, Variable):
-                sets.append(self.clausesbyoperator[name])
-            elif isinstance(term, Function):
-                sets.append(term_dict['Funcs'].match(term))
-        return set.intersection(*sets)
+        clauses = self.clausesbyoperator.get(name)
+        keys = [index_key(term) for term in expr.arguments]
+        pattern = tuple([i for i, key in enumerate(keys) if key is not None])
+        if clauses is None:
+            return [((), False)], keys, pattern
+        if not pattern:
+            return [(clauses, False)], keys, pattern
+        if len(clauses) < self.index_min_size:
+            return [(clauses, True)], keys, pattern
+        
+        # Statistics of the call patterns and JIT creation of indexes
+        indexes = self.indexes[name]
+        index = indexes.get(pattern)
+        if index is None:
+            calls = self.call_patterns.setdefault(name, dict())
+            calls[pattern] = calls.get(pattern, 0) + 1
+            if calls[pattern] >= self.index_threshold:
+                index = indexes[pattern] = Index(pattern, clauses, self._keys)
+            else:
+                subsets = [index for positions, index in indexes.items() if set(positions) <= set(pattern)]
+                if not subsets:
+                    return [(clauses, True)], keys, pattern
+                index = max(subsets, key=lambda index: len(index.positions))
+        
+        bucket = (index.buckets.get(index.key(keys), ()), len(index.positions) < len(pattern))
+        if not index.generic:
+            return [bucket], keys, pattern
+        return [bucket, (index.generic, True)], keys, pattern
+    
+    def _compatible(self, clause, keys, pattern):
+        """ Tells whether the arguments of the head of a clause have the keys of some bound arguments, or are variables """
+        clause_keys = self._keys[clause]
+        for i in pattern:
+            if clause_keys[i] is not None and clause_keys[i] != keys[i]:
+                return False
+        return True
+    
+    def _filter(self, clauses, keys, pattern):
+        """ Returns the clauses compatible with the keys of some bound arguments """
+        return [c for c in clauses if self._compatible(c, keys, pattern)]
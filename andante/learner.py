@@ -30,7 +30,7 @@ from andante.logic_concepts import Clause, Constant, Variable, Function, Type
 from andante.substitution import Substitution
 import andante.hypothesis_metrics
 from andante.live_log import LiveLog
-from andante.collections import OrderedSet
+from andante.collections import OrderedSet, bits_of, indices_of, count_of
 
 class Learner(ObjectWithTemporaryOptions, ABC):
     def __init__(self, options=None):
@@ -72,11 +72,15 @@ class ProgolLearner(Learner):
         if self.options.logging:
             self.logs[-1].add_eventlog(event_name, value)
         
-    def build_bottom_i(self, e, M, B, solver):
+    def build_bottom_i(self, e, M, B, solver, ground=False):
         """ 
         For better understanding, read this function along Fig.1. 'Algorithm for constructing bottom' 
         in page 14 of document tutorial4.4.pdf 
 
+        If ground is True, the terms are not replaced by variables and the
+        clause returned is the saturation of the example, see 
+        andante.coverage.SubsumptionCoverage
+
         Parameters
         ----------
         e: andante.logic_concepts.Clause object
@@ -87,15 +91,22 @@ class ProgolLearner(Learner):
             The background knowledge
         solver: andante.solver.Solver object
             The engine to verify expressions
+        ground: bool
+            Whether the terms are kept in the bottom clause
         """
         
         # 1. Add e_bar to the background knowledge
         # TODO inset a_bar
-        e_knowledge = TreeShapedKnowledge([Clause(b,[]) for b in e.body], options=self.options)
-        B = MultipleKnowledge(B, e_knowledge, options=self.options)
+        # The background knowledge itself is queried when e_bar is empty, so
+        # that the answers cached for it by the solver are reused
+        if e.body:
+            e_knowledge = TreeShapedKnowledge([Clause(b,[]) for b in e.body], options=self.options)
+            B = MultipleKnowledge(B, e_knowledge, options=self.options)
         
-        # 2. Initialize InTerms and the bottom clause
-        InTerms, bottom = set(), Clause(None, [])
+        # 2. Initialize InTerms and the body of the bottom clause
+        # Clauses are hash-consed and thus immutable: the bottom clause is only
+        # built once its head and body are known
+        InTerms, body = set(), []
         
         # 3. Find the first head mode declaration h such that h subsumes a with substitution theta
         # a: father_of(paul, georges)
@@ -120,11 +131,10 @@ class ProgolLearner(Learner):
         # s: {A/Paul, B/Georges}
         # InTerms: {paul}
         for v,t in theta.subst.items():
-            if type_subst[v].sign=="#": s.subst[v] = t
-            else:                       s.subst[v] = Variable(t.to_variable_name())
+            if type_subst[v].sign=="#" or ground: s.subst[v] = t
+            else:                                 s.subst[v] = Variable(t.to_variable_name())
             if type_subst[v].sign=="+": InTerms.add(t)
         h = s.substitute(am)
-        bottom.head = h
 
         # 4. Modeb
         for i in range(self.options.i):
@@ -150,30 +160,35 @@ class ProgolLearner(Learner):
                         
                         for v, t in itertools.chain(theta.subst.items(), theta_prime.subst.items()):
                             if v not in s: continue
-                            if s[v].sign=='#': theta_final.subst[v] = t
-                            else:              theta_final.subst[v] = Variable(t.to_variable_name())
+                            if s[v].sign=='#' or ground: theta_final.subst[v] = t
+                            else:                        theta_final.subst[v] = Variable(t.to_variable_name())
                             if s[v].sign=='-': next_InTerms.add(t)
                         
                         b = theta_final.substitute(am)
-                        if b not in bottom.body:
-                            bottom.body.append(b)
+                        if b not in body:
+                            body.append(b)
                         
             InTerms = next_InTerms
         
-        return bottom
+        return Clause(h, body)
     
-    def build_hypothesis(self, examples, modes, bottom_i, knowledge, solver):
+    def build_hypothesis(self, examples, modes, bottom_i, knowledge, solver, pos=None):
         """ Lattice search algorithm
 
         Given some bottom_i, builds a new clause that covers all positive
         examples but no negative examples. See above for the paper reference.
+        The state of the clause is returned, or None, and pos is the bits of
+        the positive examples still to cover, all of them by default.
         """
         HM = self.options.hmetric
         if not isinstance(HM, andante.hypothesis_metrics.HypothesisMetric):
             HM = getattr(andante.hypothesis_metrics, HM)
         hm = HM(knowledge, examples, modes, bottom_i, solver, self.options)
         
-        s0 = hm.State(Clause(bottom_i.head, []))
+        E = {label:(1 << len(examples[label])) - 1 for label in examples}
+        if pos is not None:
+            E['pos'] = pos
+        s0 = hm.State(Clause(bottom_i.head, []), E=E)
         self.add_eventlog('Metrics', s0.metrics_info())
         Open = OrderedSet({s0})
         Closed = OrderedSet()
@@ -193,9 +208,7 @@ class ProgolLearner(Learner):
                 if not Closed:
                     return None
                     
-                sbest = hm.best(Closed)
-                c = sbest.clause
-                return c
+                return hm.best(Closed)
             
             if not Open:
                 return None            
@@ -232,12 +245,15 @@ class ProgolLearner(Learner):
         nclause = 0
         learned_knowledge = TreeShapedKnowledge(options=knowledge.options)
         whole_knowledge = MultipleKnowledge(knowledge, learned_knowledge)
-        while examples['pos'] and nclause<SystemParameters.maxclauses:            
+        # The positive examples left to cover, the bit of an example being 
+        # its position in examples['pos']
+        pos = (1 << len(examples['pos'])) - 1
+        while pos and nclause<SystemParameters.maxclauses:            
             # Select 1 example
-            e1 = examples['pos'][0]
+            e1 = examples['pos'][(pos & -pos).bit_length() - 1]
             
             self.beg_child(e1)
-            display_examples = lambda E: '%d positives - %d negatives' % (len(E['pos']), len(E['neg']))
+            display_examples = lambda E: '%d positives - %d negatives' % (count_of(pos), len(E['neg']))
             self.add_eventlog('Examples', examples, display_examples)            
             self.add_eventlog('Current example', e1)
             
@@ -249,15 +265,18 @@ class ProgolLearner(Learner):
             
             # Build hypothesis
             self.beg_child('States')
-            C = self.build_hypothesis(examples, modes, bottom_i, whole_knowledge, solver)
+            s = self.build_hypothesis(examples, modes, bottom_i, whole_knowledge, solver, pos)
+            C = s.clause if s is not None else None
             self.end_child()
             self.add_eventlog('Clause', C)
             
-            # Add hypothesis to background knowledge
+            # Add hypothesis to background knowledge, the positive examples
+            # it covers being those covered by its state
             if C is not None:
                 learned_knowledge.add(C)
-            examples = {'pos':[e for e in examples['pos'] if not solver.succeeds_on(e.head, whole_knowledge, verbose=0)],
-                        'neg':examples['neg']}
+                pos &= ~s.E_cov['pos']
+            else:
+                pos &= ~bits_of(i for i in indices_of(pos) if solver.succeeds_on(examples['pos'][i].head, whole_knowledge, verbose=0))
             
             nclause += 1
             self.verboseprint('')
@@ -19,8 +19,9 @@ in the period of October 1st 2021 to August 31st 2022 under the supervision of
 Isabelle Linden, Jean-Marie Jacquet and Wim Vanhoof. 
 """
 
-from abc import ABC, abstractmethod
+from abc import ABC, ABCMeta, abstractmethod
 from typing import Literal
+import weakref
 
 # TODO: Remove all unify functions as they are redundant with the unify function
 # in andante.substitution.Substitution
@@ -49,13 +50,57 @@ class LogicConcept(ABC):
         pass
     
     
-class Clause(LogicConcept):
+class HashConsing(ABCMeta):
+    """ Metaclass of the hash-consed logic concepts
+
+    Calling a hash-consed class returns the object already built from the same
+    arguments if it still exists, and only creates a new object otherwise.
+    Identical logic concepts thus share a single object: their hash is computed
+    once at creation and equality reduces to an identity check.
+
+    Each class keeps its own table of instances, so that e.g. a Predicate and a
+    CompoundTerm with the same symbol and arguments remain different objects.
+    The table only holds weak references and does not keep terms alive.
+    """
+    def __init__(cls, name, bases, namespace):
+        super().__init__(name, bases, namespace)
+        cls._instances = weakref.WeakValueDictionary()
+
+    def __call__(cls, *args, **kwargs):
+        key = cls._key(*args, **kwargs)
+        obj = cls._instances.get(key)
+        if obj is None:
+            obj = super().__call__(*args, **kwargs)
+            obj._hash = hash((cls.__name__, key))
+            obj = cls._instances.setdefault(key, obj)
+        return obj
+
+
+class HashConsedConcept(LogicConcept, metaclass=HashConsing):
+    """ Logic concept that is hash-consed
+
+    Objects of this class are immutable and must not be modified after their
+    creation as they may be shared by any number of other logic concepts.
+    Subclasses define the classmethod _key, which returns the hashable key
+    identifying the object built from some constructor arguments, and the
+    method __reduce__, so that unpickled objects are hash-consed as well.
+    """
+    def __hash__(self):      return self._hash
+    def __eq__(self, other): return self is other
+    def __ne__(self, other): return self is not other
+    
+    
+class Clause(HashConsedConcept):
     """ Horn clause in first order logic """
     def __init__(self, head, body):
         assert isinstance(head, Atom) or head is None
-        assert isinstance(body, list) and all((isinstance(batom, Atom) for batom in body))
+        assert isinstance(body, (list, tuple)) and all((isinstance(batom, Atom) for batom in body))
         self.head = head
-        self.body = body
+        self.body = list(body)
+        
+    @classmethod
+    def _key(cls, head, body): return (head, tuple(body))
+    def __reduce__(self): return (self.__class__, (self.head, self.body))
                 
     def __repr__(self):
         head_repr = repr(self.head)
@@ -63,9 +108,6 @@ class Clause(LogicConcept):
         if not self.body: return '%s.'     % (head_repr)
         elif self.head:   return '%s :- %s.' % (head_repr, body_repr)
         else:             return ':- %s.'   % (body_repr)
-        
-    def __hash__(self):      return hash(str(self))
-    def __eq__(self, other): return str(self)==str(other)
     
     def apply(self, fun):
         h = self.head.apply(fun)
@@ -80,7 +122,7 @@ class Goal(list, LogicConcept):
         super().__init__(*args, **kwargs)
         assert all((isinstance(l, (Atom, Negation)) for l in self))        
 
-    def __repr__(self): return ', '.join(repr(expr) for expr in self)        
+    def __repr__(self): return ', '.join(repr(expr) for expr in self) if self else 'true'
 
     def apply(self, fun): 
         try: return Goal(expr.apply(fun) for expr in self)
@@ -93,7 +135,7 @@ class Negation(LogicConcept):
         assert isinstance(goal, Goal)
         self.goal = goal
         
-    def __repr__(self): return 'not(%s)' % repr(self.goal)
+    def __repr__(self): return 'not(%s)' % repr(self.goal) if self.goal else 'false'
         
     def apply(self, fun): 
         try: return Negation(self.goal.apply(fun))
@@ -114,7 +156,11 @@ class Function(LogicConcept, ABC):
         assert isinstance(symbol, str)
         assert isinstance(arguments, (list,tuple)) and all((isinstance(arg, Term) for arg in arguments))
         self.symbol   = symbol
-        self.arguments = arguments
+        self.arguments = list(arguments)
+        
+    @classmethod
+    def _key(cls, symbol, arguments): return (symbol, tuple(arguments))
+    def __reduce__(self): return (self.__class__, (self.symbol, self.arguments))
         
     @property
     def name(self): return '%s/%d' % (self.symbol,self.arity)
@@ -154,11 +200,75 @@ class Term(LogicConcept, ABC):
         """
         pass
 
-class Predicate(Atom, Function): 
+class Predicate(HashConsedConcept, Atom, Function): 
     """ Predicate in first order logic """
     pass
 
-class CompoundTerm(Term, Function):
+class Cut(Atom):
+    """ Cut of prolog, which commits to the choices made since the clause containing it was called
+
+    Within a negation, a once or the condition of an if-then-else, the cut
+    only commits to the choices made in that goal.
+    """
+    def __repr__(self): return '!'
+
+    def apply(self, fun): return self
+
+class Once(Atom):
+    """ Goal of which only the first proof is used, once(Goal) in prolog """
+    def __init__(self, goal: Goal):
+        assert isinstance(goal, Goal)
+        self.goal = goal
+
+    def __repr__(self): return 'once(%s)' % repr(self.goal)
+
+    def apply(self, fun):
+        try: return Once(self.goal.apply(fun))
+        except AssertionError:
+            return None
+
+class IfThenElse(Atom):
+    """ If-then-else of prolog, (Condition -> Then ; Else)
+
+    The first proof of the condition is followed by the proofs of the then
+    goal. If the condition has no proof, the else goal is proven, or the
+    if-then-else fails when it has none, as in (Condition -> Then).
+
+    Attributes
+    ----------
+    condition : andante.logic_concepts.Goal
+    then : andante.logic_concepts.Goal
+    otherwise : andante.logic_concepts.Goal or None
+        The else goal
+    """
+    def __init__(self, condition: Goal, then: Goal, otherwise: Goal = None):
+        assert isinstance(condition, Goal) and isinstance(then, Goal)
+        assert otherwise is None or isinstance(otherwise, Goal)
+        self.condition = condition
+        self.then = then
+        self.otherwise = otherwise
+
+    def __repr__(self):
+        if self.otherwise is None:
+            return '(%s -> %s)' % (repr(self.condition), repr(self.then))
+        return '(%s -> %s ; %s)' % (repr(self.condition), repr(self.then), repr(self.otherwise))
+
+    def apply(self, fun):
+        # All the goals are transformed, even when one of them cannot be
+        goals = [goal.apply(fun) if goal is not None else None for goal in (self.condition, self.then, self.otherwise)]
+        if goals[2] is None and self.otherwise is not None:
+            return None
+        try: return IfThenElse(*goals)
+        except AssertionError:
+            return None
+
+    @property
+    def goals(self):
+        """ The goals of the if-then-else """
+        return [self.condition, self.then] + ([self.otherwise] if self.otherwise is not None else [])
+
+
+class CompoundTerm(HashConsedConcept, Term, Function):
     """ Compound terms as defined in the prolog framework """
     def unify(self, other, subst):
         if   isinstance(other, Variable):
@@ -171,7 +281,7 @@ class CompoundTerm(Term, Function):
                 self_arg.unify(other_arg, subst)
         else: raise UnificationError(self, other)
     
-class Constant(Term):
+class Constant(HashConsedConcept, Term):
     """ Constant in first order logic
     
     Attributes
@@ -186,6 +296,10 @@ class Constant(Term):
             raise TypeError(message)
         self.value = value
         
+    @classmethod
+    def _key(cls, value): return (value, type(value).__name__)
+    def __reduce__(self): return (self.__class__, (self.value,))
+        
     def __repr__(self): return str(self.value)
     
     def to_variable_name(self): # TODO change to to_variable_symbol
@@ -207,7 +321,7 @@ class Constant(Term):
             return
         else: raise UnificationError(self, other)
             
-class Variable(Term):
+class Variable(HashConsedConcept, Term):
     """ Variable in the first order logic framework
     
     Attributes
@@ -222,6 +336,10 @@ class Variable(Term):
         self.symbol = symbol
         self.tally_id = tally_id
         
+    @classmethod
+    def _key(cls, symbol, tally_id=0): return (symbol, tally_id)
+    def __reduce__(self): return (self.__class__, (self.symbol, self.tally_id))
+        
     def __repr__(self): return '%s%d' % (self.symbol, self.tally_id) if self.tally_id!=0 else self.symbol
     
     def is_in(self, expr):
@@ -244,7 +362,7 @@ class Variable(Term):
     def unify(self, other, subst):
         subst[self] = other
             
-class Type(Term):
+class Type(HashConsedConcept, Term):
     """ Type as defined in the progol framework
     
     Examples
@@ -265,6 +383,10 @@ class Type(Term):
         self.sign = sign
         self.name = name
         
+    @classmethod
+    def _key(cls, sign, name): return (sign, name)
+    def __reduce__(self): return (self.__class__, (self.sign, self.name))
+        
     def __repr__(self):
         return self.sign+str(self.name)     
     
@@ -33,12 +33,22 @@ class Options(object):
     i       = 2
     c       = 5        # Maximal body size for new clauses
     h       = 10000    # Maximal depth of deduction
+    occurs_check = True # Whether unification checks that a variable does not occur in its binding
     verbose = 0        # Level of logging output
     solver  = "AndanteSolver"
+    table   = ()       # Names (e.g. 'path/2') of the predicates whose answers are tabled
+    tabling = False    # Whether to table all recursive predicates
+    cache_size = 10000 # Maximal number of queries whose answers are cached by the solver (0 to disable)
+    reorder = False    # Whether the AndanteSolver proves the atoms of a conjunction in the order chosen by andante.planner
+    profile = False    # Whether the AndanteSolver counts the calls of each predicate in its attribute profile
+    knowledge = "TreeShapedKnowledge" # Class of the background knowledge of the programs built from text
+    database = ":memory:" # File of the facts of a SQLiteKnowledge
     
     # Learning Options
     learner = "ProgolLearner"
     hmetric = "FnMetric"
+    coverage = "ProofCoverage" # Class computing the examples covered by the candidate clauses, see andante.coverage
+    subsumption_timeout = 1.0 # Seconds after which a theta-subsumption test of SubsumptionCoverage gives way to a proof (None for no limit)
     update_knowledge = True
     
     logging = False
@@ -80,6 +90,8 @@ class ObjectWithTemporaryOptions(ABC):
         
     def add_temporary_options(self, **options):
         revert_options = dict()
+        # Options that keep their current value need no copy of the options
+        options = {attr:value for attr, value in options.items() if getattr(self.options, attr) != value}
         if options:
             if not self._temp_options:
                 self._temp_options = self._options.copy()
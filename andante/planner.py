@@ -0,0 +1,131 @@
+"""
+Ordering of the literals of a conjunction by their estimated cost.
+
+A conjunction is proven from left to right. Proving first the atoms that
+match few clauses, given the variables already bound, and only then the
+ones that enumerate many clauses, finds the same answers with fewer choice
+points. The cost of an atom is the number of clauses estimated to match it
+(see andante.statistics.Statistics.selectivity), an argument being bound
+when its variables are bound by the head of the clause, by the query or by
+the literals ordered before it.
+
+Only atoms of predicates defined by facts are moved. The other literals, 
+i.e. negations, comparisons, arithmetic evaluations, control constructs and
+atoms of predicates having rules, may need their variables to be bound or 
+bind them themselves: they keep their position, and atoms are only 
+reordered between them, so that they are called with the same bindings as
+in the order of the conjunction. The atoms before a cut keep their 
+position as well, as the cut commits to their first proof.
+
+License
+-------
+
+This software is distributed under the terms of both the MIT license and the
+Apache License (Version 2.0).
+
+See LICENSE for details.
+
+Acknowlegment
+-------------
+
+This software has benefited from the support of Wallonia thanks to the funding
+of the ARIAC project (https://trail.ac), a project part of the
+DigitalWallonia4.ai initiative (https://www.digitalwallonia.be).
+
+It was done by Simon Jacquet at the University of Namur (https://www.unamur.be)
+in the period of October 1st 2021 to August 31st 2022 under the supervision of
+Isabelle Linden, Jean-Marie Jacquet and Wim Vanhoof.
+"""
+
+from andante.logic_concepts import Predicate, Cut, Once, extract_variables
+from andante.mathematical_expressions import Is, UnificationComparison
+
+
+class Plan:
+    """ Order in which to prove the literals of a conjunction
+
+    Its string is a description of the order chosen, one literal per line
+    with its estimated cost.
+
+    Attributes
+    ----------
+    literals : list of andante.logic_concepts.Atom or andante.logic_concepts.Negation
+        The literals in the order in which to prove them
+    steps : list of tuple
+        For each literal, in the order chosen, the tuple (literal, position
+        of the literal in the conjunction, estimated number of matching
+        clauses or None for the literals that are not moved, variables bound
+        before it)
+    """
+    def __init__(self, steps):
+        self.steps = steps
+        self.literals = [literal for literal, _, _, _ in steps]
+
+    @property
+    def reordered(self):
+        """ Whether the order chosen is not the one of the conjunction """
+        return any(position != i for i, (_, position, _, _) in enumerate(self.steps))
+
+    def __str__(self):
+        lines = []
+        for i, (literal, position, estimate, bound) in enumerate(self.steps):
+            cost = 'fixed' if estimate is None else 'est. %.3g' % estimate
+            moved = '' if position == i else ', was %d' % (position + 1)
+            bound = ', '.join(sorted(str(var) for var in bound)) or '-'
+            lines.append('%2d. %s  [%s, bound: %s%s]' % (i + 1, literal, cost, bound, moved))
+        return '\n'.join(lines)
+
+    def __repr__(self):
+        return 'Plan(%s)' % ', '.join(str(literal) for literal in self.literals)
+
+
+def plan(literals, bound, statistics):
+    """ Returns the andante.planner.Plan of some literals
+
+    Parameters
+    ----------
+    literals : iterable of andante.logic_concepts.Atom or andante.logic_concepts.Negation
+        The conjunction
+    bound : iterable of andante.logic_concepts.Variable
+        The variables bound before the conjunction is proven
+    statistics : andante.statistics.Statistics
+        The statistics of the knowledge the conjunction is proven with
+    """
+    bound = set(bound)
+    literals = list(literals)
+    cut = max([i for i, literal in enumerate(literals) if isinstance(literal, Cut)], default=-1)
+    steps = []
+    atoms = [] # (position, atom) of the atoms that may be moved
+    for position, literal in enumerate(literals):
+        if type(literal) is Predicate and position > cut and not statistics[literal.name].rules:
+            atoms.append((position, literal))
+            continue
+        _order(atoms, bound, statistics, steps)
+        steps.append((literal, position, None, frozenset(bound)))
+        bound.update(_binds(literal))
+    _order(atoms, bound, statistics, steps)
+    return Plan(steps)
+
+
+def plan_clause(clause, statistics, bound=None):
+    """ Returns the andante.planner.Plan of the body of a clause, the variables of its head being bound unless bound is given """
+    if bound is None:
+        bound = extract_variables(clause.head) if clause.head is not None else ()
+    return plan(clause.body, bound, statistics)
+
+
+def _order(atoms, bound, statistics, steps):
+    """ Appends to steps some atoms, the cheapest first, and empties atoms """
+    while atoms:
+        best = min(atoms, key=lambda atom: (statistics.selectivity(atom[1], bound), atom[0]))
+        atoms.remove(best)
+        position, atom = best
+        steps.append((atom, position, statistics.selectivity(atom, bound), frozenset(bound)))
+        bound.update(extract_variables(atom))
+
+
+def _binds(literal):
+    """ Returns the variables that a literal that is not moved may bind """
+    if isinstance(literal, (Predicate, Once, Is)) or (isinstance(literal, UnificationComparison) and literal.symbol == '='):
+        return extract_variables(literal)
+    return ()
@@ -0,0 +1,131 @@
+"""
+Profile of the calls of a solver.
+
+For each predicate, the number of times its atoms went through the ports of
+the box model (call, exit, redo and fail), the number of clause heads
+unified with its calls, of the clauses returned by the index for them and
+of those used, and the time spent resolving them. This tells where the
+search of the solver spends its time on a knowledge, see
+andante.solver.AndanteSolver and its option profile.
+
+License
+-------
+
+This software is distributed under the terms of both the MIT license and the
+Apache License (Version 2.0).
+
+See LICENSE for details.
+
+Acknowlegment
+-------------
+
+This software has benefited from the support of Wallonia thanks to the funding
+of the ARIAC project (https://trail.ac), a project part of the
+DigitalWallonia4.ai initiative (https://www.digitalwallonia.be).
+
+It was done by Simon Jacquet at the University of Namur (https://www.unamur.be)
+in the period of October 1st 2021 to August 31st 2022 under the supervision of
+Isabelle Linden, Jean-Marie Jacquet and Wim Vanhoof.
+"""
+
+import time
+
+
+class PredicateProfile:
+    """ Port counters and time of the calls of a predicate
+
+    The ports are those of the box model of Prolog, as seen by the solver:
+    a call is resolved with the clauses matching it, one after the other.
+
+    Attributes
+    ----------
+    name : str
+        The name of the predicate, e.g. 'parent/2'
+    calls : int
+        The number of times an atom of the predicate was called
+    exits : int
+        The number of times a call was proven
+    redos : int
+        The number of times a call was resumed on backtracking with another clause
+    fails : int
+        The number of times a call had no clause left to prove it
+    unifications : int
+        The number of clause heads unified with the calls
+    candidates : int
+        The number of clauses (or table answers) returned by the index for the calls
+    used : int
+        The number of candidates whose head unified with the call
+    time : float
+        The cumulative time, in seconds, spent finding and unifying the clauses of the calls
+    """
+    __slots__ = ('name', 'calls', 'exits', 'redos', 'fails', 'unifications', 'candidates', 'used', 'time')
+    
+    def __init__(self, name):
+        self.name = name
+        self.calls = 0
+        self.exits = 0
+        self.redos = 0
+        self.fails = 0
+        self.unifications = 0
+        self.candidates = 0
+        self.used = 0
+        self.time = 0.0
+
+    def to_dict(self):
+        """ Returns the counters and the time as a dict """
+        return {attr: getattr(self, attr) for attr in self.__slots__ if attr != 'name'}
+
+    def __repr__(self):
+        return 'PredicateProfile(%s, calls=%d, exits=%d, redos=%d, fails=%d, unifications=%d, candidates=%d, used=%d, time=%.6f)' % (
+            self.name, self.calls, self.exits, self.redos, self.fails, self.unifications, self.candidates, self.used, self.time)
+
+
+class Profile:
+    """ Profile of the queries of a solver, by predicate, see andante.solver.AndanteSolver
+
+    The profile is only filled while the option profile of the solver is 
+    set. Its counters add up over the queries until clear is called.
+
+    Attributes
+    ----------
+    predicates : dict of andante.profiling.PredicateProfile
+        Given a predicate name, e.g. 'parent/2', returns the profile of its calls
+    """
+    clock = staticmethod(time.perf_counter)
+    
+    def __init__(self):
+        self.predicates = dict()
+
+    def __getitem__(self, name):
+        predicate = self.predicates.get(name)
+        if predicate is None:
+            predicate = self.predicates[name] = PredicateProfile(name)
+        return predicate
+
+    def __contains__(self, name):
+        return name in self.predicates
+
+    def __iter__(self):
+        return iter(self.predicates.values())
+
+    def __len__(self):
+        return len(self.predicates)
+
+    def clear(self):
+        """ Forgets the profile of every predicate """
+        self.predicates.clear()
+
+    def to_dict(self):
+        """ Returns a dict mapping each predicate name to the dict of its counters and time """
+        return {name: predicate.to_dict() for name, predicate in self.predicates.items()}
+
+    def to_dataframe(self):
+        """ Returns a pandas.DataFrame with a row by predicate, sorted by decreasing time """
+        import pandas
+        columns = [attr for attr in PredicateProfile.__slots__ if attr != 'name']
+        frame = pandas.DataFrame.from_dict(self.to_dict(), orient='index', columns=columns)
+        frame.index.name = 'predicate'
+        return frame.sort_values('time', ascending=False)
+
+    def __repr__(self):
+        return '\n'.join(repr(predicate) for predicate in sorted(self, key=lambda p: -p.time))
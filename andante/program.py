@@ -25,12 +25,16 @@ from andante.logic_concepts    import Goal, Clause, Negation, Variable, extract_
 from andante.options   import Options
 from andante.mode      import ModeCollection, Modeh
 from andante.knowledge import Knowledge, TreeShapedKnowledge, MultipleKnowledge
+from andante.database  import SQLiteKnowledge
 from andante.substitution import Substitution
 from andante.utils import generate_variable_names
 import itertools
 import pandas
 import pickle
 
+# Classes of knowledge that can be selected by the option knowledge
+KNOWLEDGES = {cls.__name__: cls for cls in (TreeShapedKnowledge, SQLiteKnowledge)}
+
 class AndanteProgram:
     def __init__(self, options=None, knowledge=None, modes=None, examples=None,results=None,parameters=None):
         """ Class representing a Andante program
@@ -51,7 +55,7 @@ class AndanteProgram:
             Induction engine, handles learning
         """
         self.options   = options   if options   else Options()
-        self.knowledge = knowledge if knowledge else TreeShapedKnowledge(options=self.options)
+        self.knowledge = knowledge if knowledge is not None else KNOWLEDGES[self.options.knowledge](options=self.options)
         self.solver    = getattr(andante.solver, self.options.solver)(options=self.options)
         self.modes     = modes     if modes     else ModeCollection(options=self.options)
         self.examples  = examples  if examples  else {'pos':[], 'neg':[]}
@@ -68,15 +72,28 @@ class AndanteProgram:
         return self._parser
         
     @staticmethod
-    def build_from(andantefile): 
-        """ Returns the corresponding AndanteProgram """
+    def build_from(andantefile, **options): 
+        """ Returns the corresponding AndanteProgram 
+
+        Options given as keywords override the ones set in the file. E.g. 
+        knowledge='SQLiteKnowledge' and database='background.db' store the 
+        background knowledge in a SQLite file.
+        """
         import andante.parser
-        return andante.parser.Parser().parse(andantefile, 'andantefile')    
+        program = andante.parser.Parser().parse(andantefile, 'andantefile')
+        if options:
+            for attr, value in options.items():
+                program.options[attr] = value
+            program.solver  = getattr(andante.solver, program.options.solver)(options=program.options)
+            program.learner = getattr(andante.learner, program.options.learner)(options=program.options)
+        if type(program.knowledge).__name__ != program.options.knowledge:
+            program.knowledge = KNOWLEDGES[program.options.knowledge](list(program.knowledge), options=program.options)
+        return program
     
     @staticmethod
-    def build_from_background(text):
+    def build_from_background(text, **options):
         """ Returns the corresponding AndanteProgram """
-        return AndanteProgram.build_from(':-begin_bg.\n%s\n:-end_bg.' % (text))
+        return AndanteProgram.build_from(':-begin_bg.\n%s\n:-end_bg.' % (text), **options)
         
     def __repr__(self):
         """ Get string representation of the object """
@@ -20,16 +20,95 @@ Isabelle Linden, Jean-Marie Jacquet and Wim Vanhoof.
 """
 
 from abc import ABC, abstractmethod
+import functools
+import weakref
 from andante.options import Options, ObjectWithTemporaryOptions
-from andante.substitution import Substitution, SubstitutionError
-from andante.knowledge import Knowledge
-from andante.logic_concepts import Clause, Function, Goal, Atom, Negation
-from andante.mathematical_expressions import Comparison, Is
+from andante.substitution import Substitution, BindingStore
+from andante.knowledge import Knowledge, MultipleKnowledge, OverlayKnowledge
+from andante.logic_concepts import Goal, Clause, Atom, Predicate, Negation, Cut, Once, IfThenElse, Constant, Variable, extract_variables
+from andante.compilation import (
+    compile_clause, 
+    compile_query, 
+    slot_mapping, 
+    clause_function,
+    instantiate,
+    build,
+    to_term,
+    deref,
+    unify,
+    undo,
+    Ref,
+    Slot,
+    BUILTIN,
+    NEGATION,
+    CUT,
+    ONCE,
+    MARKERS,
+)
+from andante.tabling import TableSpace, recursive_predicates, variant
+from andante.planner import plan, plan_clause
+from andante.datalog import materialize
+from andante.collections import LRUCache
+from andante.profiling import Profile, PredicateProfile
+from andante.mathematical_expressions import Comparison, UnificationComparison, Is
+
+def cached_query(query):
+    """ Decorator of Solver.query answering from the cache of the solver
+
+    The substitutions are only stored once all of them were generated.
+    """
+    @functools.wraps(query)
+    def wrapper(self, q, knowledge, sigma=None, **temp_options):
+        key = self._answer_key('query', q, knowledge, sigma, temp_options)
+        answers = self.cache.get(key) if key is not None else None
+        if answers is not None:
+            for s in answers:
+                yield s.copy()
+            return
+        answers = []
+        for s in query(self, q, knowledge, sigma=sigma, **temp_options):
+            answers.append(s.copy())
+            yield s
+        if key is not None:
+            self.cache[key] = answers
+    return wrapper
+
+
+def cached_succeeds_on(succeeds_on):
+    """ Decorator of Solver.succeeds_on answering from the cache of the solver """
+    @functools.wraps(succeeds_on)
+    def wrapper(self, q, knowledge, sigma=None, **temp_options):
+        key = self._answer_key('succeeds_on', q, knowledge, sigma, temp_options)
+        if key is None:
+            return succeeds_on(self, q, knowledge, sigma=sigma, **temp_options)
+        success = self.cache.get(key)
+        if success is None:
+            success = self.cache[key] = succeeds_on(self, q, knowledge, sigma=sigma, **temp_options)
+        return success
+    return wrapper
+
+
+def _literals_key(q):
+    """ Returns a hashable value standing for a goal, a negation or an atom """
+    if isinstance(q, Goal):
+        return tuple(_literals_key(literal) for literal in q)
+    if isinstance(q, Negation):
+        return ('not', _literals_key(q.goal))
+    return q
+
 
 class Solver(ObjectWithTemporaryOptions, ABC):
-    """ Deduction engine """
+    """ Deduction engine 
+
+    The answers of the queries are kept in an andante.collections.LRUCache of
+    options.cache_size items, the attribute cache, whose keys include the
+    generation of the knowledge queried. The answers computed before a 
+    modification of the knowledge are thus never used after it.
+    """
     def __init__(self, options=None):
         super().__init__(options)
+        self.cache = LRUCache(self.options.cache_size)
+        self._table_spaces = weakref.WeakKeyDictionary() # knowledge -> (tabling options, andante.tabling.TableSpace)
             
     @abstractmethod
     def query(self, q, knowledge, verbose=None):
@@ -64,183 +143,782 @@ class Solver(ObjectWithTemporaryOptions, ABC):
         """
         sigmas = self.query(q, knowledge, verbose=verbose)
         return len(sigmas)>0
+    
+    def _is_fact(self, q, knowledge):
+        """ Tells whether a goal is a single ground fact of the knowledge, which proves it without search """
+        if isinstance(q, Goal):
+            if len(q) != 1:
+                return False
+            q, = q
+        if type(q) is not Predicate or self.options.h < 1:
+            return False
+        if self.options.table or self.options.tabling or self.options.verbose > 0 or self.options.profile:
+            return False
+        return self._proves_fact(q, knowledge)
+    
+    @staticmethod
+    def _proves_fact(atom, knowledge):
+        """ Tells whether an atom is a ground fact of the knowledge that proves it whatever the clauses before it 
+
+        A rule of the predicate that may commit, e.g. by a cut, could forbid
+        the fact to be used: the clauses are then to be tried in order.
+        """
+        if not knowledge.has_fact(atom):
+            return False
+        predicate = knowledge.statistics.get(atom.name)
+        return predicate is None or not predicate.commits
+    
+    def _answer_key(self, kind, q, knowledge, sigma, temp_options):
+        """ Returns the key of the answers of a query in the cache, or None if they are not to be cached 
+
+        Goals are keyed by their variant when only the success matters.
+        """
+        self.add_temporary_options(**temp_options)
+        try:
+            options = self.options
+            self.cache.maxsize = options.cache_size
+            if options.cache_size <= 0 or options.verbose > 0 or options.profile:
+                return None
+            settings = (options.h, options.occurs_check, tuple(options.table), options.tabling, options.reorder)
+        finally:
+            self.rem_temporary_options()
+        if sigma is None:
+            if kind == 'succeeds_on':
+                q = variant(q)
+            return (kind, _literals_key(q), None, knowledge.generation, settings)
+        sigma_key = (frozenset(sigma.items()), frozenset(sigma.variables))
+        return (kind, _literals_key(q), sigma_key, knowledge.generation, settings)
+    
+    def _table_space(self, knowledge):
+        """ Returns the tables of the tabled predicates of some knowledge, or None if no predicate is tabled
+
+        The predicates are tabled by the options table and tabling. The tables
+        are kept until the generation of the knowledge changes.
+        """
+        if not self.options.table and not self.options.tabling:
+            return None
+        selection = (frozenset(self.options.table), bool(self.options.tabling))
+        previous, space = self._table_spaces.get(knowledge, (None, None))
+        if previous != selection or space.generation != knowledge.generation:
+            tabled = set(self.options.table)
+            if self.options.tabling:
+                tabled.update(recursive_predicates(knowledge))
+            space = TableSpace(tabled, knowledge.generation)
+            self._table_spaces[knowledge] = (selection, space)
+        return space
 
 class AndanteSolver(Solver):
+    """ Deduction engine based on SLD resolution
+
+    The search is done depth first. Instead of copying the substitution for
+    every alternative clause, all bindings are made in a single
+    andante.substitution.BindingStore. Each time several clauses match an
+    atom, a choice point remembers the position of the trail and the
+    remaining clauses so that backtracking undoes the bindings made since.
+
+    Clauses are used in their compiled form (see andante.compilation):
+    renaming a clause apart only allocates a new frame in the binding store.
+    
+    With the option reorder, the atoms of the query and of the bodies of the
+    clauses are proven in the order chosen by andante.planner, given the 
+    statistics of the knowledge and the arguments bound by the call. The 
+    plans are kept by clause and bound arguments, see explain.
+    
+    With the option profile, the calls of each predicate are counted in the
+    andante.profiling.Profile of the attribute profile, and the answers are
+    not taken from the cache. Every call then keeps a choice point until it
+    fails, so that its fail port is seen.
+    """
+    def __init__(self, options=None):
+        super().__init__(options)
+        self._plans = weakref.WeakKeyDictionary() # statistics -> (generation, (clause, bound arguments) -> literals)
+        self.profile = Profile()
+        
+    @cached_query
     def query(self, q, knowledge, sigma=None, **temp_options):
+        self.add_temporary_options(**temp_options)
+        try:
+            for store, domain in self._proofs(q, knowledge, sigma):
+                yield store.to_substitution(domain)
+        finally:
+            self.rem_temporary_options()
+            
+    def _proofs(self, q, knowledge, sigma, distinct=False):
+        """ Yields the binding store each time a query is proven, with the variables of the query and of sigma, see _solve """
         assert isinstance(knowledge, Knowledge)
         if isinstance(q, (Atom, Negation)):
             q = Goal([q])
         assert isinstance(q, Goal)
         
-        self.add_temporary_options(**temp_options)
+        # Initialisation: variables of the query and of sigma live in frame 0
+        domain = set(sigma.variables) if sigma is not None else set()
+        domain.update(extract_variables(q))
+        variables, fun = slot_mapping(domain)
+        goal = Goal(literal.apply(fun) for literal in q)
+        bindings = [(var.apply(fun), term.apply(fun)) for var, term in sigma.items()] if sigma is not None else []
         
-        # Initialisation
-        sigma0 = sigma.copy() if sigma is not None else Substitution()
-        sigma0.add_variables(q) # add variables from q to domain of sigma
+        store = BindingStore(variables, self.options.occurs_check)
+        for slot, term in bindings:
+            store.bind(slot.index, term, 0)
+        if self.options.reorder:
+            # Queries on examples are repeated by the learners: their plans are kept as well
+            plans = self._plans_of(knowledge)
+            key = (tuple(goal), frozenset(slot for slot, term in bindings if not extract_variables(term)))
+            literals = plans.get(key)
+            if literals is None:
+                literals = plans[key] = plan(goal, key[1], knowledge.statistics).literals
+            goal = Goal(literals)
         
-        generators = [iter([sigma0])] + [None for _ in range(len(q))]
-        i = 0
-        while i>=0:
-            sigma = next(generators[i],None)
-            if sigma is None:
-                i-=1 # backtrack
-                continue
-            if i==len(q):
-                yield sigma.remove_excess_variables(sigma0.variables)
-                continue
+        space = self._table_space(knowledge)
+        for _ in self._solve(goal, 0, knowledge, store, space, distinct):
+            yield store, domain
             
-            if isinstance(q[i], Atom):                
-                generators[i+1] = self._query([q[i]], knowledge, sigma)
-                i+=1
-            else: # isinstance(q[i], Negation)
-                success = self.succeeds_on(q[i].goal, knowledge, sigma=sigma)
-                if not success:
-                    generators[i+1] = iter([sigma])
-                    i+=1
-                # if success, nothing happens, the solution sigma is ignored
-                
-        self.rem_temporary_options()
-            
-    def _query(self, atoms, knowledge, sigma):
+    def _solve(self, goal, frame, knowledge, store, space=None, distinct=False):
         """ Subfunction for query
 
-        This function takes a list of andante.logic_concepts.Atom as inputs and
-        otherwise works the same way as the query method.
+        This function proves the atoms and negations of a compiled goal in the
+        given order. It yields each time the whole goal is proven, the
+        corresponding bindings being available in store until the generator
+        is resumed. Calls to tabled predicates are resolved with the answers
+        of their table in the andante.tabling.TableSpace space.
+        
+        When distinct is True, only the distinct bindings of the proofs 
+        matter, e.g. for the first proof of a goal: a ground call that is a 
+        fact, which no rule of its predicate may cut off, is then proven 
+        once without trying its clauses. Otherwise each of its clauses 
+        proves it in turn, as many times as SLD resolution does.
+        
+        Each literal still to be proven comes with the number of choice points
+        of its clause's call: a cut drops the choice points made since. The 
+        cuts of the goal itself only drop the choice points made in it.
         """
-        s = AndanteState(atoms, sigma.copy())
-        alternate_states = []
+        verbose = self.options.verbose > 0
+        plans = self._plans_of(knowledge) if self.options.reorder else None
+        profile = self.profile if self.options.profile else None
+        clock = Profile.clock
+        goals = self._push(goal, frame, 0, None) # linked list of literals still to be proven
+        choicepoints = []
         count_h = 0
-        while count_h < self.options.h:
-            if not s.has_atoms():
-                yield s.sigma
-                if alternate_states:
-                    s = alternate_states.pop()
-                else:
+        failed = False
+        while True:
+            if failed:
+                # Backtrack to the last choice point
+                if not choicepoints:
                     return
+                atom, frame, rest, clause, alternatives, mark = choicepoints.pop()
+                store.undo(mark)
+                if profile is not None:
+                    counters = profile[atom.name]
+                    if clause is None:
+                        counters.fails += 1
+                        continue
+                    counters.redos += 1
+                    start = clock()
+                failed = False
+            elif goals is None:
+                yield
+                failed = True
+                continue
+            else:
+                literal, frame, cut, rest = goals
+                if verbose: self.verboseprint('\nh', count_h)
+                if verbose and type(literal) is not PredicateProfile: self.verboseprint('Atom', store.resolve(literal, frame))
                 
-            self.verboseprint('\nh', count_h)            
-            
-            atom = s.next_atom()            
-            atom = s.sigma.substitute(atom)
-            self.verboseprint('Atom', atom)
-            
-            if isinstance(atom, (Comparison, Is)):
-                if not atom.evaluate(s.sigma):
-                    if not alternate_states:
-                        return
-                    else:
-                        s = alternate_states.pop()
+                if type(literal) is not Predicate:
+                    if isinstance(literal, Negation):
+                        mark = store.mark()
+                        proven = self._first(literal.goal, frame, knowledge, store, space)
+                        store.undo(mark)
+                        if proven: failed = True
+                        else:      goals = rest
                         continue
-                else:
-                    continue
-            
-            # If a clause has not yet be matched to the atom
-            if not s.next_clause:
-                # 1. Get all clauses whose head matches the atom
-                candidates = knowledge.match(atom)
-                self.verboseprint('Candidates', candidates)
-                if not candidates: 
-                    if not alternate_states:
-                        return
-                    else:
-                        s = alternate_states.pop()
+                    
+                    if isinstance(literal, (Comparison, Is)):
+                        mark = store.mark()
+                        if self._evaluate(literal, frame, store):
+                            goals = rest
+                        else:
+                            store.undo(mark)
+                            failed = True
                         continue
-
-                # 2. Generate new atoms in state
-                c1, *c2n = candidates
-                s.next_clause = c1
-                for c in reversed(c2n):
-                    s_ = s.copy()
-                    s_.next_clause = c
-                    s_.atoms.append(atom)
-                    alternate_states.append(s_)
                     
-                self.verboseprint('Match', candidates)
-                
-            # 3. 
-            count_h  += 1
-            clause   = s.next_clause
-            s.next_clause = None
-            clause   = s.sigma.rename_variables(clause)
-            
-            self.verboseprint('Clause', clause)
-            
-            # Unification of two atoms
-            try:
-                s.sigma.unify(atom, clause.head)
-            except SubstitutionError:
-                self.verboseprint('Unification failed.')
-                if not alternate_states: return
-                else:
-                    curr_state = alternate_states.pop()
-                    continue       
+                    if isinstance(literal, Cut):
+                        del choicepoints[cut:]
+                        goals = rest
+                        continue
                     
-            self.verboseprint('Substitution', s.sigma)
+                    if isinstance(literal, Once):
+                        mark = store.mark()
+                        if self._first(literal.goal, frame, knowledge, store, space):
+                            goals = rest
+                        else:
+                            store.undo(mark)
+                            failed = True
+                        continue
+                    
+                    if isinstance(literal, IfThenElse):
+                        # The bindings of the first proof of the condition are kept for the then goal
+                        mark = store.mark()
+                        if self._first(literal.condition, frame, knowledge, store, space):
+                            goals = self._push(literal.then, frame, cut, rest)
+                        elif literal.otherwise is not None:
+                            store.undo(mark)
+                            goals = self._push(literal.otherwise, frame, cut, rest)
+                        else:
+                            store.undo(mark)
+                            failed = True
+                        continue
                     
-            for b in reversed(clause.body):
-                s.atoms.append(s.sigma.substitute(b))
-            self.verboseprint('Atoms', s.atoms)
+                    if type(literal) is PredicateProfile:
+                        # Pushed after the body of a clause when profiling: the call is proven
+                        literal.exits += 1
+                        goals = rest
+                        continue
+                
+                # Get all clauses whose head matches the atom
+                atom = literal
+                if profile is not None:
+                    counters = profile[atom.name]
+                    counters.calls += 1
+                    start = clock()
+                resolved = store.resolve(atom, frame)
+                tabled = space is not None and space.is_tabled(resolved)
+                if distinct and not tabled and self._proves_fact(resolved, knowledge):
+                    # A ground fact proves the atom once, without renaming nor unification
+                    if count_h >= self.options.h:
+                        return
+                    count_h += 1
+                    if verbose: self.verboseprint('Fact', resolved)
+                    if profile is not None:
+                        counters.candidates += 1
+                        counters.used += 1
+                        counters.exits += 1
+                        counters.time += clock() - start
+                    goals = rest
+                    continue
+                if tabled:
+                    alternatives = iter(space.answers(resolved, lambda call: self._resolve_call(call, knowledge, space)))
+                else:
+                    alternatives = knowledge.match_iter(resolved)
+                if verbose:
+                    candidates = list(alternatives)
+                    self.verboseprint('Candidates', candidates)
+                    alternatives = iter(candidates)
+                clause = next(alternatives, None)
+                mark = store.mark()
+                if profile is not None and clause is not None:
+                    counters.candidates += 1
+                
+            # Resolution of the atom with the next matching clause. The clause 
+            # after it is looked up first: when there is none, the call is 
+            # deterministic and leaves no choice point.
+            while clause is not None:
+                if count_h >= self.options.h:
+                    return
+                count_h += 1
+                if verbose: self.verboseprint('Clause', clause)
+                following = next(alternatives, None)
+                clause = compile_clause(clause)
+                clause_frame = store.allocate(clause.nvars)
+                if profile is not None:
+                    counters.unifications += 1
+                    counters.candidates += following is not None
+                if store.unify(atom, frame, clause.head, clause_frame):
+                    cut = len(choicepoints)
+                    if following is not None or profile is not None:
+                        choicepoints.append((atom, frame, rest, following, alternatives, mark))
+                    body = clause.body if plans is None or len(clause.body) < 2 else self._planned(clause, clause_frame, store, plans, knowledge)
+                    if profile is not None:
+                        counters.used += 1
+                        counters.time += clock() - start
+                        rest = (counters, clause_frame, cut, rest)
+                    goals = self._push(body, clause_frame, cut, rest)
+                    break
+                if verbose: self.verboseprint('Unification failed.')
+                store.undo(mark)
+                clause = following
+            else:
+                if profile is not None:
+                    counters.fails += 1
+                    counters.time += clock() - start
+                failed = True
+                
+    def _first(self, goal, frame, knowledge, store, space):
+        """ Proves a goal, keeping in store the bindings of its first proof, and tells whether it has one """
+        proofs = self._solve(goal, frame, knowledge, store, space, distinct=True)
+        proven = next(proofs, False) is None
+        proofs.close()
+        return proven
+                
+    def _resolve_call(self, call, knowledge, space):
+        """ Yields the instances of a call to a tabled predicate proven by resolution with its clauses 
+
+        A cut in a clause of a tabled predicate only drops the choice points
+        made in its body: all the clauses of the predicate are used.
+        """
+        store = BindingStore((), self.options.occurs_check)
+        store.allocate(len(extract_variables(call)))
+        plans = self._plans_of(knowledge) if self.options.reorder else None
+        for clause in knowledge.match_iter(store.resolve(call, 0)):
+            clause = compile_clause(clause)
+            mark = store.mark()
+            clause_frame = store.allocate(clause.nvars)
+            if store.unify(call, 0, clause.head, clause_frame):
+                body = clause.body if plans is None or len(clause.body) < 2 else self._planned(clause, clause_frame, store, plans, knowledge)
+                # The table only keeps the distinct answers
+                for _ in self._solve(body, clause_frame, knowledge, store, space, distinct=True):
+                    yield store.resolve(call, 0)
+            store.undo(mark)
+                
+    def _plans_of(self, knowledge):
+        """ Returns the plans made for the current statistics of some knowledge """
+        statistics = knowledge.statistics
+        # Statistics updated in place by a modification of the knowledge may no longer allow a plan
+        generation = knowledge.generation
+        previous, plans = self._plans.get(statistics, (None, None))
+        if plans is None or previous != generation:
+            plans = dict()
+            self._plans[statistics] = (generation, plans)
+        return plans
+    
+    def _planned(self, clause, frame, store, plans, knowledge):
+        """ Returns the body of a compiled clause in the order planned for the arguments of its head bound in some frame """
+        head = store.resolve(clause.head, frame)
+        pattern = tuple([not extract_variables(arg) for arg in head.arguments])
+        literals = plans.get((clause, pattern))
+        if literals is None:
+            bound = set()
+            for arg, ground in zip(clause.head.arguments, pattern):
+                if ground:
+                    bound.update(extract_variables(arg))
+            literals = plans[clause, pattern] = plan(clause.body, bound, knowledge.statistics).literals
+        return literals
+    
+    def explain(self, q, knowledge, sigma=None):
+        """ Returns the andante.planner.Plan of a query, or of the body of a clause whose head is called with all its arguments bound
+
+        This is the order in which the literals are proven with the option 
+        reorder, the variables of sigma being bound. Printing the plan 
+        describes it.
+        """
+        if isinstance(q, Clause):
+            return plan_clause(q, knowledge.statistics)
+        if isinstance(q, (Atom, Negation)):
+            q = Goal([q])
+        bound = [var for var, term in sigma.items() if not extract_variables(term)] if sigma is not None else []
+        return plan(q, bound, knowledge.statistics)
+    
+    @staticmethod
+    def _push(literals, frame, cut, goals):
+        """ Returns the linked list of literals of some frame, cutting to cut choice points, followed by goals """
+        for literal in reversed(literals):
+            goals = (literal, frame, cut, goals)
+        return goals
+            
+    def _evaluate(self, literal, frame, store):
+        """ Evaluates an arithmetic or unification literal, binding its variables in store if needed """
+        if isinstance(literal, UnificationComparison) and literal.symbol in ('=', '\\='):
+            mark = store.mark()
+            unified = store.unify(literal.arg1, frame, literal.arg2, frame)
+            if literal.symbol == '=':
+                return unified
+            store.undo(mark)
+            return not unified
+        
+        resolved = store.resolve(literal, frame)
+        if isinstance(resolved, Is) and isinstance(resolved.arg1, Variable):
+            if isinstance(resolved.arg2, Variable):
+                return store.unify(literal.arg1, frame, literal.arg2, frame)
+            try:    value = Constant(resolved.arg2.evaluate(dict()))
+            except: return False
+            return store.unify(literal.arg1, frame, value, frame)
+        return resolved.evaluate(dict())
             
+    @cached_succeeds_on
     def succeeds_on(self, q, knowledge, sigma=None, **temp_options):
         # For literals and atoms
         assert isinstance(q, (Atom, Goal, Negation))
-        
         self.add_temporary_options(**temp_options)
+        try:
+            if sigma is None and self._is_fact(q, knowledge):
+                return True
+            # The answers of the query itself are not to be cached
+            proofs = self._proofs(q, knowledge, sigma, distinct=True)
+            success = next(proofs, None) is not None
+            proofs.close()
+            return success
+        finally:
+            self.rem_temporary_options()
+
+
+
+class CompiledSolver(Solver):
+    """ Deduction engine based on SLD resolution over clauses compiled into Python functions
+
+    The search is the same as the one of AndanteSolver, but each clause is
+    turned into a function (see andante.compilation.clause_function) whose 
+    code is specialised for the arguments of its head: a constant is matched
+    by an inline test, a variable met for the first time simply takes the 
+    argument of the call, and the body is pushed onto the goal list without
+    going through LogicConcept.apply. Terms are represented by plain Python
+    objects during the search (refs, tuples and hash-consed constants) and 
+    only turned back into logic concepts for the output substitutions.
+
+    The functions of the clauses matching a call are kept in a table for each
+    knowledge, by symbol and constant arguments of the call. The parts of a
+    andante.knowledge.MultipleKnowledge have their own tables, which are 
+    dropped as soon as the generation of their knowledge changes.
+    """
+    _ANY = Variable('_')
+    _few = 4 # number of clauses under which all the clauses of a predicate are tried
+    
+    def __init__(self, options=None):
+        super().__init__(options)
+        self._tables = weakref.WeakKeyDictionary() # knowledge -> (generation, table)
+        self._parts  = weakref.WeakKeyDictionary() # knowledge -> knowledges that are not MultipleKnowledge
+    
+    @cached_query
+    def query(self, q, knowledge, sigma=None, **temp_options):
+        self.add_temporary_options(**temp_options)
+        try:
+            start = self._start(q, knowledge, sigma)
+            if start is None:
+                return
+            goals, variables, registers, trail, tables = start
+            for _ in self._solve(goals, tables, trail, self._table_space(knowledge), root=True):
+                names = dict(zip(registers, variables))
+                s = Substitution()
+                s.add_variables(variables)
+                for ref, var in zip(registers, variables):
+                    if ref.value is not None:
+                        term = to_term(ref.value, names)
+                        s.add_variables(term)
+                        s.subst[var] = term
+                yield s
+        finally:
+            self.rem_temporary_options()
+    
+    @cached_succeeds_on
+    def succeeds_on(self, q, knowledge, sigma=None, **temp_options):
+        self.add_temporary_options(**temp_options)
+        try:
+            if sigma is None and self._is_fact(q, knowledge):
+                return True
+            start = self._start(q, knowledge, sigma)
+            if start is None:
+                return False
+            goals, _, _, trail, tables = start
+            solutions = self._solve(goals, tables, trail, self._table_space(knowledge), root=True, distinct=True)
+            success = any(True for _ in solutions)
+            solutions.close()
+            return success
+        finally:
+            self.rem_temporary_options()
+            
+    def _start(self, q, knowledge, sigma):
+        """ Returns the goal list of a query, its variables and their refs, the trail and the tables of the knowledge 
+
+        Returns None if the initial substitution sigma cannot be applied. 
+        """
+        assert isinstance(knowledge, Knowledge)
+        if isinstance(q, Negation):
+            q = Goal([q])
+        assert isinstance(q, (Goal, Atom))
         
-        if sigma is None:
-            sigma = Substitution()
-            sigma.add_variables(q)
-        else:
-            sigma = sigma.copy()
+        variables, literals = compile_query(q)
+        bindings = []
+        if sigma is not None:
+            variables, fun = slot_mapping(variables)
+            for var in sigma.variables: fun(var)
+            bindings = [(var.apply(fun), term.apply(fun)) for var, term in sigma.items()]
+        registers = tuple(Ref() for _ in variables)
+        
+        trail = []
+        for slot, term in bindings:
+            if not unify(registers[slot.index], build(term, registers), trail, self.options.occurs_check):
+                return None
+        return instantiate(literals, registers), variables, registers, trail, self._tables_of(knowledge)
             
-        if   isinstance(q, Negation):
-            output_gen = self.query(q.goal, knowledge, sigma=sigma)
-            sol_exists = next(output_gen, None) is not None
-            success    = not sol_exists
-        else:
-            output_gen = self.query(q, knowledge, sigma=sigma)
-            sol_exists = next(output_gen, None) is not None
-            success    = sol_exists
+    def _tables_of(self, knowledge):
+        """ Returns the pairs (knowledge, table) of the parts of some knowledge, with up to date tables 
+
+        A table maps the symbol and arity of a predicate to the functions of 
+        all its clauses, paired with the arguments of its ground facts, and, 
+        for predicates with more than a few clauses, the symbol and constant 
+        arguments of a call to the functions of the clauses matching it.
+        """
+        tables = []
+        for part in self._parts_of(knowledge):
+            generation, table = self._tables.get(part, (None, None))
+            if generation != part.generation:
+                table = dict()
+                self._tables[part] = (part.generation, table)
+            tables.append((part, table))
+        return tables
+    
+    def _parts_of(self, knowledge):
+        """ Returns the knowledges composing some knowledge that are not andante.knowledge.MultipleKnowledge 
+
+        An andante.knowledge.OverlayKnowledge that hides no clause of its base
+        is composed of its delta and of the parts of its base.
+        """
+        parts = self._parts.get(knowledge)
+        # Clauses hidden since the parts of an overlay were cached are not hidden in its parts
+        if parts is None or (type(knowledge) is OverlayKnowledge and knowledge.removed):
+            if isinstance(knowledge, OverlayKnowledge) and not knowledge.removed:
+                self._parts[knowledge] = [knowledge.delta] + self._parts_of(knowledge.base)
+            elif isinstance(knowledge, MultipleKnowledge):
+                self._parts[knowledge] = [part for k in knowledge.knowledges for part in self._parts_of(k)]
+            else:
+                self._parts[knowledge] = [knowledge]
+        return self._parts[knowledge]
             
-        if sol_exists: # generator is not finished, we need to do the following manually
-            self.rem_temporary_options()
+    def _candidates(self, symbol, args, tables, distinct=False):
+        """ Returns the functions of the clauses matching a call, given the constants among its arguments 
+
+        Returns None if only the distinct proofs of the call matter, see 
+        _solve, and the call is a ground fact of a predicate with more than a
+        few clauses, whose arguments are then found in the set returned by 
+        Knowledge.facts, and none of whose rules may commit (see 
+        andante.statistics.may_commit). Trying the functions of a few clauses
+        costs less.
+        """
+        candidates = None
+        key = (symbol, len(args))
+        pattern = None
+        for knowledge, table in tables:
+            entry = table.get(key)
+            if entry is None:
+                entry = table[key] = (self._match(knowledge, symbol, (None,)*len(args)), knowledge.facts('%s/%d' % key))
+            functions, facts = entry
+            if len(functions) > self._few:
+                if pattern is None:
+                    ground = tuple([deref(arg) for arg in args])
+                    pattern = tuple([arg if type(arg) is Constant else None for arg in ground])
+                if distinct and facts and ground in facts and not self._commits('%s/%d' % key, tables):
+                    return None
+                functions = table.get(key + pattern)
+                if functions is None:
+                    functions = table[key + pattern] = self._match(knowledge, symbol, pattern)
+            if not functions:
+                continue
+            if candidates is None:
+                candidates = functions
+            else:
+                candidates = candidates + [f for f in functions if f not in candidates]
+        return candidates if candidates is not None else []
+    
+    @staticmethod
+    def _commits(name, tables):
+        """ Tells whether a rule of the predicate of some name, in any part of the knowledge, may commit """
+        for knowledge, _ in tables:
+            predicate = knowledge.statistics.get(name)
+            if predicate is not None and predicate.commits:
+                return True
+        return False
+    
+    def _match(self, knowledge, symbol, constants):
+        """ Returns the functions of the clauses of the knowledge matching some constant arguments (None for any argument) """
+        atom = Predicate(symbol, [self._ANY if arg is None else arg for arg in constants])
+        return [clause_function(clause) for clause in knowledge.match(atom)]
+            
+    def _solve(self, goals, tables, trail, space=None, root=False, distinct=False):
+        """ Subfunction for query
+
+        This function proves a goal list. It yields each time the whole list
+        is proven, the bindings being kept until the generator is resumed.
+        Calls to tabled predicates are resolved with the answers of their 
+        table in the andante.tabling.TableSpace space.
         
-        self.rem_temporary_options()
-        return success
+        A call with a single clause left to try leaves no choice point. When
+        the goal list is the one of the query, root, and no choice point is
+        left, no binding can be undone any more: the trail is emptied, so 
+        that the refs of the clauses already proven are freed. As the goal 
+        list only holds the calls still to be proven, deterministic tail 
+        recursions run in constant memory.
+        
+        As with andante.solver.AndanteSolver, a ground call that is a fact 
+        is proven once without trying its clauses only when distinct is True.
+        """
+        verbose = self.options.verbose > 0
+        occurs_check = self.options.occurs_check
+        h = self.options.h
+        choicepoints = []
+        count_h = 0
+        failed = False
+        while True:
+            if failed:
+                # Backtrack to the last choice point
+                if not choicepoints:
+                    return
+                args, rest, clause, alternatives, mark = choicepoints.pop()
+                undo(trail, mark)
+                failed = False
+            elif goals is None:
+                yield
+                failed = True
+                continue
+            else:
+                key, args, rest = goals
+                if verbose: self.verboseprint('\nh', count_h)
+                if root and not choicepoints and trail:
+                    trail.clear()
+                
+                if key in MARKERS:
+                    if key is NEGATION:
+                        mark = len(trail)
+                        proven = self._first(args, tables, trail, space)
+                        undo(trail, mark)
+                        if proven: failed = True
+                        else:      goals = rest
+                        continue
+                    
+                    if key is BUILTIN:
+                        mark = len(trail)
+                        if self._evaluate(*args, trail, occurs_check):
+                            goals = rest
+                        else:
+                            undo(trail, mark)
+                            failed = True
+                        continue
+                    
+                    if key is CUT:
+                        del choicepoints[args:]
+                        goals = rest
+                        continue
+                    
+                    # once and if-then-else keep the bindings of the first proof of their goal
+                    condition, then, otherwise = (args, rest, None) if key is ONCE else args
+                    mark = len(trail)
+                    if self._first(condition, tables, trail, space):
+                        goals = then
+                    elif otherwise is not None:
+                        undo(trail, mark)
+                        goals = otherwise
+                    else:
+                        undo(trail, mark)
+                        failed = True
+                    continue
+                
+                if verbose: self.verboseprint('Atom', to_term((key,) + args, dict()))
+                if space is not None and '%s/%d' % (key, len(args)) in space.tabled:
+                    call = self._call(key, args)
+                    answers = space.answers(call, lambda call: self._resolve_call(call, tables, space))
+                    alternatives = iter([clause_function(answer) for answer in answers])
+                else:
+                    candidates = self._candidates(key, args, tables, distinct)
+                    if candidates is None:
+                        # A ground fact proves the call once, without trying its clauses
+                        if count_h >= h:
+                            return
+                        count_h += 1
+                        goals = rest
+                        continue
+                    alternatives = iter(candidates)
+                clause = next(alternatives, None)
+                mark = len(trail)
+                
+            # Resolution of the call with the next matching clause, leaving a
+            # choice point only if there is a clause after it
+            while clause is not None:
+                if count_h >= h:
+                    return
+                count_h += 1
+                following = next(alternatives, None)
+                body = clause(args, rest, trail, occurs_check, len(choicepoints))
+                if body is not False:
+                    if following is not None:
+                        choicepoints.append((args, rest, following, alternatives, mark))
+                    goals = body
+                    break
+                if len(trail) > mark:
+                    undo(trail, mark)
+                clause = following
+            else:
+                failed = True
+                
+    def _first(self, goals, tables, trail, space):
+        """ Proves a goal list, keeping the bindings of its first proof, and tells whether it has one """
+        proofs = self._solve(goals, tables, trail, space, distinct=True)
+        proven = next(proofs, False) is None
+        proofs.close()
+        return proven
+                
+    @staticmethod
+    def _call(symbol, args):
+        """ Returns the atom of a call from its symbol and runtime arguments """
+        names = dict()
+        return Predicate(symbol, [to_term(arg, names) for arg in args])
+        
+    def _resolve_call(self, call, tables, space):
+        """ Yields the instances of a call to a tabled predicate proven by resolution with its clauses 
 
+        As with andante.solver.AndanteSolver, a cut in a clause of a tabled
+        predicate only drops the choice points made in its body.
+        """
+        variables, literals = compile_query(call)
+        registers = tuple(Ref() for _ in variables)
+        args = tuple(build(arg, registers) for arg in literals[0].arguments)
+        trail = []
+        # The table only keeps the distinct answers
+        candidates = self._candidates(call.symbol, args, tables, distinct=True)
+        if candidates is None:
+            yield call
+            return
+        for clause in candidates:
+            body = clause(args, None, trail, self.options.occurs_check, 0)
+            if body is not False:
+                for _ in self._solve(body, tables, trail, space, distinct=True):
+                    yield self._call(call.symbol, args)
+            undo(trail, 0)
             
-class AndanteState:
-    """ State used in function _query
-
-    Attributes
-    ----------
-    sigma : andante.substitution.Substitution
-        The substitution at a given state
-    atoms : list of aloe.logic_concepts.Atom
-        List of atoms that still need to be proven true
-    curr_atom : aloe.logic_concepts.Atom
-        The current atom we try to make true
-    next_clause : aloe.logic_concepts.Clause
-        The clause we need to observe next
-    """
-    def __init__(self, atoms, sigma=None, next_clause=None):
-        assert isinstance(atoms, list) and all(isinstance(atom, Atom) for atom in atoms)
-        assert sigma is None or isinstance(sigma, Substitution)
-        assert next_clause is None or isinstance(next_clause, Clause)
-        if not sigma:
-            sigma = Substitution()
-            sigma.rename_variables(atoms)
-        self.sigma = sigma
-        self.atoms = atoms
-        self.curr_atom = None
-        self.next_clause = next_clause
+    def _evaluate(self, literal, registers, trail, occurs_check):
+        """ Evaluates an arithmetic or unification literal, binding its variables if needed """
+        if isinstance(literal, UnificationComparison) and literal.symbol in ('=', '\\='):
+            mark = len(trail)
+            unified = unify(build(literal.arg1, registers), build(literal.arg2, registers), trail, occurs_check)
+            if literal.symbol == '=':
+                return unified
+            undo(trail, mark)
+            return not unified
         
-    def copy(self):
-        return AndanteState(self.atoms.copy(), self.sigma.copy(), self.next_clause)
-    
-    def has_atoms(self):
-        return len(self.atoms)>0
-    
-    def next_atom(self):
-        self.curr_atom = self.atoms.pop()
-        return self.curr_atom
+        names = dict()
+        resolved = literal.apply(lambda e: to_term(registers[e.index], names) if type(e) is Slot else e)
+        if isinstance(resolved, Is) and isinstance(resolved.arg1, Variable):
+            if isinstance(resolved.arg2, Variable):
+                return unify(build(literal.arg1, registers), build(literal.arg2, registers), trail, occurs_check)
+            try:    value = Constant(resolved.arg2.evaluate(dict()))
+            except: return False
+            return unify(build(literal.arg1, registers), value, trail, occurs_check)
+        return resolved.evaluate(dict())
+
+
+class DatalogSolver(AndanteSolver):
+    """ Deduction engine evaluating the Datalog predicates of the knowledge bottom-up
+
+    The relations of the predicates of the knowledge whose clauses, and the
+    clauses of the predicates they depend on, are Datalog clauses are 
+    computed by semi-naive iteration (see andante.datalog). Their calls are
+    resolved with the facts derived, so that proving a ground atom of such 
+    a predicate is a lookup, and recursion always terminates. As the facts
+    derived form a set, such a call has one proof for each of them, however
+    many derivations it has. The other predicates are resolved as by 
+    AndanteSolver.
+
+    When clauses are added to or removed from the knowledge, e.g. the 
+    clauses learned by andante.learner.ProgolLearner, the relations are 
+    updated with the facts derived or no longer derived from them rather 
+    than computed again. When the knowledge is an 
+    andante.knowledge.OverlayKnowledge, e.g. a hypothesis added to the 
+    background, only the predicates depending on the ones modified are 
+    computed.
+    """
+    @cached_query
+    def query(self, q, knowledge, sigma=None, **temp_options):
+        assert isinstance(knowledge, Knowledge)
+        return AndanteSolver.query.__wrapped__(self, q, materialize(knowledge), sigma=sigma, **temp_options)
+
+    @cached_succeeds_on
+    def succeeds_on(self, q, knowledge, sigma=None, **temp_options):
+        assert isinstance(knowledge, Knowledge)
+        return AndanteSolver.succeeds_on.__wrapped__(self, q, materialize(knowledge), sigma=sigma, **temp_options)
@@ -0,0 +1,291 @@
+"""
+Statistics of the clauses of a knowledge.
+
+For each predicate, the number of its clauses, how many of them are ground
+facts and how many are rules, and for each argument the number of clauses
+having each value at that argument. Values are the keys used to index the
+clauses (see andante.knowledge.index_key): constants, the symbol and arity
+of compound terms, and no value for variables. These statistics tell how
+selective a call is without going through the clauses, e.g. to order the
+literals of a body or to monitor a knowledge. The number of rules that may
+commit to their clause, by a cut, a once or an if-then-else in their body,
+tells whether a ground fact is enough to prove a call.
+
+Knowledges keep their statistics up to date as clauses are added and
+removed (see andante.knowledge.Knowledge.statistics).
+
+License
+-------
+
+This software is distributed under the terms of both the MIT license and the
+Apache License (Version 2.0).
+
+See LICENSE for details.
+
+Acknowlegment
+-------------
+
+This software has benefited from the support of Wallonia thanks to the funding
+of the ARIAC project (https://trail.ac), a project part of the
+DigitalWallonia4.ai initiative (https://www.digitalwallonia.be).
+
+It was done by Simon Jacquet at the University of Namur (https://www.unamur.be)
+in the period of October 1st 2021 to August 31st 2022 under the supervision of
+Isabelle Linden, Jean-Marie Jacquet and Wim Vanhoof.
+"""
+
+from collections import Counter
+from andante.logic_concepts import Constant, Variable, Cut, Once, IfThenElse, extract_variables
+
+
+def _is_bound(term, bound):
+    """ Tells whether a term is bound: a constant, or a term whose variables are all in bound """
+    if type(term) is Constant:
+        return True
+    if isinstance(term, Variable):
+        return term in bound
+    return extract_variables(term) <= set(bound)
+
+
+def may_commit(clause):
+    """ Tells whether the body of a clause has a cut, a once or an if-then-else, which may commit to the choices made """
+    return any(isinstance(literal, (Cut, Once, IfThenElse)) for literal in clause.body or ())
+
+
+class PredicateStatistics:
+    """ Statistics of the clauses of a predicate
+
+    Attributes
+    ----------
+    name : str
+        The name of the predicate
+    arity : int
+        The number of arguments of the predicate
+    clauses : int
+        The number of clauses of the predicate
+    facts : int
+        The number of ground unit clauses of the predicate
+    rules : int
+        The number of clauses of the predicate having a body
+    commits : int
+        The number of rules of the predicate that may commit, see may_commit
+    values : list of dict
+        For each argument, maps the values met at that argument to the
+        number of clauses having them
+    """
+    def __init__(self, name, arity):
+        self.name = name
+        self.arity = arity
+        self.clauses = 0
+        self.facts = 0
+        self.rules = 0
+        self.commits = 0
+        self.values = [dict() for _ in range(arity)]
+
+    def distinct(self, position):
+        """ Returns the number of distinct values of some argument """
+        return len(self.values[position])
+
+    def update(self, keys, fact, rule, n=1, commit=False):
+        """ Counts n clauses more, of some argument keys, which are ground facts or rules or neither, and may commit or not """
+        self.clauses += n
+        self.facts += n if fact else 0
+        self.rules += n if rule else 0
+        self.commits += n if commit else 0
+        for values, key in zip(self.values, keys):
+            if key is not None:
+                count = values.get(key, 0) + n
+                if count:
+                    values[key] = count
+                else:
+                    del values[key]
+
+    def __repr__(self):
+        return 'PredicateStatistics(%s, clauses=%d, facts=%d, rules=%d, commits=%d, distinct=%s)' % (
+            self.name, self.clauses, self.facts, self.rules, self.commits, [len(v) for v in self.values])
+
+
+class Statistics:
+    """ Statistics of the clauses of a knowledge, by predicate, see andante.statistics
+
+    Attributes
+    ----------
+    predicates : dict of andante.statistics.PredicateStatistics
+        Given a predicate name, returns the statistics of its clauses
+    """
+    def __init__(self, clauses=()):
+        self.predicates = dict()
+        for clause in clauses:
+            self.add(clause)
+
+    def add(self, clause, keys=None, fact=None, n=1):
+        """ Counts a clause, given the keys of the arguments of its head and whether it is a ground fact if they are known
+
+        A negative n uncounts the clause.
+        """
+        head = clause.head
+        if head is None:
+            return
+        if keys is None:
+            from andante.knowledge import index_key
+            keys = [index_key(term) for term in head.arguments]
+        if fact is None:
+            fact = not clause.body and not extract_variables(head)
+        name = head.name
+        predicate = self.predicates.get(name)
+        if predicate is None:
+            predicate = self.predicates[name] = PredicateStatistics(name, head.arity)
+        predicate.update(keys, fact, bool(clause.body), n, may_commit(clause))
+        if not predicate.clauses:
+            del self.predicates[name]
+
+    def add_all(self, name, arity, keys, facts, rules, commits=0):
+        """ Counts the clauses of a predicate given the keys of the arguments of their heads, the number of ground facts, of rules and of rules that may commit among them """
+        if not keys:
+            return
+        predicate = self.predicates.get(name)
+        if predicate is None:
+            predicate = self.predicates[name] = PredicateStatistics(name, arity)
+        predicate.clauses += len(keys)
+        predicate.facts += facts
+        predicate.rules += rules
+        predicate.commits += commits
+        for values, column in zip(predicate.values, zip(*keys)):
+            counts = Counter(column)
+            counts.pop(None, None)
+            if not values:
+                values.update(counts)
+            else:
+                for key, n in counts.items():
+                    values[key] = values.get(key, 0) + n
+
+    def remove(self, clause, keys=None, fact=None):
+        """ Uncounts a clause, which must have been counted """
+        self.add(clause, keys, fact, -1)
+
+    def get(self, name):
+        """ Returns the statistics of the predicate of some name, or None if it has no clause """
+        return self.predicates.get(name)
+
+    def __getitem__(self, name):
+        predicate = self.get(name)
+        if predicate is None:
+            return PredicateStatistics(name, int(name.rsplit('/', 1)[1]))
+        return predicate
+
+    def __contains__(self, name):
+        return self.get(name) is not None
+
+    def __iter__(self):
+        return iter(self.predicates.values())
+
+    def cardinality(self, name):
+        """ Returns the number of clauses of the predicate of some name """
+        predicate = self.get(name)
+        return predicate.clauses if predicate is not None else 0
+
+    def distinct(self, name, position):
+        """ Returns the number of distinct values of some argument of the predicate of some name """
+        predicate = self.get(name)
+        return predicate.distinct(position) if predicate is not None else 0
+
+    def ground_fraction(self, name=None):
+        """ Returns the fraction of ground facts among the clauses of the predicate of some name, or of all clauses """
+        predicates = list(self) if name is None else [self[name]]
+        clauses = sum(p.clauses for p in predicates)
+        return sum(p.facts for p in predicates) / clauses if clauses else 0.
+
+    def selectivity(self, atom, bound=()):
+        """ Returns the estimated number of clauses matching some atom, some variables being bound to values
+
+        An argument is bound when it is not a variable, or when its variables
+        are in bound. Values are assumed to be uniformly distributed and 
+        arguments independent: each bound argument divides the number of 
+        clauses of the predicate by the number of distinct values of the 
+        argument.
+        """
+        predicate = self.get(atom.name)
+        if predicate is None:
+            return 0.
+        estimate = float(predicate.clauses)
+        for values, term in zip(predicate.values, atom.arguments):
+            if _is_bound(term, bound):
+                estimate /= max(1, len(values))
+        return estimate
+
+    def copy(self):
+        statistics = Statistics()
+        statistics.update(self)
+        return statistics
+
+    def update(self, other, n=1):
+        """ Counts the clauses counted by other statistics, or uncounts them if n is -1 """
+        for p in other:
+            self._update_predicate(p, n)
+
+    def _update_predicate(self, p, n=1):
+        """ Counts the clauses counted by the statistics p of a predicate, or uncounts them if n is -1 """
+        predicate = self.predicates.get(p.name)
+        if predicate is None:
+            predicate = self.predicates[p.name] = PredicateStatistics(p.name, p.arity)
+        predicate.clauses += n * p.clauses
+        predicate.facts += n * p.facts
+        predicate.rules += n * p.rules
+        predicate.commits += n * p.commits
+        for values, others in zip(predicate.values, p.values):
+            for key, count in others.items():
+                count = values.get(key, 0) + n * count
+                if count:
+                    values[key] = count
+                else:
+                    del values[key]
+        if not predicate.clauses:
+            del self.predicates[p.name]
+
+    @staticmethod
+    def combine(*statistics):
+        """ Returns the statistics of the clauses counted by some statistics, counting each of them as many times as it is counted """
+        combined = Statistics()
+        for s in statistics:
+            combined.update(s)
+        return combined
+
+    def __repr__(self):
+        return 'Statistics(%s)' % ', '.join(repr(p) for p in self)
+
+
+class CombinedStatistics(Statistics):
+    """ Statistics of the clauses counted by other statistics, but some clauses
+
+    The statistics of a predicate are only combined when they are asked for,
+    so that combining the statistics of a small knowledge with the ones of a
+    large knowledge costs as much as the predicates used.
+
+    Attributes
+    ----------
+    parts : list of andante.statistics.Statistics
+        The statistics combined, which must not change
+    removed : dict of iterable of andante.logic_concepts.Clause
+        Given a predicate name, returns clauses counted by the parts but not
+        to be counted
+    """
+    def __init__(self, parts, removed=None):
+        super().__init__()
+        self.parts = parts
+        self.removed = removed if removed is not None else dict()
+        self._combined = set() # Names of the predicates whose statistics were combined
+
+    def get(self, name):
+        if name not in self._combined:
+            self._combined.add(name)
+            for part in self.parts:
+                predicate = part.get(name)
+                if predicate is not None:
+                    self._update_predicate(predicate)
+            for clause in self.removed.get(name, ()):
+                self.remove(clause)
+        return self.predicates.get(name)
+
+    def __iter__(self):
+        predicates = [self.get(name) for name in {p.name for part in self.parts for p in part}]
+        return iter([p for p in predicates if p is not None])
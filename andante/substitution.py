@@ -20,6 +20,7 @@ Isabelle Linden, Jean-Marie Jacquet and Wim Vanhoof.
 """
 
 from andante.logic_concepts import Clause, Constant, Variable, Function, Goal, Type, extract_variables
+from andante.compilation import Slot
 from andante.utils import generate_variable_names, multiple_replace
 import re
 class SubstitutionError(Exception):
@@ -30,6 +31,12 @@ class SubstitutionError(Exception):
 class Substitution:
     """ Substitution as defined in first order logic
 
+    The substitution is stored in triangular form: a variable may be mapped to
+    a term containing variables that are themselves mapped to other terms.
+    Bindings are thus never rewritten when a new binding is made, and are only
+    dereferenced when the substitution is applied, e.g. through __getitem__ or
+    substitute.
+
     Attributes
     ----------
     variables : set of andante.logic_concepts.Variable
@@ -37,12 +44,15 @@ class Substitution:
     tally : dict of int
         Gives for a variable symbol, the highest tally number
     subst : dict of andante.logic_concepts.Term
-        Mapping of variables to terms
+        Mapping of variables to terms, in triangular form
+    occurs_check : bool
+        Whether to forbid binding a variable to a term containing it
     """
-    def __init__(self):
+    def __init__(self, occurs_check=True):
         self.variables = set()
         self.tally = dict()
         self.subst = dict()
+        self.occurs_check = occurs_check
         
         from andante.parser import Parser
         self.parser = Parser()
@@ -96,7 +106,7 @@ class Substitution:
         
     def copy(self):
         """ Returns a deep copy of itself """
-        sigma = Substitution()
+        sigma = Substitution(self.occurs_check)
         sigma.variables = self.variables.copy()
         sigma.tally = self.tally.copy()
         sigma.subst = self.subst.copy()
@@ -104,16 +114,36 @@ class Substitution:
     
     def __contains__(self, var): return var in self.variables
     def __iter__(self):          return iter(self.variables)
-    def __repr__(self):          return repr(self.subst)
+    def __repr__(self):          return repr({key:self[key] for key in self.subst})
 
     def __getitem__(self, key):
+        """ Returns the term to which the substitution maps the variable key, fully dereferenced """
         if   key not in self.variables:
             message = str(key)
             raise KeyError(message)
-        elif key in self.subst:
-            return self.subst[key]
+        term = self.deref(key)
+        if isinstance(term, Variable):
+            return term
         else:
-            return key
+            return self.substitute(term)
+        
+    def deref(self, term):
+        """ Follows the mapping of a variable until an unmapped variable or a non-variable term """
+        subst = self.subst
+        while term in subst:
+            term = subst[term]
+        return term
+    
+    def occurs(self, var, term):
+        """ Tells whether the unmapped variable var occurs in some term once dereferenced """
+        terms = [term]
+        while terms:
+            term = self.deref(terms.pop())
+            if term is var:
+                return True
+            elif isinstance(term, Function):
+                terms.extend(term.arguments)
+        return False
         
     def __setitem__(self, key, item):
         """ 
@@ -123,26 +153,33 @@ class Substitution:
         ------
         KeyError
             If the key is not present in the set of variables
+        SubstitutionError
+            If the occurs check is enabled and item contains key
         """
         if   key not in self.variables:
             message = str(key)
             raise KeyError(message)
-        elif key == item:
+        elif key in self.subst:
+            self.unify(self.subst[key], item)
             return
-        elif key.is_in(item): 
+        # A variable item may be mapped to a term containing key
+        term = self.deref(item)
+        if term is key:
+            return
+        elif self.occurs_check and isinstance(term, Function) and self.occurs(key, term): 
             raise SubstitutionError(key, item)
-        elif key not in self.subst:
+        else:
             self.subst[key] = item
-        else: #key in self.subst
-            self.subst[key] = self.unify(self.subst[key],item)
-
-        for key in self.subst:
-            self.subst[key] = self.substitute(self.subst[key])
 
     def unify(self, atom1, atom2):
         """
         Tries to match two expressions together and iteratively updates self.subst
 
+        Returns
+        -------
+        andante.logic_concepts.Term
+            The unified expression, whose variables may still be mapped by self.subst
+
         Raises
         ------
         SubstitutionError
@@ -162,10 +199,10 @@ class Substitution:
                 return atom1.__class__(atom1.symbol, t)
         elif isinstance(atom1, Variable) and isinstance(atom2, (Constant, Function)):
             self[atom1] = atom2
-            return self[atom1]
+            return self.deref(atom1)
         elif isinstance(atom1, (Constant, Variable, Function)) and isinstance(atom2, Variable):
             self[atom2] = atom1
-            return self[atom2]
+            return self.deref(atom2)
         elif isinstance(atom1, Type):
             if   isinstance(atom2, (Constant, Function)): raise SubstitutionError(atom1, atom2)
             elif isinstance(atom2, Variable): 
@@ -223,3 +260,161 @@ class Substitution:
                 s.add_variables(self[key])
                 s.subst[key] = self[key]
         return s
+
+
+class BindingStore:
+    """ Mutable bindings of variables recorded on a trail
+
+    Contrary to andante.substitution.Substitution, whose bindings are copied
+    for every alternative explored, a binding store is shared by all the
+    alternatives of a search. Every binding is pushed onto a trail so that
+    backtracking to a choice point undoes the bindings made since, as done by
+    the Warren Abstract Machine.
+
+    The store works on compiled clauses (see andante.compilation), whose
+    variables are slots numbered from 0. A term of a compiled clause only
+    makes sense along with a frame: slot i of a term in frame f is the variable
+    at address f+i. Renaming a clause apart thus amounts to allocating a new
+    frame for its slots, without building any new term. Frame 0 holds the
+    variables of the query.
+
+    Variables are bound to terms that may themselves contain bound variables.
+    The terms are only dereferenced when needed. When two unbound variables are
+    unified, the youngest one is bound to the oldest one, so that chains of
+    bindings do not grow with the depth of the resolution.
+
+    Attributes
+    ----------
+    bindings : dict of tuple
+        Maps every bound address to the term it is bound to and its frame
+    trail : list of int
+        All bound addresses, in the order in which they were bound
+    top : int
+        The first address that is not allocated yet
+    variables : list of andante.logic_concepts.Variable
+        The variables of the query, ordered by their address in frame 0
+    occurs_check : bool
+        Whether to forbid binding a variable to a term containing it
+    """
+    def __init__(self, variables=(), occurs_check=True):
+        self.bindings = dict()
+        self.trail = list()
+        self.variables = list(variables)
+        self.top = len(self.variables)
+        self.occurs_check = occurs_check
+        
+    def mark(self):
+        """ Returns the current position of the trail, to which one can later backtrack """
+        return len(self.trail)
+    
+    def undo(self, mark):
+        """ Undoes all bindings made since the trail was at position mark """
+        trail, bindings = self.trail, self.bindings
+        while len(trail) > mark:
+            del bindings[trail.pop()]
+            
+    def allocate(self, nvars):
+        """ Allocates a new frame of nvars variables and returns it """
+        frame = self.top
+        self.top += nvars
+        return frame
+    
+    def variable(self, address):
+        """ Returns the variable that stands for the unbound variable at some address """
+        if address < len(self.variables):
+            return self.variables[address]
+        else:
+            return Variable('_G', address)
+    
+    def deref(self, term, frame):
+        """ Follows the bindings of a slot until an unbound slot or a non-variable term """
+        bindings = self.bindings
+        while isinstance(term, Slot):
+            binding = bindings.get(frame + term.index)
+            if binding is None:
+                break
+            term, frame = binding
+        return term, frame
+    
+    def resolve(self, expr, frame):
+        """ Applies all bindings to some expression of a given frame 
+        
+        Unbound variables are replaced by the variable given by self.variable
+        """
+        def fun(el):
+            if isinstance(el, Slot):
+                term, f = self.deref(el, frame)
+                if isinstance(term, Slot):
+                    return self.variable(f + term.index)
+                return self.resolve(term, f)
+            return el
+        return expr.apply(fun)
+    
+    def occurs(self, address, term, frame):
+        """ Tells whether the unbound variable at some address occurs in some term given the current bindings """
+        terms = [(term, frame)]
+        while terms:
+            term, frame = self.deref(*terms.pop())
+            if isinstance(term, Slot):
+                if frame + term.index == address:
+                    return True
+            elif isinstance(term, Function):
+                terms.extend((arg, frame) for arg in term.arguments)
+        return False
+    
+    def bind(self, address, term, frame):
+        """ Binds the unbound variable at some address to some term and records it on the trail """
+        self.bindings[address] = (term, frame)
+        self.trail.append(address)
+    
+    def unify(self, term1, frame1, term2, frame2):
+        """ 
+        Tries to unify two expressions, binding their variables
+
+        Returns
+        -------
+        bool
+            Whether the unification succeeded. If not, some bindings may have
+            been made and have to be undone by backtracking.
+        """
+        pairs = [(term1, frame1, term2, frame2)]
+        while pairs:
+            t1, f1, t2, f2 = pairs.pop()
+            t1, f1 = self.deref(t1, f1)
+            t2, f2 = self.deref(t2, f2)
+            if isinstance(t1, Slot) and isinstance(t2, Slot):
+                a1, a2 = f1 + t1.index, f2 + t2.index
+                if   a1 < a2: self.bind(a2, t1, f1)
+                elif a2 < a1: self.bind(a1, t2, f2)
+            elif isinstance(t1, Slot):
+                a1 = f1 + t1.index
+                if self.occurs_check and isinstance(t2, Function) and self.occurs(a1, t2, f2): 
+                    return False
+                self.bind(a1, t2, f2)
+            elif isinstance(t2, Slot):
+                a2 = f2 + t2.index
+                if self.occurs_check and isinstance(t1, Function) and self.occurs(a2, t1, f1): 
+                    return False
+                self.bind(a2, t1, f1)
+            elif isinstance(t1, Function) and isinstance(t2, Function):
+                if t1.symbol != t2.symbol or t1.arity != t2.arity:
+                    return False
+                pairs.extend((x1, f1, x2, f2) for x1, x2 in zip(t1.arguments, t2.arguments))
+            elif isinstance(t1, (Constant, Function, Type)) and isinstance(t2, (Constant, Function, Type)):
+                if t1 is not t2:
+                    return False
+            else:
+                message = "Either %s or %s isn't a Constant, Variable, Function or Type object" % (str(t1), str(t2))
+                raise TypeError(message)
+        return True
+    
+    def to_substitution(self, domain):
+        """ Returns the substitution of the query variables of some domain given the current bindings """
+        s = Substitution()
+        s.add_variables(domain)
+        for address, var in enumerate(self.variables):
+            if var in domain and address in self.bindings:
+                term = self.resolve(Slot(address), 0)
+                s.add_variables(term)
+                s.subst[var] = term
+        return s
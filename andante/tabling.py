@@ -0,0 +1,188 @@
+"""
+Tabling of predicates for the deduction engines.
+
+A call to a tabled predicate is not resolved against the clauses of the
+predicate each time it is met. Its answers are computed once, stored in a
+table shared by all the calls that are variants of it (equal up to the
+renaming of their variables) and then used as unit clauses. Recursive calls
+to a variant being evaluated consume the answers found so far and the
+evaluation is repeated until no new answer is found, which makes left
+recursion and cycles terminate, as in linear tabling. Tables depending on
+each other are completed together, once their first table, the leader,
+reaches its fixpoint.
+
+License
+-------
+
+This software is distributed under the terms of both the MIT license and the
+Apache License (Version 2.0).
+
+See LICENSE for details.
+
+Acknowlegment
+-------------
+
+This software has benefited from the support of Wallonia thanks to the funding
+of the ARIAC project (https://trail.ac), a project part of the
+DigitalWallonia4.ai initiative (https://www.digitalwallonia.be).
+
+It was done by Simon Jacquet at the University of Namur (https://www.unamur.be)
+in the period of October 1st 2021 to August 31st 2022 under the supervision of
+Isabelle Linden, Jean-Marie Jacquet and Wim Vanhoof.
+"""
+
+from andante.logic_concepts import Clause, Predicate, Negation, Once, IfThenElse
+from andante.collections import OrderedSet
+from andante.compilation import slot_mapping
+
+
+def variant(atom):
+    """ Returns the representative of the variants of some atom, whose variables are slots numbered in order of occurrence 
+
+    Predicates being hash-consed, their representative is stored on them.
+    """
+    try:
+        return atom._variant
+    except AttributeError:
+        _, fun = slot_mapping()
+        representative = atom.apply(fun)
+        if isinstance(atom, Predicate):
+            atom._variant = representative
+        return representative
+
+
+def recursive_predicates(knowledge):
+    """ Returns the names of the predicates of some knowledge that depend on themselves """
+    calls = dict()
+    for clause in knowledge:
+        if clause.head is None:
+            continue
+        callees = calls.setdefault(clause.head.name, set())
+        stack = list(clause.body)
+        while stack:
+            literal = stack.pop()
+            if isinstance(literal, Predicate):
+                callees.add(literal.name)
+            elif isinstance(literal, (Negation, Once)):
+                stack.extend(literal.goal)
+            elif isinstance(literal, IfThenElse):
+                for goal in literal.goals:
+                    stack.extend(goal)
+    recursive = set()
+    for name in calls:
+        seen, stack = set(), list(calls[name])
+        while stack:
+            callee = stack.pop()
+            if callee == name:
+                recursive.add(name)
+                break
+            if callee not in seen:
+                seen.add(callee)
+                stack.extend(calls.get(callee, ()))
+    return recursive
+
+
+class Table:
+    """ Answers of a tabled call
+
+    Attributes
+    ----------
+    call : andante.logic_concepts.Predicate
+        The call, as returned by andante.tabling.variant
+    answers : andante.collections.OrderedSet of andante.logic_concepts.Clause
+        The answers found so far, as unit clauses
+    complete : bool
+        Whether all answers were found
+    evaluating : bool
+        Whether the answers of the call are being computed
+    leader : bool
+        Whether the evaluation of the call does not depend on a call whose
+        evaluation started before
+    """
+    def __init__(self, call):
+        self.call = call
+        self.answers = OrderedSet()
+        self.complete = False
+        self.evaluating = False
+        self.leader = True
+
+    def __repr__(self):
+        return 'Table(%s, answers=%d, complete=%s)' % (repr(self.call), len(self.answers), self.complete)
+
+
+class TableSpace:
+    """ Tables of the calls to the tabled predicates of some knowledge
+
+    The tables stay valid as long as the knowledge has the same generation,
+    so that they are reused from one query to the next.
+
+    Attributes
+    ----------
+    tabled : set of str
+        The names of the tabled predicates
+    generation :
+        The generation of the knowledge when the tables were created
+    tables : dict
+        Maps the variant of each call met to its andante.tabling.Table
+    """
+    def __init__(self, tabled, generation):
+        self.tabled = set(tabled)
+        self.generation = generation
+        self.tables = dict()
+        self._stack = []      # Tables being evaluated, the oldest first
+        self._incomplete = [] # Evaluated tables waiting for their leader
+        self._added = 0       # Total number of answers added to the tables
+
+    def is_tabled(self, atom):
+        """ Tells whether calls to the predicate of some atom are tabled """
+        return isinstance(atom, Predicate) and atom.name in self.tabled
+
+    def answers(self, call, evaluate):
+        """ Returns the answers of a call, as a list of unit clauses
+
+        Parameters
+        ----------
+        call : andante.logic_concepts.Predicate
+            The call
+        evaluate : function
+            Given a variant of a call, returns the instances of it proven by
+            resolution with the clauses of its predicate
+        """
+        call = variant(call)
+        table = self.tables.get(call)
+        if table is None:
+            table = self.tables[call] = Table(call)
+        if table.complete:
+            return list(table.answers)
+        if table.evaluating:
+            # Recursive call: every table evaluated since depends on it
+            for dependent in self._stack[self._stack.index(table)+1:]:
+                dependent.leader = False
+            return list(table.answers)
+
+        table.evaluating = True
+        table.leader = True
+        self._stack.append(table)
+        mark = len(self._incomplete)
+        self._incomplete.append(table)
+        try:
+            while True:
+                added = self._added
+                for answer in evaluate(table.call):
+                    clause = Clause(variant(answer), [])
+                    if clause not in table.answers:
+                        table.answers.add(clause)
+                        self._added += 1
+                if self._added == added:
+                    break
+        except BaseException:
+            del self._incomplete[mark:]
+            raise
+        finally:
+            self._stack.pop()
+            table.evaluating = False
+        if table.leader:
+            for t in self._incomplete[mark:]:
+                t.complete = True
+            del self._incomplete[mark:]
+        return list(table.answers)
@@ -0,0 +1,82 @@
+import unittest
+from andante.parser import Parser
+from andante.columnar import ColumnarKnowledge
+from andante.knowledge import MultipleKnowledge
+from andante.solver import AndanteSolver, CompiledSolver
+from andante.logic_concepts import Variable
+
+FACTS = """
+:- begin_bg.
+edge(a,b). edge(a,c). edge(b,c). edge(c,d). edge(a,b). edge(f(a),b). node(a). age(a, 42).
+:- end_bg.
+"""
+
+RULES = """
+:- begin_bg.
+path(X,Y) :- edge(X,Y).
+path(X,Y) :- edge(X,Z), path(Z,Y).
+:- end_bg.
+"""
+
+class TestColumnarKnowledge(unittest.TestCase):
+    def setUp(self):
+        self.parser = Parser()
+        self.knowledge = ColumnarKnowledge(list(self.parser.parse(FACTS, 'background')))
+
+    def match(self, q):
+        return [str(c) for c in self.knowledge.match(self.parser.parse(q, 'predicate'))]
+
+    def test_facts_in_order(self):
+        self.assertEqual(len(self.knowledge), 7)
+        self.assertEqual([str(c) for c in self.knowledge][:5], ['edge(a, b).', 'edge(a, c).', 'edge(b, c).', 'edge(c, d).', 'edge(f(a), b).'])
+
+    def test_match(self):
+        self.assertEqual(self.match('edge(a,Y)'), ['edge(a, b).', 'edge(a, c).'])
+        self.assertEqual(self.match('edge(X,c)'), ['edge(a, c).', 'edge(b, c).'])
+        self.assertEqual(self.match('edge(f(Z),Y)'), ['edge(a, b).', 'edge(a, c).', 'edge(b, c).', 'edge(c, d).', 'edge(f(a), b).'])
+        self.assertEqual(self.match('edge(z,Y)'), [])
+        self.assertEqual(self.match('age(a,42)'), ['age(a, 42).'])
+        self.assertEqual(str(self.knowledge.first_match(self.parser.parse('edge(X,b)', 'predicate'))), 'edge(a, b).')
+
+    def test_has_fact(self):
+        self.assertTrue(self.knowledge.has_fact(self.parser.parse('edge(f(a),b)', 'predicate')))
+        self.assertFalse(self.knowledge.has_fact(self.parser.parse('edge(b,a)', 'predicate')))
+        self.assertFalse(self.knowledge.has_fact(self.parser.parse('edge(a,Y)', 'predicate')))
+
+    def test_add_remove(self):
+        clause = self.parser.parse('edge(a,c).', 'hornclause')
+        generation = self.knowledge.generation
+        self.knowledge.remove(clause)
+        self.assertNotIn(clause, self.knowledge)
+        self.assertEqual(self.match('edge(a,Y)'), ['edge(a, b).'])
+        self.knowledge.add(clause)
+        self.assertIn(clause, self.knowledge)
+        self.assertEqual(self.match('edge(a,Y)'), ['edge(a, b).', 'edge(a, c).'])
+        self.assertNotEqual(self.knowledge.generation, generation)
+        self.knowledge.add_facts('edge', [('d', 'e'), ('a', 'b')])
+        self.assertEqual(len(self.knowledge), 8)
+
+    def test_add_one_by_one(self):
+        # The facts appended since the rows were sorted are looked up as well
+        for i in range(100):
+            self.knowledge.add_facts('link', [(i % 40, i // 40)])
+            self.knowledge.add_facts('link', [(i % 40, i // 40), (0, 0)])
+        self.assertEqual(len(self.knowledge.facts('link/2')), 100)
+        self.assertEqual(len(self.match('link(5,Y)')), 3)
+        self.knowledge.add_facts('link', [(i, 0) for i in range(200)])
+        self.assertEqual(len(self.knowledge.facts('link/2')), 260)
+        self.assertEqual(len(self.match('link(X,0)')), 200)
+        self.assertTrue(self.knowledge.has_fact(self.parser.parse('link(19,2)', 'predicate')))
+
+    def test_only_ground_facts(self):
+        self.assertRaises(ValueError, self.knowledge.add, self.parser.parse('edge(X,b).', 'hornclause'))
+        self.assertRaises(ValueError, self.knowledge.add, self.parser.parse('edge(a,b) :- node(a).', 'hornclause'))
+
+    def test_with_rules(self):
+        knowledge = MultipleKnowledge(self.parser.parse(RULES, 'background'), self.knowledge)
+        goal = self.parser.parse('path(a,Y).', 'query')
+        for solver in (AndanteSolver(), CompiledSolver()):
+            answers = sorted({str(sigma[Variable('Y')]) for sigma in solver.query(goal, knowledge)})
+            self.assertEqual(answers, ['b', 'c', 'd'])
+            self.assertTrue(solver.succeeds_on(self.parser.parse('path(a,d)', 'predicate'), knowledge))
+            self.assertFalse(solver.succeeds_on(self.parser.parse('path(d,a)', 'predicate'), knowledge))
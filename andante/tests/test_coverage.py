@@ -0,0 +1,148 @@
+import unittest
+from andante.parser import Parser
+from andante.program import AndanteProgram
+from andante.knowledge import OverlayKnowledge
+from andante.solver import AndanteSolver, DatalogSolver
+from andante.coverage import ProofCoverage, JoinCoverage, SubsumptionCoverage, theta_subsumes
+from andante.collections import indices_of
+
+BACKGROUND = """
+parent(ann,mary). parent(ann,tom). parent(tom,eve). parent(tom,lucy). parent(eve,bob).
+male(tom). male(bob).
+age(ann, 70). age(tom, 40). age(eve, 20). age(mary, 45).
+ancestor(X,Y) :- parent(X,Y).
+ancestor(X,Y) :- parent(X,Z), ancestor(Z,Y).
+mother(X,Y) :- parent(X,Y), female(X).
+female(X) :- age(X, A), not(male(X)).
+"""
+
+EXAMPLES = ['gp(ann,eve).', 'gp(ann,lucy).', 'gp(tom,bob).', 'gp(ann,bob).', 'gp(tom,eve).', 'gp(mary,lucy).', 'gp(X,bob).', 'parent(ann,tom).']
+
+
+class TestCoverage(unittest.TestCase):
+    def setUp(self):
+        self.parser = Parser()
+        self.knowledge = AndanteProgram.build_from_background(BACKGROUND).knowledge
+        self.examples = [self.parser.parse(e, 'definiteclause') for e in EXAMPLES]
+
+    def covered(self, text, coverage, solver=None):
+        clause = self.parser.parse(text, 'definiteclause')
+        coverage = coverage(self.knowledge, None, solver or AndanteSolver())
+        return [str(self.examples[i]) for i in indices_of(coverage.covered(clause, self.examples, OverlayKnowledge(self.knowledge, [clause])))]
+
+    def test_bits(self):
+        # Only the examples whose bits are set are tested
+        clause = self.parser.parse('gp(X,Y) :- parent(X,Z), parent(Z,Y).', 'definiteclause')
+        knowledge = OverlayKnowledge(self.knowledge, [clause])
+        for coverage in (ProofCoverage, JoinCoverage):
+            coverage = coverage(self.knowledge, None, AndanteSolver())
+            self.assertEqual(coverage.covered(clause, self.examples, knowledge), 0b11000111)
+            self.assertEqual(coverage.covered(clause, self.examples, knowledge, 0b10010110), 0b10000110)
+            self.assertEqual(coverage.covered(clause, self.examples, knowledge, 0), 0)
+
+    def test_same_as_proofs(self):
+        clauses = ['gp(X,Y) :- parent(X,Z), parent(Z,Y).',
+                   'gp(X,Y) :- parent(X,Z), parent(Z,Y), male(Y).',
+                   'gp(X,Y) :- parent(X,Y).',
+                   'gp(ann,Y) :- parent(Z,Y).',
+                   'gp(X,X) :- parent(X,Y).',
+                   'gp(X,Y).',
+                   'gp(X,Y) :- age(X,A), age(Y,B), A > B.',
+                   'gp(X,Y) :- ancestor(X,Y), X \\= tom.',
+                   'gp(X,Y) :- mother(X,Z), parent(Z,Y).',
+                   'gp(X,Y) :- X \\= Z, parent(X,Z), parent(Z,Y).']
+        for clause in clauses:
+            for solver in (AndanteSolver(), DatalogSolver()):
+                self.assertEqual(self.covered(clause, JoinCoverage, solver), self.covered(clause, ProofCoverage, solver), clause)
+        # A comparison whose variables are not bound yet raises an error in the proofs
+        clause = 'gp(X,Y) :- A > B, age(X,A), age(Y,B).'
+        self.assertIsNone(JoinCoverage(self.knowledge, None, AndanteSolver()).plan(self.parser.parse(clause, 'definiteclause')))
+        for coverage in (JoinCoverage, ProofCoverage):
+            self.assertRaises(KeyError, self.covered, clause, coverage)
+
+    def test_plan(self):
+        coverage = JoinCoverage(self.knowledge, None, AndanteSolver())
+        plan = lambda text: coverage.plan(self.parser.parse(text, 'definiteclause'))
+        self.assertIsNotNone(plan('gp(X,Y) :- parent(X,Z), parent(Z,Y).'))
+        # Predicates that are not Datalog, recursive clauses and recursive predicates are proven
+        self.assertIsNone(plan('gp(X,Y) :- mother(X,Z), parent(Z,Y).'))
+        self.assertIsNone(plan('gp(X,Y) :- parent(X,Z), gp(Z,Y).'))
+        self.assertIsNone(plan('gp(X,Y) :- ancestor(X,Y).'))
+        self.assertIsNotNone(JoinCoverage(self.knowledge, None, DatalogSolver()).plan(self.parser.parse('gp(X,Y) :- ancestor(X,Y).', 'definiteclause')))
+        self.assertIsNone(plan('gp(X,Y) :- parent(X,Z), Y is Z.'))
+
+    def test_background_clauses(self):
+        # The examples covered by the clauses of the predicate in the background knowledge are covered as well
+        self.knowledge.add(self.parser.parse('gp(mary,lucy).', 'definiteclause'))
+        clause = 'gp(X,Y) :- parent(X,Z), parent(Z,Y), male(Y).'
+        self.assertEqual(self.covered(clause, JoinCoverage), ['gp(tom, bob).', 'gp(mary, lucy).', 'gp(X, bob).', 'parent(ann, tom).'])
+        self.assertEqual(self.covered(clause, JoinCoverage), self.covered(clause, ProofCoverage))
+
+    def test_default(self):
+        # The examples are proven unless the join is opted into, which learns the same clauses
+        program = AndanteProgram.build_from(PROGRAM)
+        self.assertEqual(program.options.coverage, 'ProofCoverage')
+        learned = program.induce(update_knowledge=False)
+        self.assertEqual(list(program.induce(update_knowledge=False, coverage='JoinCoverage')), list(learned))
+        self.assertEqual(len(list(learned)), 1)
+
+
+PROGRAM = """
+modeh(1, gp(+person, -person)).
+modeb(*, parent(+person, -person)).
+modeb(*, ancestor(+person, -person)).
+modeb(1, male(+person)).
+:- begin_bg.
+parent(ann,mary). parent(ann,tom). parent(tom,eve). parent(tom,lucy). parent(eve,bob).
+male(tom). male(bob).
+ancestor(X,Y) :- parent(X,Y).
+ancestor(X,Y) :- parent(X,Z), ancestor(Z,Y).
+:- end_bg.
+:- begin_in_pos. gp(ann,eve). gp(ann,lucy). gp(tom,bob). :- end_in_pos.
+:- begin_in_neg. gp(ann,tom). gp(eve,bob). gp(ann,bob). :- end_in_neg.
+"""
+
+class TestSubsumptionCoverage(unittest.TestCase):
+    def setUp(self):
+        self.parser = Parser()
+        self.program = AndanteProgram.build_from(PROGRAM)
+        self.examples = self.program.examples['pos'] + self.program.examples['neg']
+
+    def test_theta_subsumes(self):
+        clause = lambda text: self.parser.parse(text, 'definiteclause')
+        ground = clause('gp(ann,eve) :- parent(ann,mary), parent(ann,tom), parent(tom,eve), male(tom).')
+        self.assertTrue(theta_subsumes(clause('gp(X,Y) :- parent(X,Z), parent(Z,Y).'), ground))
+        self.assertTrue(theta_subsumes(clause('gp(X,Y) :- parent(X,Z), male(Z).'), ground))
+        self.assertTrue(theta_subsumes(clause('gp(ann,Y) :- parent(ann,Z), parent(Z,Y), parent(ann,W).'), ground))
+        self.assertFalse(theta_subsumes(clause('gp(X,Y) :- parent(X,Z), parent(Z,Y), male(Y).'), ground))
+        self.assertFalse(theta_subsumes(clause('gp(X,X) :- parent(X,Y).'), ground))
+        self.assertFalse(theta_subsumes(clause('gp(X,Y) :- parent(Y,Z).'), ground))
+
+    def test_timeout(self):
+        # A clique of six nodes is searched in a clique of five nodes
+        nodes = ['n%d' % i for i in range(5)]
+        ground = self.parser.parse('p(n0) :- %s.' % ', '.join('e(%s,%s)' % (a, b) for a in nodes for b in nodes if a != b), 'definiteclause')
+        variables = ['X%d' % i for i in range(6)]
+        clause = self.parser.parse('p(X0) :- %s.' % ', '.join('e(%s,%s)' % (a, b) for a in variables for b in variables if a < b), 'definiteclause')
+        self.assertFalse(theta_subsumes(clause, ground))
+        self.assertIsNone(theta_subsumes(clause, ground, deadline=0))
+
+    def test_same_as_proofs(self):
+        knowledge, modes = self.program.knowledge, self.program.modes
+        coverage = SubsumptionCoverage(knowledge, modes, AndanteSolver(), self.program.options)
+        for text in ('gp(X,Y) :- parent(X,Z), parent(Z,Y).', 'gp(X,Y) :- ancestor(X,Y), male(X).', 'gp(X,Y) :- ancestor(X,Z), ancestor(Z,Y).', 'gp(X,Y).'):
+            clause = self.parser.parse(text, 'definiteclause')
+            self.assertIsNotNone(coverage.plan(clause))
+            extended = OverlayKnowledge(knowledge, [clause])
+            self.assertEqual(coverage.covered(clause, self.examples, extended), ProofCoverage(knowledge, modes, AndanteSolver()).covered(clause, self.examples, extended), text)
+        e = self.program.examples['pos'][0]
+        self.assertIs(coverage.saturation(e), SubsumptionCoverage(knowledge, modes, AndanteSolver(), self.program.options).saturation(e))
+
+    def test_induce(self):
+        learned = self.program.induce(update_knowledge=False, coverage='SubsumptionCoverage')
+        self.assertEqual(list(learned), list(self.program.induce(update_knowledge=False, coverage='ProofCoverage')))
+        self.assertEqual(len(list(learned)), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
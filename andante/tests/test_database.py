@@ -0,0 +1,97 @@
+import os
+import tempfile
+import unittest
+from andante.parser import Parser
+from andante.database import SQLiteKnowledge
+from andante.knowledge import MultipleKnowledge, TreeShapedKnowledge
+from andante.program import AndanteProgram
+from andante.solver import AndanteSolver, CompiledSolver
+from andante.logic_concepts import Variable
+
+BACKGROUND = """
+:- begin_bg.
+edge(a,b). edge(a,c).
+path(X,Y) :- edge(X,Y).
+edge(b,c). edge(c,d). edge(a,b). edge(f(a),b). node(a). age(a, 42). age(b, 4.5).
+path(X,Y) :- edge(X,Z), path(Z,Y).
+:- end_bg.
+"""
+
+class TestSQLiteKnowledge(unittest.TestCase):
+    def setUp(self):
+        self.parser = Parser()
+        self.knowledge = SQLiteKnowledge(list(self.parser.parse(BACKGROUND, 'background')))
+
+    def tearDown(self):
+        self.knowledge.close()
+
+    def match(self, q, knowledge=None):
+        knowledge = self.knowledge if knowledge is None else knowledge
+        return [str(c) for c in knowledge.match(self.parser.parse(q, 'predicate'))]
+
+    def test_match(self):
+        self.assertEqual(len(self.knowledge), 10)
+        self.assertEqual(self.match('edge(a,Y)'), ['edge(a, b).', 'edge(a, c).'])
+        self.assertEqual(self.match('edge(X,c)'), ['edge(a, c).', 'edge(b, c).'])
+        self.assertIn('edge(f(a), b).', self.match('edge(f(Z),Y)'))
+        self.assertEqual(self.match('age(X,4.5)'), ['age(b, 4.5).'])
+        self.assertEqual(self.match('edge(z,Y)'), [])
+
+    def test_source_order(self):
+        # Facts and rules of a predicate are matched in the order in which they were added
+        self.assertEqual(self.match('path(a,Y)'), self.match('path(a,Y)', TreeShapedKnowledge(list(self.parser.parse(BACKGROUND, 'background')))))
+        self.assertEqual(len(self.match('path(a,Y)')), 2)
+
+    def test_has_fact(self):
+        self.assertTrue(self.knowledge.has_fact(self.parser.parse('edge(f(a),b)', 'predicate')))
+        self.assertTrue(self.knowledge.has_fact(self.parser.parse('age(a,42)', 'predicate')))
+        self.assertFalse(self.knowledge.has_fact(self.parser.parse('edge(b,a)', 'predicate')))
+        self.assertFalse(self.knowledge.has_fact(self.parser.parse('edge(a,Y)', 'predicate')))
+        self.assertTrue(self.knowledge.facts('node/1'))
+        self.assertFalse(self.knowledge.facts('none/1'))
+        self.knowledge.remove(self.parser.parse('node(a).', 'hornclause'))
+        self.assertFalse(self.knowledge.facts('node/1'))
+        self.assertEqual(len(self.knowledge.facts('edge/2')), 5)
+
+    def test_add_remove(self):
+        clause = self.parser.parse('edge(a,c).', 'hornclause')
+        rule = self.parser.parse('path(X,Y) :- edge(X,Y).', 'hornclause')
+        generation = self.knowledge.generation
+        self.knowledge.remove([clause, rule])
+        self.assertNotIn(clause, self.knowledge)
+        self.assertNotIn(rule, self.knowledge)
+        self.assertEqual(self.match('edge(a,Y)'), ['edge(a, b).'])
+        self.assertNotEqual(self.knowledge.generation, generation)
+        generation = self.knowledge.generation
+        self.knowledge.add(clause)
+        self.knowledge.add(clause)
+        self.assertIn(clause, self.knowledge)
+        self.assertEqual(self.match('edge(a,Y)'), ['edge(a, b).', 'edge(a, c).'])
+        self.assertEqual(len(self.knowledge), 9)
+        self.assertNotEqual(self.knowledge.generation, generation)
+
+    def test_file(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'background.db')
+            knowledge = SQLiteKnowledge(list(self.knowledge), path=path)
+            knowledge.close()
+            knowledge = SQLiteKnowledge(path=path)
+            self.assertEqual(self.match('path(a,Y)', knowledge), self.match('path(a,Y)'))
+            self.assertEqual(self.match('edge(X,c)', knowledge), ['edge(a, c).', 'edge(b, c).'])
+            knowledge.close()
+
+    def test_solvers(self):
+        goal = self.parser.parse('path(a,Y).', 'query')
+        layered = MultipleKnowledge(TreeShapedKnowledge([self.parser.parse('edge(d,e).', 'hornclause')]), self.knowledge)
+        for solver in (AndanteSolver(), CompiledSolver()):
+            for knowledge, expected in ((self.knowledge, ['b', 'c', 'd']), (layered, ['b', 'c', 'd', 'e'])):
+                answers = sorted({str(sigma[Variable('Y')]) for sigma in solver.query(goal, knowledge)})
+                self.assertEqual(answers, expected)
+            self.assertTrue(solver.succeeds_on(self.parser.parse('path(a,d)', 'predicate'), self.knowledge))
+            self.assertFalse(solver.succeeds_on(self.parser.parse('path(d,a)', 'predicate'), self.knowledge))
+
+    def test_program(self):
+        program = AndanteProgram.build_from_background('edge(a,b). path(X,Y) :- edge(X,Y).', knowledge='SQLiteKnowledge')
+        self.assertIsInstance(program.knowledge, SQLiteKnowledge)
+        self.assertEqual(program.options.knowledge, 'SQLiteKnowledge')
+        self.assertTrue(program.solver.succeeds_on(self.parser.parse('path(a,b)', 'predicate'), program.knowledge))
@@ -0,0 +1,203 @@
+import unittest
+from andante.parser import Parser
+from andante.program import AndanteProgram
+from andante.knowledge import OverlayKnowledge, MultipleKnowledge, TreeShapedKnowledge
+from andante.solver import AndanteSolver, DatalogSolver
+from andante.datalog import is_datalog, materialize, MaterializedKnowledge
+
+BACKGROUND = """
+edge(a,b). edge(b,c). edge(c,a). edge(c,d).
+path(X,Y) :- path(X,Z), edge(Z,Y).
+path(X,Y) :- edge(X,Y).
+parent(ann,mary). parent(ann,tom). parent(tom,eve). parent(tom,lucy). parent(eve,bob).
+ancestor(X,Y) :- parent(X,Y).
+ancestor(X,Y) :- parent(X,Z), ancestor(Z,Y).
+age(ann, 70). age(tom, 40). age(eve, 20).
+older(X,Y) :- age(X,A), age(Y,B), A > B.
+wrap(X, f(X)) :- edge(X, Y).
+wrapped(X) :- wrap(X, Y).
+"""
+
+class TestDatalog(unittest.TestCase):
+    def setUp(self):
+        self.parser = Parser()
+        self.knowledge = AndanteProgram.build_from_background(BACKGROUND).knowledge
+        self.solver = DatalogSolver()
+
+    def solutions(self, q, knowledge=None, solver=None):
+        goal = self.parser.parse(q, 'query')
+        solver = solver or self.solver
+        return sorted(' '.join(sorted('%s=%s' % item for item in sigma.items())) for sigma in solver.query(goal, knowledge or self.knowledge))
+
+    def test_is_datalog(self):
+        clause = lambda text: self.parser.parse(text, 'definiteclause')
+        self.assertTrue(is_datalog(clause('p(a, b).')))
+        self.assertTrue(is_datalog(clause('p(X) :- q(X, Y), Y > 2.')))
+        self.assertFalse(is_datalog(clause('p(X).')))
+        self.assertFalse(is_datalog(clause('p(X, Z) :- q(X).')))
+        self.assertFalse(is_datalog(clause('p(X) :- q(f(X)).')))
+        self.assertFalse(is_datalog(clause('p(X, N) :- q(X, M), N is M + 1.')))
+        self.assertFalse(is_datalog(clause('p(X) :- q(X, Y), Z > Y.')))
+        # The variables of a comparison are bound by the atoms before it
+        self.assertFalse(is_datalog(clause('p(X) :- X > 1, q(X, Y).')))
+        self.assertFalse(is_datalog(clause('p(X) :- q(X, Z), X \\= Y, q(Y, Z).')))
+
+    def test_recursion(self):
+        # Left recursion over a cycle terminates
+        self.assertEqual(self.solutions('path(a, X).'), ['X=a', 'X=b', 'X=c', 'X=d'])
+        self.assertEqual(self.solutions('path(X, X).'), ['X=a', 'X=b', 'X=c'])
+        self.assertEqual(self.solutions('ancestor(ann, X).'), ['X=bob', 'X=eve', 'X=lucy', 'X=mary', 'X=tom'])
+        self.assertTrue(self.solver.succeeds_on(self.parser.parse('ancestor(ann, bob)', 'predicate'), self.knowledge))
+        self.assertFalse(self.solver.succeeds_on(self.parser.parse('ancestor(bob, ann)', 'predicate'), self.knowledge))
+        view = materialize(self.knowledge)
+        self.assertEqual(len(view.relations['path/2']), 12)
+
+    def test_same_answers(self):
+        for q in ('ancestor(X, bob), older(X, Y).', 'older(X, eve).', 'wrapped(X).', 'ancestor(X, Y), X = tom.'):
+            self.assertEqual(self.solutions(q), self.solutions(q, solver=AndanteSolver()))
+        # A predicate depending on a predicate that is not Datalog is resolved top-down
+        view = materialize(self.knowledge)
+        self.assertIsNone(view.materialized('wrapped/1'))
+        self.assertIsNotNone(view.materialized('older/2'))
+        # Even when the predicate that is not Datalog was met first
+        self.assertIsNone(view.materialized('wrap/2'))
+        self.knowledge.add(self.parser.parse('wrapper(X) :- wrap(X, Y).', 'definiteclause'))
+        view = materialize(self.knowledge)
+        self.assertIsNone(view.materialized('wrap/2'))
+        self.assertIsNone(view.materialized('wrapper/1'))
+        self.assertEqual(self.solutions('wrapper(X).'), self.solutions('wrapper(X).', solver=AndanteSolver()))
+
+    def test_comparisons_in_order(self):
+        # A comparison is tested where it is written, as by SLD resolution
+        self.knowledge.add(self.parser.parse(':- begin_bg. other(X) :- X \\= Y, age(X, A), age(Y, B). bigger(X) :- A > 30, age(X, A). :- end_bg.', 'background'))
+        self.assertEqual(self.solutions('other(X).'), self.solutions('other(X).', solver=AndanteSolver()))
+        self.assertEqual(self.solutions('other(X).'), [])
+        self.assertIsNone(materialize(self.knowledge).materialized('bigger/1'))
+        for solver in (self.solver, AndanteSolver()):
+            self.assertRaises(KeyError, self.solutions, 'bigger(X).', solver=solver)
+
+    def test_view(self):
+        view = materialize(self.knowledge)
+        self.assertIs(materialize(self.knowledge), view)
+        self.assertIs(materialize(view), view)
+        self.assertTrue(view.has_fact(self.parser.parse('path(c, c)', 'predicate')))
+        self.assertIn(self.parser.parse('path(a, d).', 'definiteclause'), view)
+        self.assertNotIn(self.parser.parse('path(d, a).', 'definiteclause'), view)
+        self.assertEqual(len(view.match(self.parser.parse('ancestor(tom, X)', 'predicate'))), 3)
+        self.assertEqual(view.match(self.parser.parse('ancestor(f(tom), X)', 'predicate')), [])
+        self.assertEqual(sum(1 for c in view if c.head.name == 'path/2'), 12)
+        self.assertRaises(TypeError, view.add, self.parser.parse('edge(d, e).', 'definiteclause'))
+        # The view is updated once the knowledge is modified
+        self.knowledge.add(self.parser.parse('edge(d, e).', 'definiteclause'))
+        self.assertIs(materialize(self.knowledge), view)
+        self.assertIn('X=e', self.solutions('path(a, X).'))
+
+    def test_overlay(self):
+        view = materialize(self.knowledge)
+        ancestor = view.materialized('ancestor/2')
+        hypothesis = self.parser.parse('gp(X,Y) :- parent(X,Z), parent(Z,Y).', 'definiteclause')
+        overlay = OverlayKnowledge(self.knowledge, [hypothesis])
+        self.assertEqual(self.solutions('gp(X, Y).', overlay), ['X=ann Y=eve', 'X=ann Y=lucy', 'X=tom Y=bob'])
+        # The relations that do not depend on the hypothesis are shared
+        self.assertIs(materialize(overlay).materialized('ancestor/2'), ancestor)
+        overlay.add(self.parser.parse('parent(bob, tim).', 'definiteclause'))
+        self.assertIsNot(materialize(overlay).materialized('ancestor/2'), ancestor)
+        self.assertIn('X=tim', self.solutions('ancestor(ann, X).', overlay))
+        self.assertNotIn('X=tim', self.solutions('ancestor(ann, X).'))
+
+    def test_solver_option(self):
+        program = AndanteProgram.build_from_background(BACKGROUND, solver='DatalogSolver')
+        self.assertIsInstance(program.solver, DatalogSolver)
+
+
+class TestMaintenance(unittest.TestCase):
+    def setUp(self):
+        self.parser = Parser()
+        self.knowledge = AndanteProgram.build_from_background(BACKGROUND).knowledge
+        self.view = materialize(self.knowledge)
+        for name in ('path/2', 'ancestor/2', 'older/2'):
+            self.view.materialized(name)
+
+    def clause(self, text):
+        return self.parser.parse(text, 'definiteclause')
+
+    def check(self, name):
+        """ Checks the relation of a predicate kept up to date against the one of a new view """
+        self.assertIs(materialize(self.knowledge), self.view)
+        expected = set(MaterializedKnowledge(self.knowledge).materialized(name).rows)
+        self.assertEqual(set(self.view.materialized(name).rows), expected)
+        return expected
+
+    def test_facts(self):
+        self.knowledge.add(self.clause('edge(d, e).'))
+        self.assertIn(('a', 'e'), {tuple(map(str, row)) for row in self.check('path/2')})
+        self.knowledge.remove(self.clause('edge(d, e).'))
+        self.check('path/2')
+        # b still reaches a through c once edge(a, b) is removed, a no longer reaches itself
+        self.knowledge.remove(self.clause('edge(a, b).'))
+        rows = {tuple(map(str, row)) for row in self.check('path/2')}
+        self.assertIn(('b', 'a'), rows)
+        self.assertNotIn(('a', 'a'), rows)
+        self.knowledge.add(self.clause('edge(a, b).'))
+        self.assertEqual(len(self.check('path/2')), 12)
+        self.knowledge.remove(self.clause('parent(tom, eve).'))
+        self.assertEqual(len(self.check('ancestor/2')), 5)
+        self.knowledge.add(self.clause('age(lucy, 30).'))
+        self.check('older/2')
+
+    def test_derived_facts(self):
+        # A fact of a predicate with rules is kept while it is derived
+        self.knowledge.add(self.clause('ancestor(ann, bob).'))
+        self.knowledge.remove(self.clause('ancestor(ann, bob).'))
+        self.assertIn(self.clause('ancestor(ann, bob).'), materialize(self.knowledge))
+        self.knowledge.add(self.clause('ancestor(bob, zoe).'))
+        self.assertIn(self.clause('ancestor(ann, zoe).'), materialize(self.knowledge))
+        self.knowledge.remove(self.clause('ancestor(bob, zoe).'))
+        self.assertNotIn(self.clause('ancestor(ann, zoe).'), materialize(self.knowledge))
+        self.check('ancestor/2')
+
+    def test_rules(self):
+        rule = self.clause('path(X,Y) :- edge(Y,X).')
+        self.knowledge.add(rule)
+        self.assertIn(('d', 'a'), {tuple(map(str, row)) for row in self.check('path/2')})
+        self.knowledge.remove(rule)
+        self.assertEqual(len(self.check('path/2')), 12)
+        # A rule that is not Datalog makes the predicate resolved top-down
+        rule = self.clause('path(X, f(X)) :- edge(X, Y).')
+        self.knowledge.add(rule)
+        self.assertIsNone(materialize(self.knowledge).materialized('path/2'))
+        self.knowledge.remove(rule)
+        self.assertEqual(len(self.check('path/2')), 12)
+
+    def test_learned_knowledge(self):
+        learned = TreeShapedKnowledge(options=self.knowledge.options)
+        knowledge = MultipleKnowledge(self.knowledge, learned)
+        view = materialize(knowledge)
+        self.assertIsNone(view.materialized('gp/2'))
+        learned.add(self.clause('gp(X,Y) :- parent(X,Z), parent(Z,Y).'))
+        self.assertIs(materialize(knowledge), view)
+        self.assertEqual(len(view.materialized('gp/2')), 3)
+        learned.add(self.clause('parent(bob, tim).'))
+        self.assertIs(materialize(knowledge), view)
+        self.assertEqual(len(view.materialized('gp/2')), 4)
+        self.assertEqual(len(view.materialized('ancestor/2')), 13)
+
+    def test_overlay(self):
+        ancestor = self.view.materialized('ancestor/2')
+        rows = set(ancestor.rows)
+        overlay = OverlayKnowledge(self.knowledge, [])
+        view = materialize(overlay)
+        self.assertIs(view.materialized('ancestor/2'), ancestor)
+        overlay.add(self.clause('parent(bob, tim).'))
+        self.assertIs(materialize(overlay), view)
+        self.assertEqual(len(view.materialized('ancestor/2')), 13)
+        overlay.remove(self.clause('parent(ann, tom).'))
+        self.assertIs(materialize(overlay), view)
+        self.assertEqual(len(view.materialized('ancestor/2')), 8)
+        # The relations of the view of the base are left untouched
+        self.assertEqual(set(ancestor.rows), rows)
+        self.assertEqual(len(self.view._relation('parent/2')), 5)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,75 @@
+import os
+import pickle
+import tempfile
+import unittest
+from andante.parser import Parser
+from andante.image import ImageKnowledge, save_image
+from andante.knowledge import TreeShapedKnowledge
+from andante.solver import AndanteSolver, CompiledSolver
+from andante.logic_concepts import Variable
+
+BACKGROUND = """
+:- begin_bg.
+edge(a,b). edge(a,c). edge(b,c). edge(c,d). edge(f(a),b). node(a). age(a, 42). age(b, 4.5).
+path(a,a).
+path(X,Y) :- edge(X,Y).
+path(X,Y) :- edge(X,Z), path(Z,Y).
+:- end_bg.
+"""
+
+class TestImageKnowledge(unittest.TestCase):
+    def setUp(self):
+        self.parser = Parser()
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'background.img')
+        self.source = TreeShapedKnowledge(list(self.parser.parse(BACKGROUND, 'background')))
+        save_image(self.source, self.path)
+        self.knowledge = ImageKnowledge(self.path)
+
+    def tearDown(self):
+        del self.knowledge
+        self.directory.cleanup()
+
+    def match(self, q, knowledge=None):
+        knowledge = self.knowledge if knowledge is None else knowledge
+        return [str(c) for c in knowledge.match(self.parser.parse(q, 'predicate'))]
+
+    def test_same_clauses(self):
+        self.assertEqual(len(self.knowledge), 11)
+        self.assertEqual(set(self.knowledge), set(self.source))
+        for q in ('edge(a,Y)', 'edge(X,c)', 'path(a,Y)', 'age(X,4.5)', 'edge(z,Y)'):
+            self.assertEqual(self.match(q), self.match(q, self.source))
+
+    def test_has_fact(self):
+        self.assertTrue(self.knowledge.has_fact(self.parser.parse('edge(f(a),b)', 'predicate')))
+        self.assertTrue(self.knowledge.has_fact(self.parser.parse('path(a,a)', 'predicate')))
+        self.assertFalse(self.knowledge.has_fact(self.parser.parse('edge(b,a)', 'predicate')))
+        self.assertFalse(self.knowledge.has_fact(self.parser.parse('edge(a,Y)', 'predicate')))
+
+    def test_solvers(self):
+        goal = self.parser.parse('path(a,Y).', 'query')
+        for solver in (AndanteSolver(), CompiledSolver()):
+            answers = sorted({str(sigma[Variable('Y')]) for sigma in solver.query(goal, self.knowledge)})
+            self.assertEqual(answers, ['a', 'b', 'c', 'd'])
+
+    def test_modifications(self):
+        removed = self.parser.parse('edge(a,c).', 'hornclause')
+        added = self.parser.parse('edge(d,e).', 'hornclause')
+        generation = self.knowledge.generation
+        self.knowledge.remove(removed)
+        self.knowledge.add(added)
+        self.assertNotEqual(self.knowledge.generation, generation)
+        self.assertNotIn(removed, self.knowledge)
+        self.assertIn(added, self.knowledge)
+        self.assertEqual(self.match('edge(a,Y)'), ['edge(a, b).'])
+        self.assertEqual(self.match('edge(d,Y)'), ['edge(d, e).'])
+        # The image is unchanged, the modifications are pickled with its path
+        self.assertEqual(self.match('edge(a,Y)', ImageKnowledge(self.path)), ['edge(a, b).', 'edge(a, c).'])
+        for knowledge in (pickle.loads(pickle.dumps(self.knowledge)), self.knowledge.copy()):
+            self.assertEqual(set(knowledge), set(self.knowledge))
+
+    def test_not_an_image(self):
+        path = os.path.join(self.directory.name, 'background.pl')
+        with open(path, 'w') as f:
+            f.write(BACKGROUND)
+        self.assertRaises(ValueError, ImageKnowledge, path)
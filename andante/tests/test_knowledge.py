@@ -0,0 +1,209 @@
+import unittest
+from unittest import mock
+from andante.parser import Parser
+from andante.knowledge import MultipleKnowledge, TreeShapedKnowledge, OverlayKnowledge
+from andante.solver import AndanteSolver, CompiledSolver
+
+FACTS = """
+:- begin_bg.
+edge(a,b). edge(a,c). edge(b,c). edge(c,d). edge(d,a). edge(X,e).
+edge(f(a),b). edge(f(b),c). edge(b,a). edge(c,c).
+:- end_bg.
+"""
+
+class TestIndexing(unittest.TestCase):
+    def setUp(self):
+        self.parser = Parser()
+        self.knowledge = self.parser.parse(FACTS, 'background')
+
+    def match(self, q):
+        return [str(c) for c in self.knowledge.match(self.parser.parse(q, 'predicate'))]
+
+    def test_match(self):
+        expected = {
+            'edge(X,Y)': ['edge(a, b).', 'edge(a, c).', 'edge(b, c).', 'edge(c, d).', 'edge(d, a).', 'edge(X, e).',
+                          'edge(f(a), b).', 'edge(f(b), c).', 'edge(b, a).', 'edge(c, c).'],
+            'edge(a,Y)': ['edge(a, b).', 'edge(a, c).', 'edge(X, e).'],
+            'edge(Y,c)': ['edge(a, c).', 'edge(b, c).', 'edge(f(b), c).', 'edge(c, c).'],
+            'edge(b,a)': ['edge(b, a).'],
+            'edge(f(Z),Y)': ['edge(X, e).', 'edge(f(a), b).', 'edge(f(b), c).'],
+            'edge(z,e)': ['edge(X, e).'],
+            'edge(z,z)': [],
+        }
+        for _ in range(3):
+            for q, clauses in expected.items():
+                self.assertEqual(self.match(q), clauses, q)
+
+    def test_index_built_after_threshold(self):
+        self.match('edge(a,Y)')
+        self.assertEqual(self.knowledge.indexes['edge/2'], {})
+        self.match('edge(b,Y)')
+        self.assertIn((0,), self.knowledge.indexes['edge/2'])
+        self.assertEqual(self.knowledge.call_patterns['edge/2'][(0,)], 2)
+
+    def test_index_maintained(self):
+        for _ in range(2): self.match('edge(a,Y)')
+        new = self.parser.parse('edge(a,z).', 'hornclause')
+        self.knowledge.add(new)
+        self.assertEqual(self.match('edge(a,Y)'), ['edge(a, b).', 'edge(a, c).', 'edge(X, e).', 'edge(a, z).'])
+        self.knowledge.remove(new)
+        self.assertEqual(self.match('edge(a,Y)'), ['edge(a, b).', 'edge(a, c).', 'edge(X, e).'])
+
+    def test_match_iter(self):
+        for _ in range(3):
+            for q in ['edge(X,Y)', 'edge(a,Y)', 'edge(f(Z),Y)', 'edge(z,z)']:
+                atom = self.parser.parse(q, 'predicate')
+                self.assertEqual(list(self.knowledge.match_iter(atom)), list(self.knowledge.match(atom)), q)
+                self.assertEqual(self.knowledge.first_match(atom), next(iter(self.knowledge.match(atom)), None), q)
+
+
+class TestMultipleKnowledge(unittest.TestCase):
+    def setUp(self):
+        self.parser = Parser()
+        self.first = self.parser.parse(FACTS, 'background')
+        self.second = self.parser.parse(':- begin_bg. edge(z,a). edge(a,b). edge(a,y). :- end_bg.', 'background')
+        self.knowledge = MultipleKnowledge(self.first, self.second)
+
+    def test_match_in_order(self):
+        atom = self.parser.parse('edge(a,Y)', 'predicate')
+        expected = ['edge(a, b).', 'edge(a, c).', 'edge(X, e).', 'edge(a, y).']
+        self.assertEqual([str(c) for c in self.knowledge.match(atom)], expected)
+        self.assertEqual([str(c) for c in self.knowledge.match_iter(atom)], expected)
+        self.assertEqual(str(self.knowledge.first_match(atom)), 'edge(a, b).')
+        self.assertIsNone(self.knowledge.first_match(self.parser.parse('edge(y,y)', 'predicate')))
+
+    def test_contains(self):
+        self.assertIn(self.parser.parse('edge(z,a).', 'hornclause'), self.knowledge)
+        self.assertNotIn(self.parser.parse('edge(y,a).', 'hornclause'), self.knowledge)
+
+
+class TestGroundFacts(unittest.TestCase):
+    def setUp(self):
+        self.parser = Parser()
+        self.knowledge = self.parser.parse(FACTS, 'background')
+
+    def test_has_fact(self):
+        self.assertTrue(self.knowledge.has_fact(self.parser.parse('edge(a,b)', 'predicate')))
+        self.assertTrue(self.knowledge.has_fact(self.parser.parse('edge(f(a),b)', 'predicate')))
+        self.assertFalse(self.knowledge.has_fact(self.parser.parse('edge(b,b)', 'predicate')))
+        self.assertFalse(self.knowledge.has_fact(self.parser.parse('edge(a,Y)', 'predicate')))
+        # Unit clauses with variables are not ground facts
+        self.assertFalse(self.knowledge.has_fact(self.parser.parse('edge(z,e)', 'predicate')))
+
+    def test_facts_maintained(self):
+        clause = self.parser.parse('edge(a,b).', 'hornclause')
+        self.knowledge.remove(clause)
+        self.assertFalse(self.knowledge.has_fact(clause.head))
+        self.knowledge.add(clause)
+        self.assertTrue(self.knowledge.has_fact(clause.head))
+        self.assertTrue(MultipleKnowledge(self.parser.parse(':- begin_bg. p(a). :- end_bg.', 'background'), self.knowledge).has_fact(clause.head))
+
+
+class TestBulkAdd(unittest.TestCase):
+    def setUp(self):
+        self.parser = Parser()
+        self.clauses = list(self.parser.parse(FACTS, 'background'))
+
+    def test_same_as_add(self):
+        one_by_one = TreeShapedKnowledge()
+        for clause in self.clauses:
+            one_by_one.add(clause)
+        bulk = TreeShapedKnowledge()
+        self.assertEqual(bulk.bulk_add(c for c in self.clauses + self.clauses[:3]), len(self.clauses))
+        self.assertEqual(list(bulk), list(one_by_one))
+        self.assertEqual(bulk.facts('edge/2'), one_by_one.facts('edge/2'))
+        for _ in range(TreeShapedKnowledge.index_threshold):
+            bulk.match(self.parser.parse('edge(a,Y)', 'predicate'))
+        generation = bulk.generation
+        self.assertEqual(bulk.bulk_add(self.parser.parse(':- begin_bg. edge(a,z). edge(a,b). :- end_bg.', 'background')), 1)
+        self.assertNotEqual(bulk.generation, generation)
+        self.assertEqual([str(c) for c in bulk.match(self.parser.parse('edge(a,Y)', 'predicate'))], ['edge(a, b).', 'edge(a, c).', 'edge(X, e).', 'edge(a, z).'])
+
+    def test_not_clauses(self):
+        self.assertRaises(TypeError, TreeShapedKnowledge().bulk_add, [self.clauses[0], 'edge(a,b).'])
+
+
+class TestOverlayKnowledge(unittest.TestCase):
+    def setUp(self):
+        self.parser = Parser()
+        self.base = self.parser.parse(FACTS, 'background')
+        self.generation = self.base.generation
+        self.knowledge = OverlayKnowledge(self.base, [self.parser.parse('edge(a,z).', 'hornclause')])
+
+    def match(self, q, knowledge=None):
+        knowledge = self.knowledge if knowledge is None else knowledge
+        return [str(c) for c in knowledge.match(self.parser.parse(q, 'predicate'))]
+
+    def test_match(self):
+        self.assertEqual(self.match('edge(a,Y)'), ['edge(a, z).', 'edge(a, b).', 'edge(a, c).', 'edge(X, e).'])
+        # Without clauses of the predicate in the delta, the base is matched directly
+        atom = self.parser.parse('node(a)', 'predicate')
+        self.assertEqual(type(self.knowledge.match_iter(atom)), type(self.base.match_iter(atom)))
+
+    def test_base_untouched(self):
+        removed = self.parser.parse('edge(a,b).', 'hornclause')
+        generation = self.knowledge.generation
+        self.knowledge.remove(removed)
+        self.knowledge.add(self.parser.parse('edge(a,c).', 'hornclause'))
+        self.assertNotEqual(self.knowledge.generation, generation)
+        self.assertEqual(self.match('edge(a,Y)'), ['edge(a, z).', 'edge(a, c).', 'edge(X, e).'])
+        self.assertNotIn(removed, self.knowledge)
+        self.assertFalse(self.knowledge.has_fact(removed.head))
+        self.assertTrue(self.knowledge.has_fact(self.parser.parse('edge(a,z)', 'predicate')))
+        self.assertEqual(len(self.knowledge.facts('edge/2')), len(self.base.facts('edge/2')))
+        # Membership does not go through a copy of the facts of the base
+        with mock.patch.object(self.knowledge, 'facts', side_effect=AssertionError):
+            self.assertFalse(self.knowledge.has_fact(removed.head))
+            self.assertTrue(self.knowledge.has_fact(self.parser.parse('edge(a,c)', 'predicate')))
+        self.assertEqual(self.base.generation, self.generation)
+        self.assertIn(removed, self.base)
+        self.assertEqual(self.match('edge(a,Y)', self.base), ['edge(a, b).', 'edge(a, c).', 'edge(X, e).'])
+
+    def test_copy(self):
+        self.knowledge.remove(self.parser.parse('edge(a,b).', 'hornclause'))
+        copy = self.knowledge.copy()
+        self.assertEqual(list(copy), list(self.knowledge))
+        self.assertFalse(copy.has_fact(self.parser.parse('edge(a,b)', 'predicate')))
+        copy.add(self.parser.parse('edge(a,y).', 'hornclause'))
+        self.assertEqual(len(list(copy)), len(list(self.knowledge)) + 1)
+
+    def test_solvers(self):
+        knowledge = OverlayKnowledge(self.base, self.parser.parse(':- begin_bg. path(X,Y) :- edge(X,Y). :- end_bg.', 'background'))
+        for solver in (AndanteSolver(), CompiledSolver()):
+            self.assertTrue(solver.succeeds_on(self.parser.parse('path(a,b)', 'predicate'), knowledge))
+            knowledge.remove(self.parser.parse('edge(a,b).', 'hornclause'))
+            self.assertFalse(solver.succeeds_on(self.parser.parse('path(a,b)', 'predicate'), knowledge))
+            knowledge = OverlayKnowledge(self.base, self.parser.parse(':- begin_bg. path(X,Y) :- edge(X,Y). :- end_bg.', 'background'))
+
+
+class TestJournal(unittest.TestCase):
+    def setUp(self):
+        self.parser = Parser()
+        self.clauses = list(self.parser.parse(FACTS, 'background'))
+        self.clause = lambda text: self.parser.parse(text, 'hornclause')
+
+    def test_tree_shaped(self):
+        knowledge = TreeShapedKnowledge()
+        knowledge.bulk_add(self.clauses[:2])
+        journal = knowledge.journal()
+        knowledge.bulk_add(self.clauses)
+        knowledge.remove(self.clauses[0])
+        knowledge.add(self.clauses[0])
+        # A clause removed and added back is recorded once
+        self.assertEqual(journal.read(), self.clauses[2:] + [self.clauses[0]])
+        self.assertEqual(journal.read(), [])
+        knowledge.remove(self.clauses[1])
+        self.assertEqual(journal.read(), [self.clauses[1]])
+
+    def test_multiple_and_overlay(self):
+        base, learned = TreeShapedKnowledge(self.clauses), TreeShapedKnowledge()
+        multiple = MultipleKnowledge(base, learned)
+        journal = multiple.journal()
+        learned.add(self.clause('path(X,Y) :- edge(X,Y).'))
+        base.remove(self.clauses[0])
+        self.assertEqual(journal.read(), [self.clauses[0], self.clause('path(X,Y) :- edge(X,Y).')])
+        overlay = OverlayKnowledge(base, [self.clause('edge(a,y).')])
+        journal = overlay.journal()
+        overlay.add([self.clause('edge(a,y).'), self.clause('edge(a,x).')])
+        overlay.remove(self.clauses[1])
+        self.assertEqual(journal.read(), [self.clause('edge(a,x).'), self.clauses[1]])
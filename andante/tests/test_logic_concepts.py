@@ -1,6 +1,7 @@
 from abc import ABC, abstractmethod
 import unittest
 import itertools 
+import pickle
 from andante.logic_concepts import (
     LogicConcept, 
     Clause, 
@@ -315,5 +316,38 @@ class TestList(AUT.TestAtom):
         self.l1.apply(fun)
 
 
+class TestHashConsing(unittest.TestCase):
+    def setUp(self):
+        self.build = lambda: Clause(
+            Predicate('grandparent', [Variable('X'), Variable('Z')]), 
+            [Predicate('parent', [Variable('X'), Variable('Y')]), 
+             Predicate('parent', [Variable('Y'), CompoundTerm('f', [Constant('ann'), Constant(4)])])]
+        )
+
+    def test_identical_concepts_are_shared(self):
+        self.assertIs(Constant('ann'), Constant('ann'))
+        self.assertIs(Variable('X', tally_id=2), Variable('X', 2))
+        self.assertIs(Type('+', 'person'), Type('+', 'person'))
+        self.assertIs(self.build(), self.build())
+        self.assertIs(self.build().body[0].arguments[0], Variable('X'))
+
+    def test_different_concepts_are_not_shared(self):
+        self.assertIsNot(Constant(1), Constant(1.0))
+        self.assertNotEqual(Constant(1), Constant(1.0))
+        self.assertNotEqual(Variable('X'), Variable('X', 1))
+        self.assertNotEqual(Predicate('f', [Constant('a')]), CompoundTerm('f', [Constant('a')]))
+
+    def test_clause_is_not_aliased(self):
+        body = [Predicate('p', [Variable('X')])]
+        c = Clause(Predicate('q', [Variable('X')]), body)
+        body.append(Predicate('r', [Variable('X')]))
+        self.assertEqual(len(c.body), 1)
+        
+    def test_pickle(self):
+        c = self.build()
+        self.assertIs(pickle.loads(pickle.dumps(c)), c)
+        self.assertIs(pickle.loads(pickle.dumps(Variable('X', 3))), Variable('X', 3))
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -5,6 +5,9 @@ from andante.logic_concepts import (
     Clause, 
     Goal, 
     Negation, 
+    Cut,
+    Once,
+    IfThenElse,
     Function, 
     Atom, 
     Term, 
@@ -104,6 +107,11 @@ class TestParser(unittest.TestCase):
         self.assertEqual(opt, 'verbose')
         self.assertEqual(value, 0)
 
+    def test_table(self):
+        s = ":- table path/2, edge/2."
+        names = self.parser.parse(s, rule='table')
+        self.assertEqual(names, ['path/2', 'edge/2'])
+
 
             #-----------------------------------------------------#
             #                Tests wrt horn clauses               #
@@ -225,6 +233,34 @@ class TestParser(unittest.TestCase):
         self.assertIsInstance(n, Negation)
 
 
+            #-----------------------------------------------------#
+            #             Tests wrt control constructs            #
+            #-----------------------------------------------------#
+
+    def test_cut(self):
+        c = self.parser.parse("p(X) :- q(X), !, r(X).", rule="hornclause")
+        self.assertIsInstance(c.body[1], Cut)
+        self.assertEqual(str(c), "p(X) :- q(X), !, r(X).")
+
+    def test_once(self):
+        o = self.parser.parse("once(p1(V), p2(V))", rule="atom")
+        self.assertIsInstance(o, Once)
+        self.assertEqual(len(o.goal), 2)
+
+    def test_if_then_else(self):
+        c = self.parser.parse("p(X,Y) :- (q(X), X > 1 -> Y = a ; r(Y)).", rule="hornclause")
+        ite, = c.body
+        self.assertIsInstance(ite, IfThenElse)
+        self.assertEqual((len(ite.condition), len(ite.then), len(ite.otherwise)), (2, 1, 1))
+        ite = self.parser.parse("(q(X) -> true)", rule="atom")
+        self.assertIsNone(ite.otherwise)
+        self.assertEqual(ite.then, Goal())
+        # The comparisons in parentheses are still parsed
+        self.assertIsInstance(self.parser.parse("(X+1) > 2", rule="atom"), ArithmeticComparison)
+        for text in ("p(X) :- (q(X) -> (r(X) -> s(X) ; !) ; false).", "p(X) :- once(q(X)), (r(X) -> true)."):
+            self.assertIs(self.parser.parse(text, rule="hornclause"), self.parser.parse(str(self.parser.parse(text)), rule="hornclause"))
+
+
             #-----------------------------------------------------#
             #         Tests wrt parse_several method              #
             #-----------------------------------------------------#
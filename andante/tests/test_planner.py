@@ -0,0 +1,95 @@
+import unittest
+from andante.parser import Parser
+from andante.knowledge import OverlayKnowledge
+from andante.solver import AndanteSolver
+from andante.options import Options
+from andante.planner import plan_clause
+from andante.statistics import CombinedStatistics
+
+FACTS = ' '.join('person(p%d).' % i for i in range(30)) + ' ' + ' '.join('parent(p%d,p%d).' % (i, i+1) for i in range(29)) + ' male(p3). male(p5).'
+
+BACKGROUND = """
+:- begin_bg.
+%s
+grandfather(X,Y) :- person(Y), person(Z), parent(Z,Y), parent(X,Z), male(X).
+older(X,Y) :- person(X), parent(Y,Z), N is 1, X \\= Y, male(X).
+:- end_bg.
+""" % FACTS
+
+class TestPlanner(unittest.TestCase):
+    def setUp(self):
+        self.parser = Parser()
+        self.knowledge = self.parser.parse(BACKGROUND, 'background')
+        self.grandfather, self.older = [c for c in self.knowledge if c.body]
+
+    def test_plan_clause(self):
+        statistics = self.knowledge.statistics
+        # All the arguments of the head are bound
+        p = plan_clause(self.grandfather, statistics)
+        self.assertEqual([str(l) for l in p.literals], ['person(Y)', 'parent(Z, Y)', 'parent(X, Z)', 'person(Z)', 'male(X)'])
+        self.assertTrue(p.reordered)
+        # None of them is bound: male/1 is the cheapest
+        p = plan_clause(self.grandfather, statistics, bound=())
+        self.assertEqual(str(p.literals[0]), 'male(X)')
+        self.assertEqual(p.steps[0][2], 2)
+
+    def test_fixed_literals(self):
+        p = plan_clause(self.older, self.knowledge.statistics, bound=())
+        literals = [str(l) for l in p.literals]
+        # Atoms are only reordered between the literals that are not moved
+        self.assertEqual(literals[:2], ['parent(Y, Z)', 'person(X)'])
+        self.assertEqual(literals[2:4], ['N is 1', 'X \\= Y'])
+        self.assertEqual([step[2] for step in p.steps[2:4]], [None, None])
+        self.assertEqual(literals[4], 'male(X)')
+
+    def test_explain(self):
+        solver = AndanteSolver()
+        text = str(solver.explain(self.grandfather, self.knowledge))
+        self.assertEqual(len(text.splitlines()), 5)
+        self.assertIn(' 2. parent(Z, Y)  [est. 1, bound: X, Y, was 3]', text)
+        text = str(solver.explain(self.parser.parse('person(Y), parent(X,Y), X \\= Y, male(X).', 'query'), self.knowledge))
+        self.assertIn('fixed', text)
+        self.assertEqual(text.splitlines()[0], ' 1. parent(X, Y)  [est. 29, bound: -, was 2]')
+
+    def test_reorder_answers(self):
+        queries = ['grandfather(X,Y).', 'grandfather(p3,Y).', 'older(X,p4).', 'person(Y), parent(X,Y), X \\= Y, male(X).']
+        for q in queries:
+            goal = self.parser.parse(q, 'query')
+            answers = []
+            for reorder in (False, True):
+                solver = AndanteSolver(Options({'reorder': reorder}))
+                answers.append(sorted(str(s) for s in solver.query(goal, self.knowledge)))
+            self.assertEqual(answers[0], answers[1])
+        solver = AndanteSolver(Options({'reorder': True}))
+        self.assertTrue(solver.succeeds_on(self.parser.parse('grandfather(p3,p5)', 'predicate'), self.knowledge))
+        self.assertFalse(solver.succeeds_on(self.parser.parse('grandfather(p4,p6)', 'predicate'), self.knowledge))
+
+    def test_rules_kept_in_place(self):
+        # gt/2 needs its arguments bound: moving it first would change the meaning of the query
+        knowledge = self.parser.parse(':- begin_bg. num(1). num(2). num(3). gt(X,Y) :- X > Y. p(X,Y) :- num(X), num(Y), gt(X,Y). :- end_bg.', 'background')
+        goal = self.parser.parse('p(X,Y).', 'query')
+        answers = [sorted(str(s) for s in AndanteSolver(Options({'reorder': reorder})).query(goal, knowledge)) for reorder in (False, True)]
+        self.assertEqual(len(answers[0]), 3)
+        self.assertEqual(answers[0], answers[1])
+        p = AndanteSolver().explain(self.parser.parse('gt(X,Y), num(X), num(Y), gt(Y,X), num(Z).', 'query'), knowledge)
+        self.assertEqual([str(l) for l in p.literals], ['gt(X, Y)', 'num(X)', 'num(Y)', 'gt(Y, X)', 'num(Z)'])
+        self.assertEqual([step[2] is None for step in p.steps], [True, False, False, True, False])
+        # Nor once the predicate gets rules after a plan was made
+        solver = AndanteSolver(Options({'reorder': True}))
+        goal = self.parser.parse('num(X), num(Y), lt(X,Y).', 'query')
+        knowledge.add(self.parser.parse('lt(0,9).', 'definiteclause'))
+        self.assertEqual(list(solver.query(goal, knowledge)), [])
+        knowledge.add(self.parser.parse('lt(X,Y) :- X < Y.', 'definiteclause'))
+        self.assertEqual(len(list(solver.query(goal, knowledge))), 3)
+
+    def test_combined_statistics(self):
+        overlay = OverlayKnowledge(self.knowledge, self.parser.parse(':- begin_bg. male(p7). :- end_bg.', 'background'))
+        overlay.remove(self.parser.parse(':- begin_bg. person(p0). :- end_bg.', 'background'))
+        statistics = overlay.statistics
+        self.assertIsInstance(statistics, CombinedStatistics)
+        # Predicates are only combined when asked for
+        self.assertEqual(statistics.predicates, dict())
+        self.assertEqual(statistics.cardinality('male/1'), 3)
+        self.assertEqual(list(statistics.predicates), ['male/1'])
+        self.assertEqual(statistics.cardinality('person/1'), 29)
+        self.assertEqual(sorted(p.name for p in statistics), sorted(p.name for p in self.knowledge.statistics))
@@ -0,0 +1,67 @@
+import unittest
+from andante.parser import Parser
+from andante.program import AndanteProgram
+from andante.solver import AndanteSolver
+from andante.options import Options
+
+BACKGROUND = """
+parent(ann,mary). parent(ann,tom). parent(tom,eve). parent(tom,lucy). parent(eve,bob).
+ancestor(X,Y) :- parent(X,Y).
+ancestor(X,Y) :- parent(X,Z), ancestor(Z,Y).
+first(X) :- parent(ann,X), !.
+"""
+
+class TestProfile(unittest.TestCase):
+    def setUp(self):
+        self.parser = Parser()
+        self.knowledge = AndanteProgram.build_from_background(BACKGROUND).knowledge
+        self.solver = AndanteSolver(Options({'profile': True}))
+
+    def query(self, q):
+        return list(self.solver.query(self.parser.parse(q, 'query'), self.knowledge))
+
+    def test_ports(self):
+        self.assertEqual(len(self.query('ancestor(ann, X).')), 5)
+        ancestor = self.solver.profile['ancestor/2']
+        # ancestor/2 is called on ann, mary, tom, eve, lucy and bob
+        self.assertEqual((ancestor.calls, ancestor.exits, ancestor.redos, ancestor.fails), (6, 9, 6, 6))
+        self.assertEqual((ancestor.unifications, ancestor.candidates, ancestor.used), (12, 12, 12))
+        parent = self.solver.profile['parent/2']
+        # Every call ends by failing once all its answers were found
+        self.assertEqual(parent.calls, parent.fails)
+        self.assertEqual(parent.exits, 10)
+        self.assertGreater(parent.time, 0)
+
+    def test_facts_and_cut(self):
+        self.assertTrue(self.solver.succeeds_on(self.parser.parse('parent(ann, tom).', 'query'), self.knowledge))
+        parent = self.solver.profile['parent/2']
+        self.assertEqual((parent.calls, parent.exits, parent.candidates, parent.used, parent.unifications), (1, 1, 1, 1, 0))
+        self.solver.profile.clear()
+        self.assertEqual(len(self.query('first(X).')), 1)
+        parent = self.solver.profile['parent/2']
+        # The cut drops the second clause returned by the index
+        self.assertEqual((parent.calls, parent.exits, parent.redos, parent.candidates, parent.used), (1, 1, 0, 2, 1))
+
+    def test_cache_and_option(self):
+        self.query('ancestor(tom, X).')
+        self.query('ancestor(tom, X).')
+        self.assertEqual(self.solver.profile['ancestor/2'].calls, 2 * 4)
+        solver = AndanteSolver()
+        list(solver.query(self.parser.parse('ancestor(tom, X).', 'query'), self.knowledge))
+        self.assertEqual(len(solver.profile), 0)
+        # Profiling for a single query
+        list(solver.query(self.parser.parse('ancestor(tom, X).', 'query'), self.knowledge, profile=True))
+        self.assertIn('ancestor/2', solver.profile)
+
+    def test_export(self):
+        self.query('ancestor(ann, X).')
+        profile = self.solver.profile.to_dict()
+        self.assertEqual(set(profile), {'ancestor/2', 'parent/2'})
+        self.assertEqual(set(profile['parent/2']), {'calls', 'exits', 'redos', 'fails', 'unifications', 'candidates', 'used', 'time'})
+        frame = self.solver.profile.to_dataframe()
+        self.assertEqual(frame.loc['ancestor/2', 'calls'], 6)
+        self.assertEqual(list(frame.columns), list(profile['parent/2']))
+
+
+if __name__ == '__main__':
+    unittest.main()
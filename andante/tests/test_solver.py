@@ -0,0 +1,319 @@
+import unittest
+from andante.parser import Parser
+from andante.program import AndanteProgram
+from andante.solver import AndanteSolver, CompiledSolver, DatalogSolver
+from andante.substitution import Substitution
+from andante.logic_concepts import Variable, Constant, Clause
+from andante.knowledge import TreeShapedKnowledge, MultipleKnowledge
+from andante.options import Options
+
+BACKGROUND = """
+parent(ann,mary). parent(ann,tom). parent(tom,eve). parent(tom,lucy). parent(eve,bob).
+ancestor(X,Y) :- parent(X,Y).
+ancestor(X,Y) :- parent(X,Z), ancestor(Z,Y).
+num(1). num(2). num(3).
+big(X) :- num(X), X > 1.
+double(X, Y) :- num(X), Y is X*2.
+wrap(X, f(X, g(Y)), Y) :- num(X).
+same(X, X).
+"""
+
+CONTROL = """
+num(1). num(2). num(3).
+first(X) :- num(X), !.
+max(X, Y, X) :- X > Y, !.
+max(X, Y, Y).
+above(X) :- num(X), X > 1, !.
+above(0).
+one(X) :- once(num(X)).
+size(X, Y) :- (num(X), X > 1 -> Y = big ; Y = none).
+some(X) :- (num(X) -> true).
+none(X) :- (num(X), X > 5 -> true ; X = 9).
+pair(X, Y) :- num(X), (X = 2 -> !, num(Y) ; Y = 0).
+pair(9, 9).
+stop(X) :- num(X), !, X > 5.
+color(X) :- X = red, !.
+color(red). color(blue).
+block(X) :- !, 1 > 2.
+block(a). block(b).
+blocked(X) :- block(X).
+"""
+
+class TestAndanteSolver(unittest.TestCase):
+    def setUp(self):
+        self.parser = Parser()
+        self.knowledge = AndanteProgram.build_from_background(BACKGROUND).knowledge
+        self.solver = AndanteSolver()
+
+    def solutions(self, q, var='X'):
+        goal = self.parser.parse(q, 'query')
+        return sorted(str(sigma[Variable(var)]) for sigma in self.solver.query(goal, self.knowledge))
+
+    def test_query(self):
+        self.assertEqual(self.solutions('parent(ann,X).'), ['mary', 'tom'])
+        self.assertEqual(self.solutions('parent(X,ann).'), [])
+
+    def test_source_order(self):
+        goal = self.parser.parse('ancestor(ann,X).', 'query')
+        answers = [str(sigma[Variable('X')]) for sigma in self.solver.query(goal, self.knowledge)]
+        self.assertEqual(answers, ['mary', 'tom', 'eve', 'lucy', 'bob'])
+
+    def test_ground_fact(self):
+        self.assertTrue(self.solver.succeeds_on(self.parser.parse('parent(tom,eve)', 'predicate'), self.knowledge))
+        self.assertFalse(self.solver.succeeds_on(self.parser.parse('parent(eve,tom)', 'predicate'), self.knowledge))
+        self.assertTrue(self.solver.succeeds_on(self.parser.parse('ancestor(ann,bob).', 'query'), self.knowledge))
+
+    def test_ground_fact_and_rule(self):
+        knowledge = AndanteProgram.build_from_background('p(a). p(X) :- q(X). q(a). q(b). r(X) :- p(X), q(X).').knowledge
+        answers = lambda q: {str(sigma) for sigma in self.solver.query(self.parser.parse(q, 'query'), knowledge)}
+        self.assertEqual(len(answers('p(a).')), 1)
+        self.assertEqual(len(answers('p(b).')), 1)
+        self.assertEqual(len(answers('p(X).')), 2)
+        self.assertEqual(len(answers('r(X).')), 2)
+
+    def test_ground_fact_after_cut(self):
+        # The fact is not used once the rule before it has cut
+        knowledge = AndanteProgram.build_from_background('''
+            p(X) :- !, 1 > 2. p(a). t(z) :- p(a).
+            q(X) :- !, 1 > 2. q(a). q(b). q(c). q(d). q(e). u(z) :- q(a).
+        ''').knowledge
+        for solver in (self.solver, DatalogSolver()):
+            for q in ('p(a)', 't(z)', 'q(a)', 'u(z)'):
+                self.assertFalse(solver.succeeds_on(self.parser.parse(q, 'atom'), knowledge))
+                self.assertEqual(list(solver.query(self.parser.parse(q + '.', 'query'), knowledge)), [])
+
+    def test_ground_fact_answers(self):
+        # A ground fact does not keep the other clauses from proving the call again, whatever their number
+        for extra in ('', ' '.join('q(b%d).' % i for i in range(20))):
+            knowledge = AndanteProgram.build_from_background('q(X) :- p(X). q(a). p(a). ' + extra).knowledge
+            goal = self.parser.parse('q(a).', 'query')
+            counts = [len(list(solver.query(goal, knowledge))) for solver in (self.solver, AndanteSolver(), CompiledSolver())]
+            self.assertEqual(counts, [2, 2, 2])
+            self.assertTrue(self.solver.succeeds_on(self.parser.parse('q(a)', 'atom'), knowledge))
+            goal = self.parser.parse('once(q(a)), p(X).', 'query')
+            self.assertEqual(len(list(self.solver.query(goal, knowledge))), 1)
+
+    def test_backtracking(self):
+        self.assertEqual(self.solutions('ancestor(ann,X).'), ['bob', 'eve', 'lucy', 'mary', 'tom'])
+        self.assertEqual(self.solutions('ancestor(X,bob).'), ['ann', 'eve', 'tom'])
+        self.assertEqual(self.solutions('parent(X,Y), parent(Y,Z).', 'Z'), ['bob', 'eve', 'lucy'])
+
+    def test_negation(self):
+        self.assertEqual(self.solutions('parent(X,Y), not(parent(Y,Z)).', 'Y'), ['bob', 'lucy', 'mary'])
+
+    def test_arithmetic(self):
+        self.assertEqual(self.solutions('big(X).'), ['2', '3'])
+        self.assertEqual(self.solutions('double(X,Y).', 'Y'), ['2', '4', '6'])
+        self.assertEqual(self.solutions('X = f(a), parent(ann,mary).'), ['f(a)'])
+
+    def test_succeeds_on(self):
+        self.assertTrue(self.solver.succeeds_on(self.parser.parse('ancestor(ann,bob)', 'atom'), self.knowledge))
+        self.assertFalse(self.solver.succeeds_on(self.parser.parse('ancestor(bob,ann)', 'atom'), self.knowledge))
+
+    def test_initial_substitution(self):
+        sigma = Substitution()
+        sigma.add_variables(Variable('X'))
+        sigma[Variable('X')] = Constant('tom')
+        goal = self.parser.parse('parent(X,Y).', 'query')
+        solutions = sorted(str(s[Variable('Y')]) for s in self.solver.query(goal, self.knowledge, sigma=sigma))
+        self.assertEqual(solutions, ['eve', 'lucy'])
+
+    def control(self, q):
+        knowledge = AndanteProgram.build_from_background(CONTROL).knowledge
+        goal = self.parser.parse(q, 'query')
+        return [sorted('%s=%s' % item for item in sigma.items()) for sigma in self.solver.query(goal, knowledge)]
+
+    def test_cut(self):
+        self.assertEqual(self.control('first(X).'), [['X=1']])
+        self.assertEqual(self.control('max(3, 1, Z).'), [['Z=3']])
+        self.assertEqual(self.control('max(1, 3, Z).'), [['Z=3']])
+        self.assertEqual(self.control('above(X).'), [['X=2']])
+        # The cut drops the other clauses and the choice points of the atoms before it
+        self.assertEqual(self.control('pair(X, Y).'), [['X=1', 'Y=0'], ['X=2', 'Y=1'], ['X=2', 'Y=2'], ['X=2', 'Y=3']])
+        self.assertEqual(self.control('num(X), X > 1, !, num(Y).'), [['X=2', 'Y=1'], ['X=2', 'Y=2'], ['X=2', 'Y=3']])
+        # A cut in a negation only cuts the negated goal
+        self.assertEqual(self.control('num(X), not(stop(X)).'), [['X=1'], ['X=2'], ['X=3']])
+        self.assertEqual(self.control('not(num(X), !, X > 1), num(Y).'), [['Y=1'], ['Y=2'], ['Y=3']])
+        # A rule cutting before ground facts of its predicate keeps them from being used
+        self.assertEqual(self.control('color(red).'), [[]])
+        self.assertEqual(self.control('color(blue).'), [[]])
+        self.assertEqual(self.control('color(X).'), [['X=red']])
+        self.assertEqual(self.control('num(X), color(red).'), [['X=1'], ['X=2'], ['X=3']])
+        self.assertEqual(self.control('block(a).'), [])
+        self.assertEqual(self.control('blocked(b).'), [])
+        knowledge = AndanteProgram.build_from_background(CONTROL).knowledge
+        self.assertFalse(self.solver.succeeds_on(self.parser.parse('block(a)', 'atom'), knowledge))
+        self.assertTrue(self.solver.succeeds_on(self.parser.parse('color(blue)', 'atom'), knowledge))
+
+    def test_once(self):
+        self.assertEqual(self.control('one(X).'), [['X=1']])
+        self.assertEqual(self.control('once(num(X), X > 1), num(Y).'), [['X=2', 'Y=1'], ['X=2', 'Y=2'], ['X=2', 'Y=3']])
+        self.assertEqual(self.control('once(num(X), X > 3).'), [])
+
+    def test_if_then_else(self):
+        self.assertEqual(self.control('size(X, Y).'), [['X=2', 'Y=big']])
+        self.assertEqual(self.control('some(X).'), [['X=1']])
+        self.assertEqual(self.control('none(X).'), [['X=9']])
+        self.assertEqual(self.control('(num(X), X > 5 -> true).'), [])
+        self.assertEqual(self.control('num(X), (X > 1 -> Y = a ; Y = b).'), [['X=1', 'Y=b'], ['X=2', 'Y=a'], ['X=3', 'Y=a']])
+
+    def test_deterministic_recursion(self):
+        links = ' '.join('link(%d, %d).' % (i, i + 1) for i in range(2999))
+        knowledge = AndanteProgram.build_from_background(links + """
+            count(2999, N, N).
+            count(X, N, M) :- link(X, Y), K is N + 1, count(Y, K, M).
+            walk(X) :- link(X, Y), walk(Y).
+            walk(X) :- X > 2990.
+        """).knowledge
+        solver = type(self.solver)(Options({'h': 100000}))
+        goal = self.parser.parse('count(0, 0, M).', 'query')
+        self.assertEqual([str(sigma[Variable('M')]) for sigma in solver.query(goal, knowledge)], ['2999'])
+        # The choice points of the second clause of walk/1 are still kept
+        goal = self.parser.parse('walk(0).', 'query')
+        self.assertEqual(len(list(solver.query(goal, knowledge))), 9)
+
+
+class TestCompiledSolver(TestAndanteSolver):
+    def setUp(self):
+        super().setUp()
+        self.solver = CompiledSolver()
+
+    def test_compound_terms(self):
+        self.assertEqual(self.solutions('wrap(X, f(1, g(b)), Y).', 'Y'), ['b'])
+        self.assertEqual(self.solutions('wrap(2, Z, c).', 'Z'), ['f(2, g(c))'])
+        self.assertEqual(self.solutions('wrap(X, f(Y, g(Y)), Y).', 'Y'), ['1', '2', '3'])
+        self.assertEqual(self.solutions('same(X, a).'), ['a'])
+        self.assertEqual(self.solutions('same(a, b).'), [])
+
+    def test_occurs_check(self):
+        self.assertEqual(self.solutions('same(X, f(X)).'), [])
+
+    def test_unbound_output(self):
+        self.assertEqual(self.solutions('same(X, Y).'), ['Y'])
+
+
+class TestAnswerCache(unittest.TestCase):
+    solver_class = AndanteSolver
+
+    def setUp(self):
+        self.parser = Parser()
+        self.knowledge = AndanteProgram.build_from_background(BACKGROUND).knowledge
+        self.solver = self.solver_class()
+
+    def test_hits_and_misses(self):
+        atom = self.parser.parse('ancestor(ann,bob)', 'atom')
+        self.assertTrue(self.solver.succeeds_on(atom, self.knowledge))
+        self.assertTrue(self.solver.succeeds_on(atom, self.knowledge))
+        self.assertEqual((self.solver.cache.hits, self.solver.cache.misses), (1, 1))
+        # Variants share their answer
+        self.solver.succeeds_on(self.parser.parse('ancestor(ann,X)', 'atom'), self.knowledge)
+        self.solver.succeeds_on(self.parser.parse('ancestor(ann,Y)', 'atom'), self.knowledge)
+        self.assertEqual((self.solver.cache.hits, self.solver.cache.misses), (2, 2))
+
+    def test_query(self):
+        goal = self.parser.parse('parent(ann,X).', 'query')
+        first = [str(sigma) for sigma in self.solver.query(goal, self.knowledge)]
+        second = [str(sigma) for sigma in self.solver.query(goal, self.knowledge)]
+        self.assertEqual(first, second)
+        self.assertEqual(self.solver.cache.hits, 1)
+        # Partially consumed queries are not cached
+        goal = self.parser.parse('parent(tom,X).', 'query')
+        next(self.solver.query(goal, self.knowledge))
+        self.assertEqual(len(list(self.solver.query(goal, self.knowledge))), 2)
+        self.assertEqual(self.solver.cache.hits, 1)
+
+    def test_invalidation(self):
+        atom = self.parser.parse('parent(bob,tim)', 'atom')
+        self.assertFalse(self.solver.succeeds_on(atom, self.knowledge))
+        clause = Clause(atom, [])
+        self.knowledge.add(clause)
+        self.assertTrue(self.solver.succeeds_on(atom, self.knowledge))
+        self.knowledge.remove(clause)
+        self.assertFalse(self.solver.succeeds_on(atom, self.knowledge))
+        self.assertEqual(self.solver.cache.hits, 0)
+
+    def test_multiple_knowledge(self):
+        atom = self.parser.parse('parent(bob,tim)', 'atom')
+        overlay = TreeShapedKnowledge([Clause(atom, [])])
+        self.assertFalse(self.solver.succeeds_on(atom, self.knowledge))
+        self.assertTrue(self.solver.succeeds_on(atom, MultipleKnowledge(self.knowledge, overlay)))
+        self.assertFalse(self.solver.succeeds_on(atom, MultipleKnowledge(self.knowledge, TreeShapedKnowledge())))
+        self.assertEqual(self.solver.cache.hits, 0)
+        # A modification of a part invalidates the answers of the whole
+        whole = MultipleKnowledge(self.knowledge, overlay)
+        self.assertTrue(self.solver.succeeds_on(atom, whole))
+        overlay.remove(Clause(atom, []))
+        self.assertFalse(self.solver.succeeds_on(atom, whole))
+
+    def test_size(self):
+        self.solver.options.cache_size = 1
+        for q in ('parent(ann,mary)', 'parent(ann,tom)', 'parent(ann,mary)'):
+            self.solver.succeeds_on(self.parser.parse(q, 'atom'), self.knowledge)
+        self.assertEqual(self.solver.cache.info(), {'hits':0, 'misses':3, 'size':1, 'maxsize':1})
+        self.solver.options.cache_size = 0
+        self.solver.succeeds_on(self.parser.parse('parent(ann,mary)', 'atom'), self.knowledge)
+        self.assertEqual(self.solver.cache.misses, 3)
+
+
+class TestCompiledAnswerCache(TestAnswerCache):
+    solver_class = CompiledSolver
+
+
+TABLED = """
+:- table path/2.
+
+:- begin_bg.
+edge(a,b). edge(b,c). edge(c,a). edge(c,d).
+path(X,Y) :- path(X,Z), edge(Z,Y).
+path(X,Y) :- edge(X,Y).
+even(z).
+even(s(X)) :- odd(X).
+odd(s(X)) :- even(X).
+:- end_bg.
+"""
+
+class TestTabling(unittest.TestCase):
+    solver_class = AndanteSolver
+
+    def setUp(self):
+        self.parser = Parser()
+        program = AndanteProgram.build_from(TABLED)
+        self.knowledge = program.knowledge
+        self.solver = self.solver_class(program.options)
+
+    def solutions(self, q, var='X'):
+        goal = self.parser.parse(q, 'query')
+        return sorted(str(sigma[Variable(var)]) for sigma in self.solver.query(goal, self.knowledge))
+
+    def test_directive(self):
+        self.assertEqual(self.solver.options.table, ('path/2',))
+
+    def test_left_recursion(self):
+        self.assertEqual(self.solutions('path(a,X).'), ['a', 'b', 'c', 'd'])
+        self.assertEqual(self.solutions('path(d,X).'), [])
+        self.assertEqual(len(list(self.solver.query(self.parser.parse('path(X,Y).', 'query'), self.knowledge))), 12)
+
+    def test_tables_reused_until_knowledge_changes(self):
+        self.assertTrue(self.solver.succeeds_on(self.parser.parse('path(a,d)', 'atom'), self.knowledge))
+        space = self.solver._table_space(self.knowledge)
+        self.assertTrue(all(table.complete for table in space.tables.values()))
+        self.assertIs(self.solver._table_space(self.knowledge), space)
+        
+        self.assertFalse(self.solver.succeeds_on(self.parser.parse('path(d,e)', 'atom'), self.knowledge))
+        self.knowledge.add(Clause(self.parser.parse('edge(d,e)', 'atom'), []))
+        self.assertIsNot(self.solver._table_space(self.knowledge), space)
+        self.assertTrue(self.solver.succeeds_on(self.parser.parse('path(d,e)', 'atom'), self.knowledge))
+
+    def test_tabling_option(self):
+        self.solver.options.tabling = True
+        self.assertEqual(self.solver._table_space(self.knowledge).tabled, {'path/2', 'even/1', 'odd/1'})
+        self.assertTrue(self.solver.succeeds_on(self.parser.parse('even(s(s(z)))', 'atom'), self.knowledge))
+        self.assertFalse(self.solver.succeeds_on(self.parser.parse('odd(s(s(z)))', 'atom'), self.knowledge))
+
+
+class TestCompiledTabling(TestTabling):
+    solver_class = CompiledSolver
+
+
+if __name__ == '__main__':
+    unittest.main()
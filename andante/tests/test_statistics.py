@@ -0,0 +1,68 @@
+import pickle
+import unittest
+from andante.parser import Parser
+from andante.knowledge import TreeShapedKnowledge, MultipleKnowledge, OverlayKnowledge
+from andante.columnar import ColumnarKnowledge
+from andante.database import SQLiteKnowledge
+from andante.statistics import Statistics
+from andante.logic_concepts import Constant
+
+BACKGROUND = """
+:- begin_bg.
+edge(a,b). edge(a,c). edge(b,c). edge(c,d). edge(f(a),b). edge(X,e). node(a).
+path(X,Y) :- edge(X,Y).
+path(X,Y) :- edge(X,Y), !.
+:- end_bg.
+"""
+
+def summary(statistics):
+    return {p.name: (p.clauses, p.facts, p.rules, p.commits, p.values) for p in statistics}
+
+class TestStatistics(unittest.TestCase):
+    def setUp(self):
+        self.parser = Parser()
+        self.clauses = list(self.parser.parse(BACKGROUND, 'background'))
+        self.knowledge = TreeShapedKnowledge(self.clauses)
+
+    def test_counts(self):
+        statistics = self.knowledge.statistics
+        edge = statistics['edge/2']
+        self.assertEqual((edge.clauses, edge.facts, edge.rules), (6, 5, 0))
+        self.assertEqual(edge.values[0], {Constant('a'): 2, Constant('b'): 1, Constant('c'): 1, ('f', 1): 1})
+        self.assertEqual(statistics.distinct('edge/2', 1), 4)
+        self.assertEqual(statistics.cardinality('path/2'), 2)
+        self.assertEqual((statistics['path/2'].rules, statistics['path/2'].commits, edge.commits), (2, 1, 0))
+        self.assertEqual(statistics.cardinality('none/0'), 0)
+        self.assertEqual(statistics.ground_fraction('edge/2'), 5/6)
+        self.assertEqual(statistics.selectivity(self.parser.parse('edge(a,Y)', 'predicate')), 6/4)
+        self.assertEqual(summary(statistics), summary(Statistics(self.clauses)))
+
+    def test_incremental(self):
+        self.knowledge.statistics
+        removed, added = self.clauses[:2], self.parser.parse(':- begin_bg. edge(d,e). node(b). :- end_bg.', 'background')
+        self.knowledge.remove(removed)
+        self.knowledge.add(added)
+        self.knowledge.add(self.clauses[0])
+        expected = Statistics(self.knowledge)
+        self.assertEqual(summary(self.knowledge.statistics), summary(expected))
+        self.assertEqual(self.knowledge.statistics['edge/2'].clauses, 6)
+        # The statistics are pickled with the knowledge
+        self.assertEqual(summary(pickle.loads(pickle.dumps(self.knowledge)).statistics), summary(expected))
+
+    def test_composed(self):
+        expected = summary(self.knowledge.statistics)
+        self.assertEqual(summary(MultipleKnowledge(TreeShapedKnowledge(self.clauses[:3]), TreeShapedKnowledge(self.clauses[3:])).statistics), expected)
+        overlay = OverlayKnowledge(TreeShapedKnowledge(self.clauses[1:]), self.clauses[:1])
+        self.assertEqual(summary(overlay.statistics), expected)
+        overlay.remove(self.clauses[1])
+        self.assertEqual(overlay.statistics.cardinality('edge/2'), 5)
+
+    def test_stores(self):
+        facts = [c for c in self.clauses if c.head.name != 'path/2' and c.head.arguments[0] != self.clauses[5].head.arguments[0]]
+        expected = summary(Statistics(facts))
+        self.assertEqual(summary(ColumnarKnowledge(facts).statistics), expected)
+        knowledge = SQLiteKnowledge(self.clauses)
+        self.assertEqual(summary(knowledge.statistics), summary(self.knowledge.statistics))
+        knowledge.remove(self.clauses[0])
+        self.assertEqual(knowledge.statistics.cardinality('edge/2'), 5)
+        knowledge.close()
@@ -0,0 +1,80 @@
+import unittest
+from andante.substitution import Substitution, SubstitutionError, BindingStore
+from andante.logic_concepts import Clause, Constant, Variable, Predicate, CompoundTerm
+from andante.compilation import Slot, compile_clause
+
+
+class TestSubstitution(unittest.TestCase):
+    def setUp(self):
+        self.vars = [Variable('X', i) for i in range(50)]
+        self.s = Substitution()
+        self.s.add_variables(self.vars)
+
+    def test_chain_of_bindings(self):
+        for v1, v2 in zip(self.vars, self.vars[1:]):
+            self.s[v1] = v2
+        self.s[self.vars[-1]] = Constant('a')
+        for v in self.vars:
+            self.assertEqual(self.s[v], Constant('a'))
+        # Bindings are kept in triangular form
+        self.assertEqual(self.s.subst[self.vars[0]], self.vars[1])
+
+    def test_substitute(self):
+        x, y, z, w = self.vars[:4]
+        self.s.unify(Predicate('p', [x, CompoundTerm('f', [y])]), Predicate('p', [CompoundTerm('g', [z]), w]))
+        self.s[y] = x
+        self.s[z] = Constant('a')
+        p = self.s.substitute(Predicate('p', [x, w]))
+        self.assertEqual(str(p), 'p(g(a), f(g(a)))')
+
+    def test_unify_failure(self):
+        x = self.vars[0]
+        self.s[x] = Constant('a')
+        self.assertRaises(SubstitutionError, self.s.unify, x, Constant('b'))
+
+    def test_occurs_check(self):
+        x, y = self.vars[:2]
+        self.s[y] = x
+        self.assertRaises(SubstitutionError, self.s.__setitem__, x, CompoundTerm('f', [y]))
+        # The item may be a variable mapped to a term containing the key
+        x, y = self.vars[2:4]
+        self.s[y] = CompoundTerm('f', [x])
+        self.assertRaises(SubstitutionError, self.s.__setitem__, x, y)
+        self.assertEqual(self.s[y], CompoundTerm('f', [x]))
+        s = Substitution(occurs_check=False)
+        s.add_variables([x])
+        s[x] = CompoundTerm('f', [x])
+        self.assertEqual(s.subst[x], CompoundTerm('f', [x]))
+
+
+class TestBindingStore(unittest.TestCase):
+    def test_backtracking(self):
+        x, y, z = Slot(0), Slot(1), Slot(2)
+        store = BindingStore([Variable('X'), Variable('Y'), Variable('Z')])
+        self.assertTrue(store.unify(Predicate('p', [x, Constant('a')]), 0, Predicate('p', [Constant('b'), y]), 0))
+        mark = store.mark()
+        self.assertFalse(store.unify(x, 0, Constant('c'), 0))
+        self.assertTrue(store.unify(CompoundTerm('f', [y]), 0, z, 0))
+        self.assertEqual(store.resolve(z, 0), CompoundTerm('f', [Constant('a')]))
+        store.undo(mark)
+        self.assertEqual(store.resolve(z, 0), Variable('Z'))
+        self.assertEqual(store.resolve(x, 0), Constant('b'))
+
+    def test_frames(self):
+        """ The same compiled term denotes different variables in different frames """
+        clause = compile_clause(Clause(Predicate('p', [Variable('X'), Variable('Y')]), []))
+        store = BindingStore([Variable('A')])
+        frame1, frame2 = store.allocate(clause.nvars), store.allocate(clause.nvars)
+        self.assertTrue(store.unify(clause.head, frame1, Predicate('p', [Constant('a'), Slot(0)]), 0))
+        self.assertTrue(store.unify(clause.head, frame2, Predicate('p', [Constant('b'), Constant('c')]), 0))
+        self.assertEqual(store.resolve(clause.head, frame1), Predicate('p', [Constant('a'), Variable('A')]))
+        self.assertEqual(store.resolve(clause.head, frame2), Predicate('p', [Constant('b'), Constant('c')]))
+
+    def test_occurs_check(self):
+        x = Slot(0)
+        self.assertFalse(BindingStore([Variable('X')]).unify(x, 0, CompoundTerm('f', [x]), 0))
+        self.assertTrue(BindingStore([Variable('X')], occurs_check=False).unify(x, 0, CompoundTerm('f', [x]), 0))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,55 @@
+"""
+Throughput of loading ground facts into an andante.knowledge.TreeShapedKnowledge
+one clause at a time with add, and in one pass with bulk_add from a generator,
+on the tabular data of benchmarks/columnar_knowledge.py.
+
+Usage: python benchmarks/bulk_loading.py [number of patients]
+"""
+
+import gc
+import sys
+import time
+
+from andante.knowledge import TreeShapedKnowledge
+from andante.logic_concepts import Clause, Predicate, Constant
+
+from columnar_knowledge import tabular_data
+
+
+def clauses(data):
+    for symbol, rows in data.items():
+        for row in rows:
+            yield Clause(Predicate(symbol, [Constant(v) for v in row]), [])
+
+
+def one_by_one(facts):
+    knowledge = TreeShapedKnowledge()
+    for clause in facts:
+        knowledge.add(clause)
+    return knowledge
+
+
+def bulk(facts):
+    knowledge = TreeShapedKnowledge()
+    knowledge.bulk_add(facts)
+    return knowledge
+
+
+if __name__ == '__main__':
+    patients = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    data = tabular_data(patients)
+    facts = list(clauses(data))
+    print('%d facts of %d predicates, %d patients' % (len(facts), len(data), patients))
+    for name, load in (('add', one_by_one), ('bulk_add', bulk)):
+        gc.collect()
+        start = time.perf_counter()
+        knowledge = load(iter(facts))
+        elapsed = time.perf_counter() - start
+        print('%-9s %6.2fs  %8.0f clauses/s' % (name, elapsed, len(facts) / elapsed))
+        del knowledge
+    # Building the clauses is part of loading them from a generator
+    gc.collect()
+    start = time.perf_counter()
+    knowledge = bulk(clauses(data))
+    elapsed = time.perf_counter() - start
+    print('%-9s %6.2fs  %8.0f clauses/s, clauses built by the generator' % ('bulk_add', elapsed, len(facts) / elapsed))
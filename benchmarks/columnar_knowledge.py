@@ -0,0 +1,93 @@
+"""
+Memory footprint, load time and match time of andante.columnar.ColumnarKnowledge
+compared to andante.knowledge.TreeShapedKnowledge, on tabular data shaped like
+the medical examples: unary attributes of patients and a few binary relations.
+The time taken to add the facts of a predicate one by one is measured as well.
+
+Usage: python benchmarks/columnar_knowledge.py [number of patients]
+"""
+
+import gc
+import random
+import sys
+import time
+import tracemalloc
+
+from andante.columnar import ColumnarKnowledge
+from andante.knowledge import TreeShapedKnowledge
+from andante.logic_concepts import Clause, Predicate, Constant, Variable
+
+
+def tabular_data(patients, attributes=40, seed=0):
+    """ Returns the rows of the facts of each predicate """
+    rng = random.Random(seed)
+    data = dict()
+    for a in range(attributes):
+        data['attribute%d' % a] = [('p%d' % i,) for i in range(patients) if rng.random() < .5]
+    data['age'] = [('p%d' % i, rng.randint(18, 90)) for i in range(patients)]
+    data['ward'] = [('p%d' % i, 'w%d' % rng.randint(0, 50)) for i in range(patients)]
+    return data
+
+
+def load_tree(data):
+    clauses = [Clause(Predicate(symbol, [Constant(v) for v in row]), []) for symbol, rows in data.items() for row in rows]
+    return TreeShapedKnowledge(clauses)
+
+
+def load_columnar(data):
+    knowledge = ColumnarKnowledge()
+    for symbol, rows in data.items():
+        knowledge.add_facts(symbol, rows)
+    return knowledge
+
+
+def add_one_by_one(rows):
+    """ Returns the time taken to add some facts of a predicate one at a time """
+    knowledge = ColumnarKnowledge()
+    start = time.perf_counter()
+    for row in rows:
+        knowledge.add_facts('ward', [row])
+    return time.perf_counter() - start
+
+
+def measure(load, data):
+    """ Returns the knowledge loaded, the time taken and the memory it keeps allocated """
+    gc.collect()
+    start = time.perf_counter()
+    knowledge = load(data)
+    elapsed = time.perf_counter() - start
+    del knowledge
+    # Memory is measured on a second load, as tracing slows allocations down
+    gc.collect()
+    tracemalloc.start()
+    knowledge = load(data)
+    gc.collect()
+    memory, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return knowledge, elapsed, memory
+
+
+def match_time(knowledge, patients, calls=20000, seed=1):
+    rng = random.Random(seed)
+    X = Variable('X')
+    atoms = [Predicate(rng.choice(['age', 'ward']), [Constant('p%d' % rng.randrange(patients)), X]) for _ in range(calls)]
+    atoms += [Predicate('attribute%d' % rng.randrange(40), [Constant('p%d' % rng.randrange(patients))]) for _ in range(calls)]
+    start = time.perf_counter()
+    for atom in atoms:
+        for clause in knowledge.match_iter(atom):
+            pass
+    return time.perf_counter() - start
+
+
+if __name__ == '__main__':
+    patients = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    data = tabular_data(patients)
+    nfacts = sum(len(rows) for rows in data.values())
+    print('%d facts of %d predicates, %d patients' % (nfacts, len(data), patients))
+    for name, load in (('TreeShapedKnowledge', load_tree), ('ColumnarKnowledge', load_columnar)):
+        knowledge, elapsed, memory = measure(load, data)
+        print('%-20s load %6.2fs  memory %7.1f MB (%5.0f bytes/fact)  40000 matches %5.2fs' % (
+            name, elapsed, memory / 2**20, memory / nfacts, match_time(knowledge, patients)))
+        del knowledge
+    for n in (2000, 4000, 8000):
+        print('ColumnarKnowledge    %d facts added one by one %5.2fs' % (n, add_one_by_one(data['ward'][:n])))
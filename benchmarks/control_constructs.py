@@ -0,0 +1,60 @@
+"""
+Time of using a deterministic background predicate, a grade computed from a
+score by thresholds, written with and without cuts. Without cuts, each
+clause tests its whole range and all the clauses are tried again on
+backtracking; with cuts, or with nested if-then-elses, the first clause
+whose threshold is reached is the only one tried.
+
+Usage: python benchmarks/control_constructs.py [number of students]
+"""
+
+import sys
+import time
+
+from andante.parser import Parser
+from andante.solver import AndanteSolver, CompiledSolver
+from andante.options import Options
+
+
+PURE = """
+grade(S, a) :- S > 89.
+grade(S, b) :- S > 79, S < 90.
+grade(S, c) :- S > 69, S < 80.
+grade(S, d) :- S > 59, S < 70.
+grade(S, f) :- S < 60.
+"""
+
+CUT = """
+grade(S, G) :- S > 89, !, G = a.
+grade(S, G) :- S > 79, !, G = b.
+grade(S, G) :- S > 69, !, G = c.
+grade(S, G) :- S > 59, !, G = d.
+grade(S, f).
+"""
+
+IF_THEN_ELSE = """
+grade(S, G) :- (S > 89 -> G = a ; (S > 79 -> G = b ; (S > 69 -> G = c ; (S > 59 -> G = d ; G = f)))).
+"""
+
+
+def background(students, grade):
+    scores = ' '.join('score(s%d, %d).' % (i, (i * 37) % 100) for i in range(students))
+    return ':- begin_bg. %s %s :- end_bg.' % (scores, grade)
+
+
+if __name__ == '__main__':
+    students = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    parser = Parser()
+    # The grade is never z: all the alternatives left are tried
+    query = parser.parse('score(P, S), grade(S, G), G = z.', 'query')
+    count = parser.parse('score(P, S), grade(S, G).', 'query')
+    for name, grade in (('pure', PURE), ('cut', CUT), ('if-then-else', IF_THEN_ELSE)):
+        knowledge = parser.parse(background(students, grade), 'background')
+        for solver_class in (AndanteSolver, CompiledSolver):
+            # The pure grades need more resolution steps than the default h allows
+            solver = solver_class(Options({'cache_size': 0, 'h': 10**7}))
+            start = time.perf_counter()
+            answers = len(list(solver.query(count, knowledge)))
+            failed = not solver.succeeds_on(query, knowledge)
+            elapsed = time.perf_counter() - start
+            print('%-13s %-15s %6.3fs  %d answers, failing query %s' % (name, solver_class.__name__, elapsed, answers, 'failed' if failed else 'succeeded'))
@@ -0,0 +1,64 @@
+"""
+Time of coverage tests on a recursive background predicate: ancestor/2
+over a random forest of persons, tested on ground examples, half of which
+are covered, by the top-down solvers and by the bottom-up DatalogSolver.
+The time of DatalogSolver includes the materialization of ancestor/2.
+
+Usage: python benchmarks/datalog_evaluation.py [number of persons] [number of examples]
+"""
+
+import random
+import sys
+import time
+
+from andante.parser import Parser
+from andante.solver import AndanteSolver, CompiledSolver, DatalogSolver
+from andante.options import Options
+
+
+RULES = """
+ancestor(X,Y) :- parent(X,Y).
+ancestor(X,Y) :- parent(X,Z), ancestor(Z,Y).
+"""
+
+
+def forest(persons, seed=0):
+    """ Returns the parent of each person but the first one """
+    rng = random.Random(seed)
+    return {i: rng.randrange(i) for i in range(1, persons)}
+
+
+def background(parent):
+    parents = ' '.join('parent(p%d, p%d).' % (p, c) for c, p in parent.items())
+    return ':- begin_bg. %s %s :- end_bg.' % (parents, RULES)
+
+
+def examples(parent, n, seed=1):
+    """ Returns n pairs of persons, every other one being an ancestor and one of their descendants """
+    rng = random.Random(seed)
+    pairs = []
+    while len(pairs) < n:
+        person = rng.randrange(1, len(parent) + 1)
+        ancestors = [parent[person]]
+        while ancestors[-1] in parent:
+            ancestors.append(parent[ancestors[-1]])
+        if len(pairs) % 2 == 0:
+            pairs.append((rng.choice(ancestors), person))
+        else:
+            pairs.append((person, rng.choice(ancestors)))
+    return ['ancestor(p%d, p%d)' % pair for pair in pairs]
+
+
+if __name__ == '__main__':
+    persons = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+    n = int(sys.argv[2]) if len(sys.argv) > 2 else 2000
+    parser = Parser()
+    parent = forest(persons)
+    knowledge = parser.parse(background(parent), 'background')
+    atoms = [parser.parse(example, 'predicate') for example in examples(parent, n)]
+    for solver_class in (AndanteSolver, CompiledSolver, DatalogSolver):
+        solver = solver_class(Options({'cache_size': 0, 'h': 10**6}))
+        start = time.perf_counter()
+        covered = sum(solver.succeeds_on(atom, knowledge) for atom in atoms)
+        elapsed = time.perf_counter() - start
+        print('%-15s %6.3fs  %d of %d examples covered' % (solver_class.__name__, elapsed, covered, n))
@@ -0,0 +1,60 @@
+"""
+Peak memory and time of deep tail recursions: walking a chain of links from
+its first node to its last one, and counting its length with an accumulator.
+Every call has a single matching clause, so that the memory used should not
+grow with the length of the chain.
+
+Usage: python benchmarks/deterministic_calls.py [length of the chain]
+"""
+
+import gc
+import sys
+import time
+import tracemalloc
+
+from andante.parser import Parser
+from andante.solver import AndanteSolver, CompiledSolver
+from andante.options import Options
+
+
+RULES = """
+walk(X) :- link(X, Y), walk(Y).
+walk(end).
+count(end, N, N).
+count(X, N, M) :- link(X, Y), K is N + 1, count(Y, K, M).
+"""
+
+
+def background(length):
+    links = ' '.join('link(n%d, n%d).' % (i, i + 1) for i in range(length - 1))
+    return ':- begin_bg. %s link(n%d, end). %s :- end_bg.' % (links, length - 1, RULES)
+
+
+def run(solver_class, query, knowledge, length, trace):
+    solver = solver_class(Options({'cache_size': 0, 'h': 10 * length}))
+    # A first run fills the caches of clause candidates of the solver
+    list(solver.query(query, knowledge))
+    gc.collect()
+    if trace:
+        tracemalloc.start()
+    start = time.perf_counter()
+    answers = [str(s) for s in solver.query(query, knowledge)]
+    elapsed = time.perf_counter() - start
+    peak = 0
+    if trace:
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    return elapsed, peak, answers
+
+
+if __name__ == '__main__':
+    length = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    parser = Parser()
+    knowledge = parser.parse(background(length), 'background')
+    for q in ('walk(n0).', 'count(n0, 0, M).'):
+        query = parser.parse(q, 'query')
+        for solver_class in (AndanteSolver, CompiledSolver):
+            # Tracing memory slows the solvers down: timed on a separate run
+            elapsed, _, answers = run(solver_class, query, knowledge, length, False)
+            _, peak, _ = run(solver_class, query, knowledge, length, True)
+            print('%-18s %-15s %6.3fs  peak %7.1f MB  %s' % (q, solver_class.__name__, elapsed, peak / 2**20, answers))
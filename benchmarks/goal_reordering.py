@@ -0,0 +1,41 @@
+"""
+Time of proving a badly ordered rule with andante.solver.AndanteSolver, with
+and without the option reorder, on a chain of parents: the body of
+grandfather/2 enumerates every person before reaching the few males.
+
+Usage: python benchmarks/goal_reordering.py [number of persons]
+"""
+
+import sys
+import time
+
+from andante.parser import Parser
+from andante.solver import AndanteSolver
+from andante.options import Options
+
+
+def background(persons):
+    facts = ['person(p%d).' % i for i in range(persons)]
+    facts += ['parent(p%d,p%d).' % (i, i + 1) for i in range(persons - 1)]
+    facts += ['male(p3).', 'male(p5).']
+    rule = 'grandfather(X,Y) :- person(Y), person(Z), parent(Z,Y), parent(X,Z), male(X).'
+    return ':- begin_bg. %s %s :- end_bg.' % (' '.join(facts), rule)
+
+
+if __name__ == '__main__':
+    persons = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    parser = Parser()
+    knowledge = parser.parse(background(persons), 'background')
+    query = parser.parse('grandfather(X,Y).', 'query')
+    examples = [parser.parse('grandfather(p%d,p%d)' % (i, i + 2), 'predicate') for i in range(persons - 2)]
+    print(AndanteSolver().explain(query, knowledge))
+    for rule in knowledge:
+        if rule.body:
+            print(AndanteSolver().explain(rule, knowledge))
+    for reorder in (False, True):
+        solver = AndanteSolver(Options({'reorder': reorder, 'cache_size': 0}))
+        start = time.perf_counter()
+        answers = len(list(solver.query(query, knowledge)))
+        covered = sum(solver.succeeds_on(example, knowledge) for example in examples)
+        elapsed = time.perf_counter() - start
+        print('reorder=%-5s %6.3fs  %d answers, %d of %d examples covered' % (reorder, elapsed, answers, covered, len(examples)))
@@ -0,0 +1,60 @@
+"""
+Latency of queries on a recursive background predicate, ancestor/2 over a
+random forest of persons, while parent/2 facts are inserted and deleted:
+each update is followed by a coverage test by DatalogSolver, whose
+relations are either updated incrementally, or computed again, as they
+were before knowledges kept a journal of their modifications.
+
+Usage: python benchmarks/incremental_maintenance.py [number of persons] [number of updates]
+"""
+
+import random
+import sys
+import time
+
+from andante.parser import Parser
+from andante.solver import DatalogSolver
+from andante.options import Options
+from andante.logic_concepts import Clause, Predicate, Constant
+
+from datalog_evaluation import forest, background, examples
+
+
+def updates(parent, n, seed=2):
+    """ Returns n parent/2 facts, each one being inserted then deleted, or deleted then inserted back """
+    rng = random.Random(seed)
+    facts = []
+    for _ in range(n // 2):
+        child = rng.randrange(1, len(parent) + 1)
+        if rng.random() < .5:
+            # A new leaf
+            fact = (rng.randrange(len(parent) + 1), len(parent) + 1 + len(facts))
+        else:
+            fact = (parent[child], child)
+        facts.append(fact)
+    clauses = [Clause(Predicate('parent', [Constant('p%d' % p), Constant('p%d' % c)]), []) for p, c in facts]
+    return clauses + clauses
+
+
+if __name__ == '__main__':
+    persons = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    n = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    parser = Parser()
+    parent = forest(persons)
+    atoms = [parser.parse(example, 'predicate') for example in examples(parent, n)]
+    for incremental in (True, False):
+        knowledge = parser.parse(background(parent), 'background')
+        if not incremental:
+            knowledge.journal = lambda: None
+        solver = DatalogSolver(Options({'cache_size': 0}))
+        solver.succeeds_on(atoms[0], knowledge)
+        start = time.perf_counter()
+        covered = 0
+        for clause, atom in zip(updates(parent, n), atoms):
+            if clause in knowledge:
+                knowledge.remove(clause)
+            else:
+                knowledge.add(clause)
+            covered += solver.succeeds_on(atom, knowledge)
+        elapsed = time.perf_counter() - start
+        print('%-12s %7.2fms per update and query  %d of %d examples covered' % ('incremental' if incremental else 'recomputed', 1000 * elapsed / n, covered, n))
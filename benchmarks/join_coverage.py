@@ -0,0 +1,64 @@
+"""
+Time of the computation of the examples covered by candidate clauses of
+grandparent/2, as in the search of andante.learner.ProgolLearner, over a
+random forest of persons: each example proven by the solver
+(ProofCoverage), or all of them at once by a join of the body of the
+clause (JoinCoverage).
+
+Usage: python benchmarks/join_coverage.py [number of persons] [number of examples]
+"""
+
+import random
+import sys
+import time
+
+from andante.parser import Parser
+from andante.knowledge import OverlayKnowledge
+from andante.solver import AndanteSolver, CompiledSolver, DatalogSolver
+from andante.coverage import ProofCoverage, JoinCoverage
+from andante.options import Options
+from andante.collections import count_of
+
+from datalog_evaluation import forest, background
+
+
+CANDIDATES = [
+    'grandparent(X,Y).',
+    'grandparent(X,Y) :- parent(X,Z).',
+    'grandparent(X,Y) :- parent(X,Z), parent(Z,Y).',
+    'grandparent(X,Y) :- parent(X,Z), parent(Z,W).',
+    'grandparent(X,Y) :- parent(Z,Y), parent(X,W).',
+    'grandparent(X,Y) :- parent(W,X), parent(Z,Y), parent(W,Z).',
+]
+
+
+def examples(parent, n, seed=1):
+    """ Returns n grandparent/2 examples, every other one being positive """
+    rng = random.Random(seed)
+    grandchildren = [c for c, p in parent.items() if p in parent]
+    pairs = []
+    while len(pairs) < n:
+        child = rng.choice(grandchildren)
+        if len(pairs) % 2 == 0:
+            pairs.append((parent[parent[child]], child))
+        else:
+            pairs.append((rng.randrange(len(parent) + 1), child))
+    return ['grandparent(p%d, p%d).' % pair for pair in pairs]
+
+
+if __name__ == '__main__':
+    persons = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    n = int(sys.argv[2]) if len(sys.argv) > 2 else 2000
+    parser = Parser()
+    parent = forest(persons)
+    knowledge = parser.parse(background(parent), 'background')
+    E = [parser.parse(e, 'definiteclause') for e in examples(parent, n)]
+    clauses = [parser.parse(c, 'definiteclause') for c in CANDIDATES]
+    for solver_class in (AndanteSolver, CompiledSolver, DatalogSolver):
+        for coverage_class in (ProofCoverage, JoinCoverage):
+            solver = solver_class(Options({'cache_size': 0}))
+            coverage = coverage_class(knowledge, None, solver)
+            start = time.perf_counter()
+            covered = [count_of(coverage.covered(c, E, OverlayKnowledge(knowledge, [c]))) for c in clauses]
+            elapsed = time.perf_counter() - start
+            print('%-15s %-14s %7.3fs  covered %s' % (solver_class.__name__, coverage_class.__name__, elapsed, covered))
@@ -0,0 +1,58 @@
+"""
+Startup time of a knowledge opened from an image (see andante.image)
+compared to parsing its source and to unpickling it, on the tabular data of
+benchmarks/columnar_knowledge.py. The time of the first matches, which
+decode the terms they use, is given as well.
+
+Usage: python benchmarks/knowledge_image.py [number of patients]
+"""
+
+import os
+import pickle
+import sys
+import tempfile
+import time
+
+from andante.image import ImageKnowledge, save_image
+from andante.parser import Parser
+
+from columnar_knowledge import tabular_data, load_tree, match_time
+
+
+def timed(f, *args):
+    start = time.perf_counter()
+    result = f(*args)
+    return result, time.perf_counter() - start
+
+
+if __name__ == '__main__':
+    patients = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    data = tabular_data(patients)
+    nfacts = sum(len(rows) for rows in data.values())
+    print('%d facts of %d predicates, %d patients' % (nfacts, len(data), patients))
+    knowledge = load_tree(data)
+
+    with tempfile.TemporaryDirectory() as directory:
+        source = os.path.join(directory, 'background.pl')
+        with open(source, 'w') as f:
+            f.write(':- begin_bg.\n%s\n:- end_bg.\n' % '\n'.join(str(c) for c in knowledge))
+        pickled = os.path.join(directory, 'background.pickle')
+        with open(pickled, 'wb') as f:
+            pickle.dump(knowledge, f)
+        image = os.path.join(directory, 'background.img')
+        _, elapsed = timed(save_image, knowledge, image)
+        print('image written in %.2fs, %.1f MB' % (elapsed, os.path.getsize(image) / 2**20))
+        del knowledge
+
+        def parse():
+            with open(source) as f:
+                return Parser().parse(f.read(), 'background')
+
+        def unpickle():
+            with open(pickled, 'rb') as f:
+                return pickle.load(f)
+
+        for name, load in (('parse', parse), ('unpickle', unpickle), ('open image', lambda: ImageKnowledge(image))):
+            knowledge, elapsed = timed(load)
+            print('%-10s startup %6.3fs  40000 matches %5.2fs' % (name, elapsed, match_time(knowledge, patients)))
+            del knowledge
@@ -0,0 +1,44 @@
+"""
+Load time, file size and match time of andante.database.SQLiteKnowledge
+compared to andante.knowledge.TreeShapedKnowledge, on the tabular data of
+benchmarks/columnar_knowledge.py.
+
+Usage: python benchmarks/sqlite_knowledge.py [number of patients]
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+from andante.database import SQLiteKnowledge
+from andante.logic_concepts import Clause, Predicate, Constant
+
+from columnar_knowledge import tabular_data, load_tree, match_time
+
+
+def load_sqlite(data, path):
+    clauses = [Clause(Predicate(symbol, [Constant(v) for v in row]), []) for symbol, rows in data.items() for row in rows]
+    return SQLiteKnowledge(clauses, path=path)
+
+
+if __name__ == '__main__':
+    patients = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    data = tabular_data(patients)
+    nfacts = sum(len(rows) for rows in data.values())
+    print('%d facts of %d predicates, %d patients' % (nfacts, len(data), patients))
+
+    start = time.perf_counter()
+    knowledge = load_tree(data)
+    elapsed = time.perf_counter() - start
+    print('%-20s load %6.2fs                     40000 matches %5.2fs' % ('TreeShapedKnowledge', elapsed, match_time(knowledge, patients)))
+    del knowledge
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'background.db')
+        start = time.perf_counter()
+        knowledge = load_sqlite(data, path)
+        elapsed = time.perf_counter() - start
+        size = os.path.getsize(path)
+        print('%-20s load %6.2fs  file %7.1f MB  40000 matches %5.2fs' % ('SQLiteKnowledge', elapsed, size / 2**20, match_time(knowledge, patients)))
+        knowledge.close()
@@ -0,0 +1,61 @@
+"""
+Time of the induction of a clause whose body calls a recursive background
+predicate, ancestor/2 over a random forest of persons, heir(X, Y) :- 
+ancestor(X, Y), male(Y), for each coverage
+mode of the candidate clauses: the examples proven by the solver for each
+candidate (ProofCoverage, which JoinCoverage falls back to for recursive
+predicates unless the solver is DatalogSolver), or saturated once and
+tested by theta-subsumption (SubsumptionCoverage).
+
+Usage: python benchmarks/subsumption_coverage.py [number of persons] [number of examples]
+"""
+
+import random
+import sys
+import time
+
+from andante.program import AndanteProgram
+
+from datalog_evaluation import forest, background
+
+
+MODES = """
+modeh(1, heir(+person, +person)).
+modeb(1, parent(+person, +person)).
+modeb(1, ancestor(+person, +person)).
+modeb(1, male(+person)).
+"""
+
+
+def examples(parent, n, seed=1):
+    """ Returns the male/1 facts of every other person and n heir/2 examples, the positive ones being an ancestor and a male descendant """
+    rng = random.Random(seed)
+    males = set(range(0, len(parent) + 1, 2))
+    pos, neg = [], []
+    while len(pos) + len(neg) < n:
+        person = rng.randrange(1, len(parent) + 1)
+        ancestors = [parent[person]]
+        while ancestors[-1] in parent:
+            ancestors.append(parent[ancestors[-1]])
+        if person in males and len(pos) < n // 2:
+            pos.append((rng.choice(ancestors), person))
+        elif person not in males and len(neg) < n - n // 2:
+            neg.append(rng.choice([(rng.choice(ancestors), person), (person, ancestors[-1])]))
+    facts = ' '.join('male(p%d).' % m for m in sorted(males))
+    text = lambda pairs: ' '.join('heir(p%d, p%d).' % pair for pair in pairs)
+    return facts, ':- begin_in_pos. %s :- end_in_pos. :- begin_in_neg. %s :- end_in_neg.' % (text(pos), text(neg))
+
+
+if __name__ == '__main__':
+    persons = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+    n = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    parent = forest(persons)
+    facts, E = examples(parent, n)
+    text = '%s %s %s' % (MODES, background(parent).replace(':- end_bg.', facts + ' :- end_bg.'), E)
+    for solver in ('AndanteSolver', 'CompiledSolver', 'DatalogSolver'):
+        for coverage in ('ProofCoverage', 'SubsumptionCoverage'):
+            program = AndanteProgram.build_from(text, solver=solver)
+            start = time.perf_counter()
+            learned = program.induce(update_knowledge=False, coverage=coverage)
+            elapsed = time.perf_counter() - start
+            print('%-15s %-20s %7.2fs  %s' % (solver, coverage, elapsed, ' '.join(str(c) for c in learned)))
@@ -8,5 +8,6 @@ setup(
         "parsimonious>=0.8.1",
         "dataclasses>=0.6",
         "ipywidgets>=7.6.5",
+        "numpy",
     ],
 )